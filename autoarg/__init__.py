@@ -1,18 +1,62 @@
-import functools
-from typing import Any, Callable, List, Optional, TypeVar, cast, overload
-
 from .decorators import command
-from .generate import generate_argparser
-from .types import JSON, Append, Arg, Count, File, OneOrMore, Remainder
+from .errors import ParseError
+from .types import (
+    JSON,
+    Append,
+    Arg,
+    Array,
+    AsyncFile,
+    Count,
+    File,
+    JSONLines,
+    OneOrMore,
+    Remainder,
+    Stream,
+)
 
 __all__ = [
     'Append',
     'Arg',
+    'ArgSpec',
+    'Array',
+    'AsyncFile',
+    'AsyncLazyFile',
+    'CommandGroup',
+    'CommandSpec',
     'Count',
     'File',
     'JSON',
+    'JSONLines',
+    'JSONRecords',
+    'LazyFile',
     'OneOrMore',
+    'ParseError',
     'Remainder',
+    'Stream',
     'command',
     'generate_argparser'
 ]
+
+# These pull in argparse, inspect and friends, so they are only imported when used
+_LAZY = {
+    'ArgSpec': 'spec',
+    'CommandGroup': 'group',
+    'CommandSpec': 'spec',
+    'generate_argparser': 'generate',
+    'AsyncLazyFile': 'files',
+    'JSONRecords': 'files',
+    'LazyFile': 'files',
+}
+
+
+def __getattr__(name):
+    if name in _LAZY:
+        from importlib import import_module
+        value = getattr(import_module(f'.{_LAZY[name]}', __name__), name)
+        globals()[name] = value
+        return value
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_LAZY))
@@ -0,0 +1,18 @@
+"""Typing helpers that need `typing_extensions` on older Pythons
+
+`typing_extensions` is only imported where the standard library falls short, since
+it is one of the more expensive modules to import.
+"""
+import sys
+
+if sys.version_info >= (3, 9):
+    from typing import Annotated, Literal, get_args, get_origin
+else:  # typing.get_args and get_origin don't understand Annotated before 3.9
+    from typing_extensions import Annotated, Literal, get_args, get_origin
+
+__all__ = [
+    'Annotated',
+    'Literal',
+    'get_args',
+    'get_origin',
+]
@@ -0,0 +1,82 @@
+"""Compact numeric arguments
+
+A parameter annotated `Array[int]` or `Array[float]` takes any number of numbers and
+receives them as one `array.array` (8 bytes per number, rather than a list of boxed
+`int`s or `float`s), converted in a single pass after parsing instead of one argparse
+`type` call at a time. `Array[Tuple[float, float]]` takes them in groups of a fixed
+size, stored one after the other.
+
+With `Arg(numpy=True)`, the function gets a NumPy array instead (of shape `(n, size)`
+for groups), sharing the memory of the `array.array`, when NumPy is importable.
+"""
+from array import array
+from typing import Any, Callable, List, Optional
+
+from .spec import _ByValue
+
+__all__ = [
+    'TYPECODES',
+]
+
+TYPECODES = {
+    int: 'q',
+    float: 'd',
+}
+
+
+class _ArrayConverter(_ByValue):
+    """Converts the argument strings of an `Array[...]` parameter into one array
+    """
+    def __init__(self, dest: str, item_type: Callable[[str], Any], size: int = 1,
+                 numpy=False):
+        self.dest = dest
+        self.item_type = item_type
+        self.typecode = TYPECODES[item_type]
+        self.size = size
+        self.numpy = numpy
+
+    def __call__(self, tokens):
+        if not isinstance(tokens, list):
+            return tokens  # the default
+        if len(tokens) % self.size:
+            raise ValueError(
+                f"argument {self.dest}: expected a multiple of {self.size} values,"
+                + f" got {len(tokens)}"
+            )
+        try:
+            values = array(self.typecode, map(self.item_type, tokens))
+        except (ValueError, OverflowError):
+            raise ValueError(self._invalid(tokens)) from None
+        if self.numpy:
+            return _to_numpy(values, self.size)
+        return values
+
+    def _invalid(self, tokens: List[str]) -> str:
+        # only worked out on failure, so that the conversion itself stays one pass
+        name = self.item_type.__name__
+        for index, token in enumerate(tokens):
+            try:
+                array(self.typecode, [self.item_type(token)])
+            except ValueError:
+                return f"argument {self.dest}: invalid {name} value at index {index}: {token!r}"
+            except OverflowError:
+                return f"argument {self.dest}: {name} out of range at index {index}: {token!r}"
+        return f"argument {self.dest}: invalid {name} values"
+
+
+def _to_numpy(values: array, size: int):
+    numpy = _import_numpy()
+    if numpy is None:
+        return values
+    result = numpy.frombuffer(values, dtype=values.typecode)
+    if size > 1:
+        result = result.reshape(-1, size)
+    return result
+
+
+def _import_numpy() -> Optional[Any]:
+    try:
+        import numpy
+    except ImportError:
+        return None
+    return numpy
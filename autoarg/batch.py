@@ -0,0 +1,245 @@
+"""Running a command over many argument vectors in one process
+
+Instead of launching `python tool.py ...` once per job, the jobs' argv can be fed
+to `Command.run_many()` (or written one per line, shell-quoted, and passed to
+`python -m autoarg.batch module:command FILE`). The parser is built once, failures
+are reported per job without stopping the batch, and nothing is printed for them.
+"""
+import argparse
+import shlex
+import sys
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from typing import IO, Any, Iterable, Iterator, List, NoReturn, Optional, Sequence, Tuple, Union
+
+from .decorators import Command, _exit_status, _resolve_command
+from .errors import ParseError
+
+__all__ = [
+    'BatchResult',
+    'batch_main',
+    'iter_argv_lines',
+    'run_file',
+    'run_many',
+]
+
+
+class BatchResult:
+    """The outcome of running one argv of a batch
+
+    Exactly one of `value` (the function's return value) and `error` (a `ParseError`
+    or whatever the function raised) is meaningful; `ok` tells which.
+    """
+    __slots__ = ('index', 'argv', 'value', 'error')
+
+    def __init__(self, index: int, argv, value: Any = None, error: Optional[BaseException] = None):
+        self.index = index
+        self.argv = argv
+        self.value = value
+        self.error = error
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+    @property
+    def exit_status(self) -> int:
+        """The status `Command.main()` would have exited with
+        """
+        if self.error is None:
+            return _exit_status(self.value)
+        if isinstance(self.error, ParseError):
+            return 2
+        if isinstance(self.error, SystemExit):
+            code = self.error.code
+            return code if isinstance(code, int) else int(code is not None)
+        return 1
+
+    def __repr__(self):
+        if self.ok:
+            return f"BatchResult({self.index}, {self.argv!r}, value={self.value!r})"
+        return f"BatchResult({self.index}, {self.argv!r}, error={self.error!r})"
+
+
+def run_many(
+    command: Command,
+    argvs: Iterable[Union[Sequence[str], ParseError]],
+    *,
+    workers: Optional[int] = None,
+    ordered: bool = True,
+    executor: str = 'thread',
+) -> Iterator[BatchResult]:
+    """Parses and runs each argv in `argvs`, yielding a `BatchResult` for each
+
+    `argvs` is consumed lazily, so it may be an unbounded stream. With `workers`,
+    jobs run on a thread or process pool (`executor='thread'|'process'`) and results
+    are yielded in input order, or as they complete if `ordered` is false. Process
+    workers look the command up by name, so it has to be importable.
+    """
+    if executor not in ('thread', 'process'):
+        raise ValueError(f"unknown executor: {executor!r}")
+
+    if workers is None:
+        return (_run_one(command, index, argv) for index, argv in enumerate(argvs))
+
+    if executor == 'process':
+        reference = _command_reference(command)
+        return _run_pooled(
+            ProcessPoolExecutor, workers, ordered, argvs,
+            lambda pool, index, argv: pool.submit(_run_by_reference, reference, index, argv),
+        )
+
+    command.parser  # build the parser now rather than have the threads race to
+    return _run_pooled(
+        ThreadPoolExecutor, workers, ordered, argvs,
+        lambda pool, index, argv: pool.submit(_run_one, command, index, argv),
+    )
+
+
+def _run_pooled(make_pool, workers: int, ordered: bool, argvs, submit) -> Iterator[BatchResult]:
+    max_pending = workers * 4  # keeps a stream from being read ahead without bound
+    jobs = {}
+    pending = deque() if ordered else set()
+    add = pending.append if ordered else pending.add
+
+    def finished(future) -> BatchResult:
+        index, argv = jobs.pop(future)
+        try:
+            return future.result()
+        except Exception as err:  # e.g. an unpicklable return value
+            return BatchResult(index, argv, error=err)
+
+    def drain(limit: int) -> Iterator[BatchResult]:
+        while len(pending) > limit:
+            if ordered:
+                yield finished(pending.popleft())
+            else:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    pending.remove(future)
+                    yield finished(future)
+
+    with make_pool(workers) as pool:
+        for index, argv in enumerate(argvs):
+            future = submit(pool, index, argv)
+            jobs[future] = (index, argv)
+            add(future)
+            yield from drain(max_pending - 1)
+        yield from drain(0)
+
+
+def _run_one(command: Command, index: int, argv) -> BatchResult:
+    if isinstance(argv, ParseError):
+        return BatchResult(index, None, error=argv)
+    argv = list(argv)
+    try:
+        extras = {}
+        args, kwargs = command.parser.parse_call_args(argv, exit_on_error=False, extras=extras)
+        value = command._call(args, kwargs, refresh=extras.get('_no_cache_', False))
+    except ParseError as err:
+        if err.status == 0:  # --help or --version, which are no use in the middle of a batch
+            err = ParseError("--help and --version can't be run as a job")
+        return BatchResult(index, argv, error=err)
+    except (Exception, SystemExit) as err:
+        return BatchResult(index, argv, error=err)
+    return BatchResult(index, argv, value=value)
+
+
+def _command_reference(command: Command) -> Tuple[str, str]:
+    reference = (command.__module__, command.__qualname__)
+    try:
+        found = _resolve_command(reference)
+    except (ImportError, AttributeError):
+        found = None
+    if found is not command:
+        raise TypeError(
+            f"{command.__qualname__} can't run in worker processes:"
+            + " it must be importable by name"
+        )
+    return reference
+
+
+def _run_by_reference(reference: Tuple[str, str], index: int, argv) -> BatchResult:
+    return _run_one(_resolve_command(reference), index, argv)
+
+
+def iter_argv_lines(lines: Iterable[str]) -> Iterator[Union[List[str], ParseError]]:
+    """Splits each line with shell quoting rules, skipping blank lines and comments
+
+    Lines that can't be split (e.g. unbalanced quotes) produce a `ParseError` in their
+    place, which `run_many` reports as that job's error.
+    """
+    for lineno, line in enumerate(lines, 1):
+        try:
+            argv = shlex.split(line, comments=True)
+        except ValueError as err:
+            yield ParseError(f"line {lineno}: {err}")
+            continue
+        if argv:
+            yield argv
+
+
+def _open_lines(file) -> IO[str]:
+    if file is None or file == '-':
+        return sys.stdin
+    if isinstance(file, str) or hasattr(file, '__fspath__'):
+        return open(file, encoding='utf-8')
+    return file
+
+
+def run_file(command: Command, file=None, **kwargs) -> Iterator[BatchResult]:
+    """`run_many` over the shell-quoted argv lines of `file` (a path or file object)
+
+    `None` or `'-'` reads from stdin.
+    """
+    lines = _open_lines(file)
+    try:
+        yield from run_many(command, iter_argv_lines(lines), **kwargs)
+    finally:
+        if lines is not file and lines is not sys.stdin:
+            lines.close()
+
+
+def batch_main(command: Command, file=None, **kwargs) -> NoReturn:
+    """Runs every argv line of `file` and exits with status 1 if any of them failed
+
+    Failures are reported on stderr, one line each.
+    """
+    failures = 0
+    for result in run_file(command, file, **kwargs):
+        status = result.exit_status
+        if status != 0:
+            failures += 1
+            argv = '?' if result.argv is None else shlex.join(result.argv)
+            reason = result.error if result.error is not None else f"exit status {status}"
+            message = f"{command.__name__}: job {result.index + 1} ({argv}): {reason}"
+            print(message, file=sys.stderr)
+    sys.exit(1 if failures else 0)
+
+
+def main(argv=None) -> NoReturn:
+    parser = argparse.ArgumentParser(
+        'python -m autoarg.batch',
+        description="Run an autoarg command once per line of shell-quoted arguments",
+    )
+    parser.add_argument('command', help="the command to run, as module:name")
+    parser.add_argument('file', nargs='?', default='-', help="argv lines (default: stdin)")
+    parser.add_argument('-j', '--workers', type=int, help="run jobs on this many workers")
+    parser.add_argument(
+        '--processes', dest='executor', action='store_const', const='process', default='thread',
+        help="use worker processes instead of threads",
+    )
+    opts = parser.parse_args(argv)
+
+    module, _, name = opts.command.partition(':')
+    if not name:
+        parser.error("command must be given as module:name")
+    sys.path.insert(0, '')
+    command = _resolve_command((module, name))
+    if not isinstance(command, Command):
+        parser.error(f"{opts.command} is not an autoarg command")
+    batch_main(command, opts.file, workers=opts.workers, executor=opts.executor)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,180 @@
+"""On-disk cache of resolved argument parser specs
+
+Building a parser means introspecting the function signature, inferring a factory
+for every annotation and resolving short options. None of that changes between runs
+unless the function (or autoarg itself) changes, so the resulting `CommandSpec` can be
+pickled and replayed onto a fresh `ArgumentParser` on the next start.
+
+Entries are keyed by a fingerprint of the function's qualified name, code object,
+annotations and defaults (including the members of any Enum they refer to), so any
+edit invalidates them. Functions whose spec holds values that cannot be stored
+faithfully (lambdas, locally defined classes, objects without a stable repr) are
+simply never cached.
+"""
+import hashlib
+import marshal
+import os
+import pickle
+import sys
+import tempfile
+from enum import Enum
+from pathlib import Path
+from typing import Callable, Optional, Union
+
+from . import arrays, choices, files, generate, streams, types
+from . import spec as spec_module
+from ._compat import get_args
+from .spec import CommandSpec
+
+__all__ = [
+    'SpecCache',
+    'default_cache_dir',
+    'resolve_spec_cache',
+]
+
+_FORMAT_VERSION = 4
+
+
+class _Unserializable(Exception):
+    pass
+
+
+def default_cache_dir() -> Path:
+    base = os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache')
+    return Path(base, 'autoarg')
+
+
+def resolve_spec_cache(spec_cache) -> Optional['SpecCache']:
+    """Interprets the `spec_cache` argument of `generate_argparser`
+    """
+    if spec_cache is None:
+        env = os.environ.get('AUTOARG_SPEC_CACHE', '')
+        if env in ('', '0'):
+            return None
+        spec_cache = True if env == '1' else env
+
+    if spec_cache is False:
+        return None
+    if spec_cache is True:
+        return SpecCache(default_cache_dir() / 'specs')
+    if isinstance(spec_cache, SpecCache):
+        return spec_cache
+    return SpecCache(spec_cache)
+
+
+class SpecCache:
+    """A directory of pickled parser specs
+    """
+    def __init__(self, directory: Union[str, os.PathLike]):
+        self.directory = Path(directory)
+
+    def _path(self, key: str) -> Path:
+        return self.directory / f'{key}.pickle'
+
+    def load(self, func: Callable, *, add_help=True) -> Optional[CommandSpec]:
+        try:
+            key = fingerprint(func, add_help=add_help)
+        except _Unserializable:
+            return None
+        try:
+            with open(self._path(key), 'rb') as f:
+                version, spec = pickle.load(f)
+        except Exception:
+            # missing, corrupt or referring to something that moved: rebuild
+            return None
+        if version != _FORMAT_VERSION:
+            return None
+        return spec
+
+    def store(self, func: Callable, spec: CommandSpec, *, add_help=True) -> bool:
+        try:
+            key = fingerprint(func, add_help=add_help)
+            # functions and classes pickle by reference, which fails loudly for lambdas
+            # and local definitions - exactly the things that can't be cached
+            data = pickle.dumps(
+                (_FORMAT_VERSION, spec),
+                protocol=pickle.HIGHEST_PROTOCOL,
+            )
+        except (_Unserializable, pickle.PicklingError, TypeError, AttributeError):
+            return False
+
+        return _atomic_write(self._path(key), data)
+
+    def clear(self):
+        for entry in self.directory.glob('*.pickle'):
+            try:
+                entry.unlink()
+            except OSError:
+                pass
+
+
+def _atomic_write(path: Path, data: bytes) -> bool:
+    try:
+        path.parent.mkdir(mode=0o700, parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=path.parent, prefix='.tmp-')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.replace(tmp, path)
+        except BaseException:
+            os.unlink(tmp)
+            raise
+    except OSError:
+        return False  # the cache is an optimization; never fail the command over it
+    return True
+
+
+def fingerprint(func: Callable, *, add_help=True) -> str:
+    """Hash of everything that determines the parser generated for `func`
+
+    Raises `_Unserializable` when that can't be determined reliably.
+    """
+    code = getattr(func, '__code__', None)
+    if code is None:
+        raise _Unserializable(func)
+    annotations = getattr(func, '__annotations__', {})
+    text = repr((
+        _FORMAT_VERSION,
+        sys.version,
+        _source_stamp(),
+        func.__module__,
+        func.__qualname__,
+        add_help,
+        annotations,
+        getattr(func, '__defaults__', None),
+        getattr(func, '__kwdefaults__', None),
+    ))
+    if ' at 0x' in text:
+        raise _Unserializable(func)  # something in there has no stable repr
+    digest = hashlib.sha256(text.encode())
+    digest.update(marshal.dumps(code))
+    for enum_class in _referenced_enums(annotations.values()):
+        # the repr of an Enum class doesn't mention its members
+        digest.update(repr([(m.name, m._value_) for m in enum_class]).encode())
+    return digest.hexdigest()
+
+
+_source_stamp_value = None
+
+
+def _source_stamp():
+    # autoarg's own inference rules are part of the key too
+    global _source_stamp_value
+    if _source_stamp_value is None:
+        stamps = []
+        for module in (generate, types, files, streams, choices, arrays, spec_module):
+            st = os.stat(module.__file__)
+            stamps.append((st.st_mtime_ns, st.st_size))
+        _source_stamp_value = stamps
+    return _source_stamp_value
+
+
+def _referenced_enums(annotations):
+    pending = list(annotations)
+    while pending:
+        T = pending.pop()
+        if isinstance(T, type):
+            if issubclass(T, Enum):
+                yield T
+        else:
+            pending.extend(get_args(T))
@@ -0,0 +1,166 @@
+"""Choices that stay fast with thousands of members
+
+`Choices` is what Enum arguments use as both `choices` and `type`: membership is a
+hash lookup rather than argparse's scan of a list. With `Arg(allow_abbrev=True)`, an
+unambiguous prefix of a choice (`us-w` for `us-west-2`) is expanded to it too, the
+way argparse expands abbreviated long options. Prefixes are looked up by bisecting
+the sorted choices, which is as good as a trie here without building one.
+
+`Literal` flag groups with more than `COMPACT_FLAGS` values are added as a single
+`_FlagChoiceAction` holding every flag, instead of one action per value in a
+mutually exclusive group (which argparse checks in quadratic time on every parse).
+"""
+import argparse
+from bisect import bisect_left
+from typing import Any, Dict, Iterable, Iterator, List
+
+from .spec import _ByValue
+
+__all__ = [
+    'COMPACT_FLAGS',
+    'Choices',
+]
+
+COMPACT_FLAGS = 32
+
+_LISTED_CHOICES = 25  # larger sets aren't spelled out in usage and errors
+
+
+class Choices(_ByValue):
+    """An ordered set of strings, optionally with expansion of unambiguous prefixes
+
+    Calling it with an argument string returns the choice it names, or raises
+    `argparse.ArgumentTypeError`.
+    """
+    __slots__ = ('values', 'allow_abbrev', '_set', '_sorted', '__name__')
+
+    def __init__(self, values: Iterable[str], *, allow_abbrev=False):
+        self.values = tuple(values)
+        self.allow_abbrev = allow_abbrev
+        self._set = frozenset(self.values)
+        self._sorted = sorted(self._set)
+        self.__name__ = 'choice'
+
+    @property
+    def is_large(self) -> bool:
+        return len(self.values) > _LISTED_CHOICES
+
+    def __contains__(self, value) -> bool:
+        return value in self._set
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.values)
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+    def completions(self, prefix: str) -> List[str]:
+        """The choices starting with `prefix`, in sorted order
+        """
+        start = bisect_left(self._sorted, prefix)
+        end = bisect_left(self._sorted, prefix + '\U0010ffff', start)
+        return self._sorted[start:end]
+
+    def __call__(self, text: str) -> str:
+        if text in self._set:
+            return text
+        matches = self.completions(text) if self.allow_abbrev and text else []
+        if len(matches) == 1:
+            return matches[0]
+        if matches:
+            shown = ', '.join(map(repr, matches[:_LISTED_CHOICES]))
+            more = ', ...' if len(matches) > _LISTED_CHOICES else ''
+            raise argparse.ArgumentTypeError(
+                f"ambiguous choice: {text!r} could match {shown}{more}"
+            )
+        raise argparse.ArgumentTypeError(f"invalid choice: {text!r} ({self._hint(text)})")
+
+    def _hint(self, text: str) -> str:
+        if not self.is_large:
+            return f"choose from {', '.join(map(repr, self.values))}"
+        import difflib
+        close = difflib.get_close_matches(text, self.values, n=5)
+        if close:
+            return f"did you mean {' or '.join(map(repr, close))}?"
+        return f"one of {len(self.values)} choices"
+
+    def _fields(self) -> tuple:
+        return (self.values, self.allow_abbrev)
+
+    def __reduce__(self):
+        return Choices, (self.values,), {'allow_abbrev': self.allow_abbrev}
+
+    def __setstate__(self, state):
+        self.allow_abbrev = state['allow_abbrev']
+
+    def __repr__(self):
+        return f"Choices({len(self.values)} values)"
+
+
+class _EnumLookup(_ByValue):
+    """Converts a choice (the `str` of a member's value) back to the Enum member
+    """
+    def __init__(self, enum_class):
+        self.enum_class = enum_class
+        self._members = {str(member._value_): member for member in enum_class}
+
+    def __call__(self, value):
+        member = self._members.get(value)
+        if member is not None:
+            return member
+        if isinstance(value, self.enum_class):
+            return value
+        member = self._members.get(str(value))  # e.g. a non-string default
+        if member is None:
+            return self.enum_class(value)  # raises the usual ValueError
+        return member
+
+    def _fields(self) -> tuple:
+        return (self.enum_class,)
+
+    def __reduce__(self):
+        return _EnumLookup, (self.enum_class,)
+
+
+class _FlagChoiceAction(argparse.Action):
+    """All the flags of a large `Literal` group as one action: each stores its own value
+
+    Like the mutually exclusive group it replaces, giving two different flags of the
+    group is an error. That is tracked in a `_<dest>__flag_` attribute, which
+    `_DropAttribute` removes from the namespace after parsing.
+    """
+    def __init__(self, option_strings, dest, flag_values: Dict[str, Any], default=None,
+                 required=False, help=None):
+        super().__init__(
+            option_strings, dest, nargs=0, default=default, required=required, help=help,
+        )
+        self.flag_values = flag_values
+
+    def format_usage(self) -> str:
+        return f"{self.option_strings[0]}|...|{self.option_strings[-1]}"
+
+    @staticmethod
+    def marker(dest: str) -> str:
+        return f"_{dest}__flag_"
+
+    def __call__(self, parser, namespace, values, option_string=None):
+        value = self.flag_values[option_string]
+        marker = self.marker(self.dest)
+        previous = getattr(namespace, marker, None)
+        if previous is not None and self.flag_values[previous] != value:
+            raise argparse.ArgumentError(
+                None, f"argument {option_string}: not allowed with argument {previous}"
+            )
+        setattr(namespace, marker, option_string)
+        setattr(namespace, self.dest, value)
+
+
+class _DropAttribute(_ByValue):
+    """Removes a bookkeeping attribute from the namespace after parsing
+    """
+    def __init__(self, name: str):
+        self.name = name
+
+    def __call__(self, namespace):
+        if hasattr(namespace, self.name):
+            delattr(namespace, self.name)
@@ -0,0 +1,439 @@
+"""Static shell completion scripts
+
+The scripts are generated once from a command's parser spec (option names after
+short options are assigned, `Literal` flags, Enum choices, `File[...]` arguments)
+and need no Python at completion time:
+
+    python -m autoarg.completion bash module:command [--prog NAME] > NAME.bash
+    python -m autoarg.completion zsh module:command > ~/.zfunc/_NAME
+    python -m autoarg.completion fish module:command > ~/.config/fish/completions/NAME.fish
+
+`CommandGroup`s are completed recursively, which imports each subcommand once while
+generating. The `--option=value` form is not completed.
+"""
+import re
+import shlex
+import sys
+from typing import Dict, List, NoReturn, Optional, Sequence, Tuple
+
+from .files import _FileFactory
+
+__all__ = [
+    'SHELLS',
+    'completion_script',
+]
+
+SHELLS = ('bash', 'zsh', 'fish')
+
+_CONSTANT_ACTIONS = ('store_const', 'store_true', 'store_false', 'append_const', 'count')
+_HELP = "show this help message and exit"
+
+
+class _Option:
+    __slots__ = ('names', 'n_values', 'choices', 'is_file', 'help', 'repeatable')
+
+    def __init__(self, names, n_values=0, choices=None, is_file=False, help=None,
+                 repeatable=False):
+        self.names = list(names)
+        self.n_values = n_values
+        self.choices = choices
+        self.is_file = is_file
+        self.help = help
+        self.repeatable = repeatable
+
+    @property
+    def value_name(self) -> str:
+        long_names = [name for name in self.names if name.startswith('--')]
+        return (long_names or self.names)[0].lstrip('-')
+
+
+class _Positional:
+    __slots__ = ('name', 'choices', 'is_file', 'help')
+
+    def __init__(self, name, choices=None, is_file=False, help=None):
+        self.name = name
+        self.choices = choices
+        self.is_file = is_file
+        self.help = help
+
+
+class _Node:
+    """What can be completed at one level of a command line
+    """
+    def __init__(self, path: Tuple[str, ...]):
+        self.path = path
+        self.options: List[_Option] = []
+        self.positionals: List[_Positional] = []  # one per argv slot
+        self.variadic: Optional[_Positional] = None  # takes all further slots
+        self.subcommands: Dict[str, Tuple[str, _Node]] = {}
+
+
+def _command_node(command, path) -> _Node:
+    parser = command.parser
+    spec = getattr(parser, 'spec', None)
+    if spec is None:
+        raise TypeError(f"{command.__name__}: completion needs a parser generated by autoarg")
+    node = _Node(path)
+    if command._parser_kw.get('add_help', True):
+        node.options.append(_Option(['-h', '--help'], help=_HELP))
+    for arg in spec.arguments:
+        if arg.method != 'add_argument':
+            continue
+        args, kwargs = arg.names, arg.options
+        choices = kwargs.get('choices')
+        choices = [str(choice) for choice in choices] if choices is not None else None
+        is_file = isinstance(kwargs.get('type'), _FileFactory)
+        help = kwargs.get('help')
+        nargs = kwargs.get('nargs')
+        if args[0].startswith('-'):
+            action = kwargs.get('action') or 'store'
+            if action in _CONSTANT_ACTIONS or 'flag_values' in kwargs:
+                n_values = 0  # including large Literal groups, which are a single action
+            else:
+                n_values = nargs if isinstance(nargs, int) else 1
+            node.options.append(_Option(
+                args, n_values, choices, is_file, help,
+                repeatable=action in ('append', 'append_const', 'count'),
+            ))
+            continue
+        positional = _Positional(args[0], choices, is_file, help)
+        if nargs in ('*', '+', '...', 'A...'):
+            node.variadic = positional
+        else:
+            node.positionals.extend([positional] * (nargs if isinstance(nargs, int) else 1))
+    return node
+
+
+def _group_node(group, path) -> _Node:
+    node = _Node(path)
+    node.options.append(_Option(['-h', '--help'], help=_HELP))
+    for name, summary in group.summaries().items():
+        node.subcommands[name] = (summary, _node(group[name], path + (name,)))
+    return node
+
+
+def _node(runnable, path=()) -> _Node:
+    from .group import CommandGroup
+    if isinstance(runnable, CommandGroup):
+        return _group_node(runnable, path)
+    return _command_node(runnable, path)
+
+
+def _walk(node: _Node):
+    yield node
+    for _, child in node.subcommands.values():
+        yield from _walk(child)
+
+
+def completion_script(runnable, shell: str, prog: Optional[str] = None) -> str:
+    """The completion script for a `Command` or `CommandGroup`, for `shell`
+
+    `prog` is the name the command is invoked by (default: its name).
+    """
+    if shell not in SHELLS:
+        raise ValueError(f"unsupported shell {shell!r} (expected one of {', '.join(SHELLS)})")
+    from .group import CommandGroup
+    if prog is None and isinstance(runnable, CommandGroup):
+        prog = runnable.prog
+    elif prog is None:
+        prog = runnable._parser_kw.get('prog', runnable.__name__)
+    root = _node(runnable)
+    return _GENERATORS[shell](root, prog)
+
+
+def _function_name(prog: str, path=()) -> str:
+    return '_autoarg_' + '_'.join(re.sub(r'\W', '_', part) for part in (prog, *path))
+
+
+def _first_line(text: Optional[str]) -> str:
+    return (text or '').strip().split('\n', 1)[0]
+
+
+# bash
+
+
+def _bash_words(words) -> str:
+    return shlex.quote(' '.join(words))
+
+
+def _bash_value(choices, is_file) -> str:
+    if choices is not None:
+        return f'COMPREPLY=($(compgen -W {_bash_words(choices)} -- "$cur"))'
+    if is_file:
+        return 'compopt -o filenames 2>/dev/null; COMPREPLY=($(compgen -f -- "$cur"))'
+    return 'COMPREPLY=()'
+
+
+def _bash(root: _Node, prog: str) -> str:
+    fn = _function_name(prog)
+    nodes = list(_walk(root))
+
+    def key(node, suffix):
+        return shlex.quote(f"{' '.join(node.path)}:{suffix}")
+
+    walk_cases, value_cases, option_cases, positional_cases = [], [], [], []
+    for node in nodes:
+        here = shlex.quote(' '.join(node.path))
+        for name in node.subcommands:
+            walk_cases.append(
+                f"{key(node, name)}) path={shlex.quote(' '.join(node.path + (name,)))};"
+                + " npos=0; continue ;;"
+            )
+        for option in node.options:
+            patterns = '|'.join(key(node, name) for name in option.names)
+            if option.n_values:
+                walk_cases.append(
+                    f'{patterns}) skip={option.n_values}; pending="$word"; continue ;;'
+                )
+                value_cases.append(f"{patterns}) {_bash_value(option.choices, option.is_file)} ;;")
+        names = [name for option in node.options for name in option.names]
+        option_cases.append(f'{here}) COMPREPLY=($(compgen -W {_bash_words(names)} -- "$cur")) ;;')
+        if node.subcommands:
+            positional_cases.append(
+                f'{key(node, 0)}) COMPREPLY=($(compgen -W {_bash_words(node.subcommands)}'
+                + ' -- "$cur")) ;;'
+            )
+        for i, positional in enumerate(node.positionals):
+            positional_cases.append(
+                f"{key(node, i)}) {_bash_value(positional.choices, positional.is_file)} ;;"
+            )
+        if node.variadic is not None:
+            prefix = shlex.quote(f"{' '.join(node.path)}:")
+            positional_cases.append(
+                f"{prefix}*) {_bash_value(node.variadic.choices, node.variadic.is_file)} ;;"
+            )
+
+    def indent(lines, depth):
+        return '\n'.join(' ' * depth + line for line in lines)
+
+    return f'''\
+# bash completion for {prog}, generated by autoarg
+{fn}() {{
+    local cur="${{COMP_WORDS[COMP_CWORD]}}"
+    local path="" pending="" skip=0 npos=0 word i
+    for ((i = 1; i < COMP_CWORD; i++)); do
+        word="${{COMP_WORDS[i]}}"
+        if ((skip > 0)); then
+            skip=$((skip - 1))
+            continue
+        fi
+        pending=""
+        case "$path:$word" in
+{indent(walk_cases, 12)}
+        esac
+        [[ $word == -* ]] || npos=$((npos + 1))
+    done
+
+    if ((skip > 0)); then
+        case "$path:$pending" in
+{indent(value_cases, 12)}
+            *) COMPREPLY=() ;;
+        esac
+        return 0
+    fi
+    if [[ $cur == -* ]]; then
+        case "$path" in
+{indent(option_cases, 12)}
+        esac
+        return 0
+    fi
+    case "$path:$npos" in
+{indent(positional_cases, 8)}
+        *) COMPREPLY=() ;;
+    esac
+    return 0
+}}
+complete -F {fn} {shlex.quote(prog)}
+'''
+
+
+# zsh
+
+
+def _zsh_quote(text: str) -> str:
+    return "'" + text.replace("'", "'\\''") + "'"
+
+
+def _zsh_help(text: Optional[str]) -> str:
+    return re.sub(r'([\[\]:\\])', r'\\\1', _first_line(text))
+
+
+def _zsh_action(choices, is_file) -> str:
+    if choices is not None:
+        return '(' + ' '.join(re.sub(r'([\s()\\:])', r'\\\1', choice) for choice in choices) + ')'
+    return '_files' if is_file else ' '
+
+
+def _zsh_option(option: _Option) -> str:
+    values = ''.join(
+        f":{option.value_name}:{_zsh_action(option.choices, option.is_file)}"
+        for _ in range(option.n_values)
+    )
+    help = _zsh_help(option.help)
+    body = (f"[{help}]" if help else '') + values
+    if option.repeatable:
+        return ' '.join(_zsh_quote(f"*{name}{body}") for name in option.names)
+    if len(option.names) == 1:
+        return _zsh_quote(option.names[0] + body)
+    exclusions = _zsh_quote(f"({' '.join(option.names)})")
+    return f"{exclusions}{{{','.join(option.names)}}}{_zsh_quote(body)}"
+
+
+def _zsh_function(node: _Node, prog: str) -> List[str]:
+    fn = _function_name(prog, node.path)
+    specs = [_zsh_option(option) for option in node.options]
+    if node.subcommands:
+        specs += ["'1: :->subcommand'", "'*:: :->args'"]
+        described = ' '.join(
+            _zsh_quote(name.replace(':', '\\:') + ':' + _first_line(summary))
+            for name, (summary, _) in node.subcommands.items()
+        )
+        dispatch = '\n'.join(
+            f"                {shlex.quote(name)}) {_function_name(prog, child.path)} ;;"
+            for name, (_, child) in node.subcommands.items()
+        )
+        lines = [
+            f"{fn}() {{",
+            '    local curcontext="$curcontext" state line',
+            '    typeset -A opt_args',
+            '    _arguments -C \\',
+            *(f"        {spec} \\" for spec in specs[:-1]),
+            f"        {specs[-1]}",
+            '    case $state in',
+            '        subcommand)',
+            f"            local -a subcommands=({described})",
+            "            _describe 'subcommand' subcommands ;;",
+            '        args)',
+            '            case $line[1] in',
+            dispatch,
+            '            esac ;;',
+            '    esac',
+            '}',
+        ]
+        for _, child in node.subcommands.values():
+            lines += [''] + _zsh_function(child, prog)
+        return lines
+
+    for i, positional in enumerate(node.positionals, 1):
+        action = _zsh_action(positional.choices, positional.is_file)
+        specs.append(_zsh_quote(f"{i}:{positional.name}:{action}"))
+    if node.variadic is not None:
+        action = _zsh_action(node.variadic.choices, node.variadic.is_file)
+        specs.append(_zsh_quote(f"*:{node.variadic.name}:{action}"))
+    return [
+        f"{fn}() {{",
+        '    _arguments -s -S \\',
+        *(f"        {spec} \\" for spec in specs[:-1]),
+        f"        {specs[-1]}",
+        '}',
+    ]
+
+
+def _zsh(root: _Node, prog: str) -> str:
+    fn = _function_name(prog)
+    body = '\n'.join(_zsh_function(root, prog))
+    return f'''\
+#compdef {prog}
+# zsh completion for {prog}, generated by autoarg
+
+{body}
+
+if [[ $zsh_eval_context[-1] == loadautofunc ]]; then
+    {fn} "$@"
+else
+    compdef {fn} {shlex.quote(prog)}
+fi
+'''
+
+
+# fish
+
+
+def _fish_quote(text: str) -> str:
+    return "'" + text.replace('\\', '\\\\').replace("'", "\\'") + "'"
+
+
+def _fish_condition(node: _Node) -> List[str]:
+    conditions = [f"__fish_seen_subcommand_from {shlex.quote(name)}" for name in node.path]
+    if node.subcommands:
+        conditions.append(
+            'not __fish_seen_subcommand_from ' + ' '.join(map(shlex.quote, node.subcommands))
+        )
+    if not conditions:
+        return []
+    return ['-n', _fish_quote('; and '.join(conditions))]
+
+
+def _fish_value(choices, is_file) -> List[str]:
+    if choices is not None:
+        return ['-x', '-a', _fish_quote(' '.join(choices))]
+    if is_file:
+        return ['-r', '-F']
+    return ['-x']
+
+
+def _fish(root: _Node, prog: str) -> str:
+    base = ['complete', '-c', shlex.quote(prog)]
+    lines = [f"# fish completion for {prog}, generated by autoarg", ' '.join(base + ['-f'])]
+    for node in _walk(root):
+        condition = _fish_condition(node)
+        for name, (summary, _) in node.subcommands.items():
+            words = base + condition + ['-a', shlex.quote(name)]
+            if summary:
+                words += ['-d', _fish_quote(_first_line(summary))]
+            lines.append(' '.join(words))
+        for option in node.options:
+            words = base + condition
+            for name in option.names:
+                if name.startswith('--'):
+                    words += ['-l', shlex.quote(name[2:])]
+                elif len(name) == 2:
+                    words += ['-s', shlex.quote(name[1:])]
+                else:
+                    words += ['-o', shlex.quote(name[1:])]
+            if option.n_values:
+                words += _fish_value(option.choices, option.is_file)
+            if option.help:
+                words += ['-d', _fish_quote(_first_line(option.help))]
+            lines.append(' '.join(words))
+        positionals = node.positionals + ([node.variadic] if node.variadic else [])
+        for positional in positionals:
+            if positional.choices is not None or positional.is_file:
+                if positional.choices is not None:
+                    value = ['-a', _fish_quote(' '.join(positional.choices))]
+                else:
+                    value = ['-F']
+                lines.append(' '.join(base + condition + value))
+    return '\n'.join(lines) + '\n'
+
+
+_GENERATORS = {
+    'bash': _bash,
+    'zsh': _zsh,
+    'fish': _fish,
+}
+
+
+def main(argv: Optional[Sequence[str]] = None) -> NoReturn:
+    import argparse
+
+    parser = argparse.ArgumentParser(
+        'python -m autoarg.completion',
+        description="Print a static completion script for an autoarg command",
+    )
+    parser.add_argument('shell', choices=SHELLS)
+    parser.add_argument('command', help="the command or group, as module:name")
+    parser.add_argument('--prog', help="the name it is invoked by (default: its name)")
+    opts = parser.parse_args(argv)
+
+    if ':' not in opts.command:
+        parser.error("command must be given as module:name")
+    sys.path.insert(0, '')
+    from .group import _import_target
+    runnable = _import_target(opts.command)
+    sys.stdout.write(completion_script(runnable, opts.shell, opts.prog))
+    sys.exit(0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,285 @@
+"""Serving a command from a warm, pre-forked daemon
+
+Starting Python, importing an application and building its parser can take far
+longer than the command itself. `Command.serve(socket_path)` does all of that once,
+then keeps `workers` forked processes waiting on a Unix socket. A client sends its
+argv, environment, working directory and stdin/stdout/stderr file descriptors; a
+worker adopts them, runs `Command.main()`, replies with the exit status and exits,
+and the daemon forks a fresh worker in its place, so no state carries over between
+invocations.
+
+The client side is small enough to skip importing the application at all:
+
+    python -m autoarg.daemon SOCKET module:command [ARGS...]
+
+forwards to the daemon if it is running and otherwise imports `module:command` and
+runs it in-process. Start the daemon with
+
+    python -m autoarg.daemon --serve [-j WORKERS] SOCKET module:command
+
+Signals (e.g. Ctrl-C) are not forwarded to the worker. Unix only.
+"""
+import array
+import json
+import os
+import socket
+import struct
+import sys
+from typing import NoReturn, Optional, Sequence
+
+__all__ = [
+    'client_main',
+    'forward',
+    'serve',
+]
+
+_LENGTH = struct.Struct('!I')
+_STATUS = struct.Struct('!i')
+_N_FDS = 3
+
+
+def serve(command, socket_path, *, workers: int = 4) -> NoReturn:
+    """Runs `command` for clients of `socket_path` until terminated (SIGTERM or SIGINT)
+    """
+    import signal
+
+    if not hasattr(os, 'fork') or not hasattr(socket, 'AF_UNIX'):
+        raise OSError("serving requires fork() and Unix sockets")
+    if workers < 1:
+        raise ValueError(f"workers must be positive, not {workers}")
+
+    _warm_up(command)
+    listener = _listen(os.fspath(socket_path))
+    children = set()
+
+    def spawn():
+        pid = os.fork()
+        if pid == 0:
+            status = 0
+            try:
+                signal.signal(signal.SIGTERM, signal.SIG_DFL)
+                signal.signal(signal.SIGINT, signal.SIG_DFL)
+                _work(listener, command)
+            except BaseException:
+                status = 1
+            finally:
+                os._exit(status)
+        children.add(pid)
+
+    def terminate(signum, frame):
+        raise SystemExit(0)
+
+    signal.signal(signal.SIGTERM, terminate)
+    signal.signal(signal.SIGINT, terminate)
+    try:
+        for _ in range(workers):
+            spawn()
+        while True:
+            pid, _ = os.wait()  # a worker exits after each invocation
+            children.discard(pid)
+            spawn()
+    finally:
+        for pid in children:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except OSError:
+                pass
+        listener.close()
+        try:
+            os.unlink(socket_path)
+        except OSError:
+            pass
+
+
+def _warm_up(command):
+    parser = command.parser
+    getattr(parser, '_parser', None)  # argparse too, for --help and errors
+    if command.is_async:
+        import asyncio  # noqa: F401
+
+
+def _listen(path: str) -> socket.socket:
+    if os.path.exists(path):
+        if _is_listening(path):
+            raise OSError(f"a daemon is already listening on {path}")
+        os.unlink(path)  # left behind by a daemon that died
+    listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    old_umask = os.umask(0o177)  # only the owner may connect
+    try:
+        listener.bind(path)
+    finally:
+        os.umask(old_umask)
+    listener.listen(64)
+    return listener
+
+
+def _is_listening(path: str) -> bool:
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        try:
+            sock.connect(path)
+        except OSError:
+            return False
+    return True
+
+
+def _work(listener: socket.socket, command):
+    conn, _ = listener.accept()
+    listener.close()
+    with conn:
+        request, fds = _receive_request(conn)
+        for sys_stream in (sys.stdout, sys.stderr):
+            sys_stream.flush()
+        for target, fd in enumerate(fds):
+            os.dup2(fd, target)
+            os.close(fd)
+        os.chdir(request['cwd'])
+        os.environ.clear()
+        os.environ.update(request['env'])
+        sys.argv = [request['prog'], *request['argv']]
+        status = _invoke(command, request['argv'])
+        conn.sendall(_STATUS.pack(status))
+
+
+def _invoke(command, argv) -> int:
+    try:
+        command.main(argv)
+    except SystemExit as exc:
+        status = _system_exit_status(exc)
+    except BaseException:
+        import traceback
+        traceback.print_exc()
+        status = 1
+    else:
+        status = 0
+    for stream in (sys.stdout, sys.stderr):
+        try:
+            stream.flush()
+        except (OSError, ValueError):
+            pass
+    return status
+
+
+def _system_exit_status(exc: SystemExit) -> int:
+    code = exc.code
+    if code is None:
+        return 0
+    if isinstance(code, int):
+        return code
+    print(code, file=sys.stderr)  # what the interpreter does with sys.exit("message")
+    return 1
+
+
+def _receive_request(conn: socket.socket):
+    fds = array.array('i')
+    data, ancdata, _, _ = conn.recvmsg(_LENGTH.size, socket.CMSG_SPACE(_N_FDS * fds.itemsize))
+    for level, kind, payload in ancdata:
+        if level == socket.SOL_SOCKET and kind == socket.SCM_RIGHTS:
+            fds.frombytes(payload[:len(payload) - len(payload) % fds.itemsize])
+    if len(data) < _LENGTH.size:
+        data += _receive_exactly(conn, _LENGTH.size - len(data))
+    length, = _LENGTH.unpack(data)
+    return json.loads(_receive_exactly(conn, length)), list(fds)
+
+
+def _receive_exactly(conn: socket.socket, n: int) -> bytes:
+    chunks = []
+    while n:
+        chunk = conn.recv(n)
+        if not chunk:
+            raise ConnectionError("connection closed mid-message")
+        chunks.append(chunk)
+        n -= len(chunk)
+    return b''.join(chunks)
+
+
+def forward(
+    socket_path,
+    argv: Optional[Sequence[str]] = None,
+    *,
+    prog: Optional[str] = None,
+    env=None,
+    cwd=None,
+    stdio: Sequence[int] = (0, 1, 2),
+) -> Optional[int]:
+    """Runs an invocation on the daemon at `socket_path`, returning its exit status
+
+    Returns `None` if no daemon is listening there, in which case the caller should
+    run the command itself.
+    """
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.connect(os.fspath(socket_path))
+    except (FileNotFoundError, ConnectionRefusedError):
+        sock.close()
+        return None
+    with sock:
+        request = json.dumps({
+            'argv': list(sys.argv[1:] if argv is None else argv),
+            'prog': prog or sys.argv[0],
+            'env': dict(os.environ if env is None else env),
+            'cwd': os.fspath(os.getcwd() if cwd is None else cwd),
+        }).encode()
+        for stream in (sys.stdout, sys.stderr):
+            stream.flush()
+        fds = array.array('i', stdio)
+        sock.sendmsg(
+            [_LENGTH.pack(len(request)), request],
+            [(socket.SOL_SOCKET, socket.SCM_RIGHTS, fds)],
+        )
+        try:
+            status, = _STATUS.unpack(_receive_exactly(sock, _STATUS.size))
+        except ConnectionError:
+            print(f"{prog or sys.argv[0]}: the daemon worker died", file=sys.stderr)
+            return 1
+    return status
+
+
+def client_main(socket_path, target: str, argv: Optional[Sequence[str]] = None) -> NoReturn:
+    """Forwards to the daemon, or imports `target` ("module:name") and runs it here
+    """
+    if argv is None:
+        argv = sys.argv[1:]
+    status = forward(socket_path, argv)
+    if status is None:
+        _resolve(target).main(argv)
+    sys.exit(status)
+
+
+def _resolve(target: str):
+    if ':' not in target:
+        raise SystemExit(f"command must be given as module:name, not {target!r}")
+    sys.path.insert(0, '')
+    from .group import _import_target
+    return _import_target(target)
+
+
+_USAGE = """\
+usage: python -m autoarg.daemon SOCKET module:command [ARGS...]
+       python -m autoarg.daemon --serve [-j WORKERS] SOCKET module:command"""
+
+
+def main(argv=None) -> NoReturn:
+    # parsed by hand: everything after the target belongs to the command
+    argv = list(sys.argv[1:] if argv is None else argv)
+    serving = workers = None
+    while argv and argv[0].startswith('-'):
+        option = argv.pop(0)
+        if option == '--serve':
+            serving = True
+        elif option in ('-j', '--workers') and argv:
+            workers = int(argv.pop(0))
+        else:
+            print(_USAGE, file=sys.stderr)
+            sys.exit(0 if option in ('-h', '--help') else 2)
+    if len(argv) < 2:
+        print(_USAGE, file=sys.stderr)
+        sys.exit(2)
+    socket_path, target, *args = argv
+    if serving:
+        serve(_resolve(target), socket_path, workers=workers or 4)
+    sys.argv = [target, *args]
+    client_main(socket_path, target, args)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,17 +1,57 @@
+import _thread  # rather than threading, which `import autoarg` doesn't need yet
+import collections.abc
 import functools
+import importlib
+import io
+import os
 import sys
-from inspect import signature, Parameter
-from typing import NoReturn, Callable, Tuple
+from contextlib import nullcontext
+from types import FunctionType
+from typing import TYPE_CHECKING, Any, NoReturn, Callable, Mapping, Tuple
 
-from .generate import generate_argparser
 from .types import _AnnotatedValue, _sensible_default_value
 
+if TYPE_CHECKING:
+    from .spec import CommandSpec
+    from .stats import Stats
+
+
+def command(maybe_fn=None, /, *, eager=None, map_over=None, workers=None, executor='thread',
+            chunksize=1, ordered=True, cache=None, **parser_kw):
+    """Turn a function into a `Command`
+
+    The parser is built the first time it is needed (`main()`, `run()` or `.parser`).
+    Pass `eager=True` (or set `AUTOARG_EAGER=1` in the environment) to build it
+    immediately so that annotation errors surface at decoration time.
+
+    With `map_over` naming the function's `*args` parameter, the function is called
+    once per `chunksize` elements of it, on a pool of `workers` threads or processes
+    (`executor`), and `run()` returns the list of results. See `autoarg.parallel`.
+
+    With `quiet=True`, `run()` and `arun()` raise `ParseError` for invalid arguments
+    without printing anything or formatting the usage, for commands embedded in
+    other programs; `--help` and `--version` raise one with status 0 and the text.
+    A command may be run from many threads at once either way.
+
+    With `cache` (`True` for the default location, a directory, or an
+    `autoarg.memo.ResultCache`), results are stored on disk, keyed by the parsed
+    arguments, and replayed instead of calling the function again; the command gets
+    a `--no-cache` flag to skip that. See `autoarg.memo`.
+    """
+    if eager is None:
+        eager = os.environ.get('AUTOARG_EAGER', '') not in ('', '0')
 
-def command(maybe_fn=None, /, **opts):
     def _decorator(fn):
-        parser = generate_argparser(fn)
-        _sanitize_defaults(fn)
-        return Command(fn, parser)
+        options = None
+        if map_over is not None:
+            options = _map_options(
+                fn, map_over, workers=workers, executor=executor,
+                chunksize=chunksize, ordered=ordered,
+            )
+        cmd = Command(fn, map_over=options, cache=cache, **parser_kw)
+        if eager:
+            cmd.parser
+        return cmd
 
     if maybe_fn is None:
         return _decorator
@@ -20,9 +60,26 @@ def command(maybe_fn=None, /, **opts):
 
 
 class Command:
-    def __init__(self, func: Callable, parser):
+    def __init__(self, func: Callable, parser=None, *, map_over=None, quiet=False, cache=None,
+                 **parser_kw):
         self._func = func
-        self.parser = parser
+        self._parser = parser
+        self._parser_lock = _thread.allocate_lock()
+        self._parser_kw = parser_kw
+        self._map = map_over
+        self.quiet = quiet
+        self.cache = None
+        if cache is not None and cache is not False:
+            from .memo import resolve_result_cache
+            self.cache = resolve_result_cache(cache)
+        self.stats = None
+        self._invoker = None  # (parser, _Invoker), see invoke()
+        if os.environ.get('AUTOARG_TRACE', '') not in ('', '0'):
+            from .stats import from_environment
+            self.stats = from_environment(func.__qualname__)
+        # generate_argparser needs the `Arg`s that _sanitize_defaults strips out
+        self._spec_func = _copy_function(func)
+        _sanitize_defaults(func)
         functools.update_wrapper(self, func)
         self.__annotations__ = {
             name: value
@@ -30,47 +87,356 @@ class Command:
             if not (name.startswith('_') and name.endswith('_'))
         }
 
+    @property
+    def parser(self):
+        if self._parser is None:
+            with self._parser_lock:  # one parser, however many threads ask for it first
+                if self._parser is None:
+                    from .generate import generate_argparser  # argparse & co. load on first use
+                    extra = []
+                    if self.cache is not None:
+                        from .memo import _NO_CACHE_ARGUMENT
+                        extra.append(_NO_CACHE_ARGUMENT)
+                    if _yields(self._func):
+                        from .output import _format_argument
+                        extra.append(_format_argument())
+                    self._parser = generate_argparser(
+                        self._spec_func, stats=self.stats, extra_arguments=extra,
+                        **self._parser_kw
+                    )
+        return self._parser
+
+    @parser.setter
+    def parser(self, parser):
+        self._parser = parser
+
+    @property
+    def spec(self) -> 'CommandSpec':
+        """The `autoarg.spec.CommandSpec` the parser was built from
+        """
+        spec = getattr(self.parser, 'spec', None)
+        if spec is None:
+            raise TypeError(f"{self.__name__}: the parser wasn't generated by autoarg")
+        return spec
+
+    def enable_stats(self, *, memory=False) -> 'Stats':
+        """Starts recording where invocations of the command spend their time
+
+        Returns the `autoarg.stats.Stats` (also `self.stats`) that each phase and
+        argument conversion is added to. With `memory=True`, the peak memory of each
+        phase is traced too, which slows everything down. Rebuilds a parser that was
+        already generated.
+        """
+        from .stats import Stats
+        self.stats = Stats(self._func.__qualname__, memory=memory)
+        if getattr(self._parser, 'spec', None) is not None:
+            self._parser = None
+        return self.stats
+
+    @property
+    def summary(self) -> str:
+        """The first line of the docstring, for listings of commands
+        """
+        doc = self._func.__doc__ or self._parser_kw.get('description') or ''
+        return doc.strip().split('\n', 1)[0]
+
+    def _set_prog(self, prog: str):
+        # only affects a parser that hasn't been built yet
+        if self._parser is None:
+            self._parser_kw['prog'] = prog
+
     def __call__(self, *args, **kwargs):
         return self._func(*args, **kwargs)
 
-    def main(self) -> NoReturn:
-        namespace = self.parser.parse_args()
-        args, kwargs = self._namespace_to_args(namespace)
-        ret = self._func(*args, **kwargs)
-        if ret is None:
-            sys.exit(0)
-        elif isinstance(ret, int):
-            sys.exit(ret)
-        else:
-            sys.exit(int(not ret))  # Truthy -> 0, Falsy -> 1
+    def __reduce__(self):
+        """Pickles by name where possible, along with the generated parser
+
+        Unpickling in another process imports the command's module and gives it the
+        parser (which pickles as its spec, see `autoarg.spec`) if it hasn't built one
+        yet, so the function isn't inspected again. Commands that can't be found by
+        name are rebuilt from the function and the parser instead, which means the
+        function has to be importable.
+        """
+        parser = self._parser if getattr(self._parser, 'spec', None) is not None else None
+        reference = (self.__module__, self.__qualname__)
+        try:
+            found = _resolve_command(reference)
+        except (ImportError, AttributeError):
+            found = None
+        if found is self:
+            return _unpickle_command, (reference, parser)
+        # the function lost its `Arg`s to _sanitize_defaults, so they come along with it
+        spec_func = self._spec_func
+        return _rebuild_command, (
+            self._func, (spec_func.__defaults__, spec_func.__kwdefaults__), self.parser,
+            self._map, self.quiet, self.cache, self._parser_kw,
+        )
+
+    def main(self, argv=None) -> NoReturn:
+        """Runs the command with `argv` (default: `sys.argv[1:]`) and exits
+
+        The exit status comes from the return value: 0 for None, an int as is, and 0 or
+        1 for anything else that is true or false. A returned iterator (e.g. of a
+        generator function) is streamed to stdout in the `--output-format`, and the
+        status comes from what the generator returns. See `autoarg.output`.
+        """
+        extras = {}
+        args, kwargs = self.parser.parse_call_args(argv, extras=extras)
+        if self._map is not None:
+            from .parallel import map_main
+            map_main(self, args, kwargs)
+        result = self._call(args, kwargs, refresh=extras.get('_no_cache_', False))
+        if _is_iterator(result):
+            result = self._stream(result, extras.get('_output_format_', 'lines'), args, kwargs)
+        sys.exit(_exit_status(result))
+
+    def _stream(self, items, format: str, args, kwargs):
+        from .output import _exit_after_broken_pipe, stream
+        try:
+            with self.stats.phase('output') if self.stats is not None else nullcontext():
+                return stream(items, format)
+        except BrokenPipeError:
+            sys.exit(_exit_after_broken_pipe())
+        finally:
+            self._close_files(args, kwargs)  # a generator opens its files as it runs
 
     def run(self, *str_args: str):
+        extras = {}
+        args, kwargs = self._parse(str_args, extras)
+        return self._call(args, kwargs, refresh=extras.get('_no_cache_', False))
+
+    async def arun(self, *str_args: str):
+        """Like `run()`, but awaitable; `async def` commands run on the current loop
+
+        Except when they are cached or `map_over` one of their parameters: those are
+        called as `run()` would, in the loop's default executor.
+        """
+        extras = {}
+        args, kwargs = self._parse(str_args, extras)
+        refresh = extras.get('_no_cache_', False)
+        if self._map is not None or self.is_async and self.cache is not None:
+            import asyncio
+            # waits for the call without blocking the loop; async calls get their own loop
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(
+                None, lambda: self._call(args, kwargs, refresh=refresh),
+            )
+        if not self.is_async:
+            return self._call(args, kwargs, refresh=refresh)
         try:
-            namespace = self.parser.parse_args(str_args)
+            with self.stats.phase('call') if self.stats is not None else nullcontext():
+                return await self._func(*args, **kwargs)
+        finally:
+            self._close_files(args, kwargs)
+
+    def invoke(self, mapping: Mapping[str, Any]):
+        """Calls the command with already-typed arguments instead of argument strings
+
+        `mapping` maps parameter names to values, which are checked and coerced against
+        the parameters' types the way their argument strings would have been converted:
+        an Enum member or its value, a tuple for a `Tuple`, a list for an `Append`, a
+        bool for a flag, an int for a `Count`. A string is converted as it would be on
+        the command line. Parameters left out get their defaults. Raises `ParseError`
+        for unknown, missing or invalid arguments, and never prints anything.
+        """
+        invoker = self._invoker
+        if invoker is None or invoker[0] is not self.parser:
+            from .invoke import _Invoker
+            invoker = self._invoker = (self.parser, _Invoker(self.spec, self._func))
+        args, kwargs = invoker[1](mapping)
+        return self._call(args, kwargs)
+
+    def serve_jsonl(self, stdin=None, stdout=None, **kwargs) -> int:
+        """Invokes the command once per JSON object line of `stdin`, answering on `stdout`
+
+        A worker protocol for driving the command from another program; see
+        `autoarg.invoke.serve_jsonl`. Returns the number of requests that failed.
+        """
+        from .invoke import serve_jsonl
+        return serve_jsonl(self, stdin, stdout, **kwargs)
+
+    def _parse(self, str_args, extras=None):
+        if self.quiet:
+            return self.parser.parse_call_args(str_args, exit_on_error=False, extras=extras)
+        try:
+            return self.parser.parse_call_args(str_args, extras=extras)
         except SystemExit as err:
             raise TypeError(str(err))
-        args, kwargs = self._namespace_to_args(namespace)
-        return self._func(*args, **kwargs)
 
-    def _namespace_to_args(self, namespace) -> Tuple[list, dict]:
-        args = []
-        kwargs = {}
-        for name, param in signature(self._func).parameters.items():
-            if hasattr(namespace, name):
-                value = getattr(namespace, name)
-                if param.kind in (Parameter.POSITIONAL_OR_KEYWORD, Parameter.POSITIONAL_ONLY):
-                    args.append(value)
-                elif param.kind is Parameter.VAR_POSITIONAL:
-                    args.extend(value)
-                elif param.kind is Parameter.KEYWORD_ONLY:
-                    kwargs[name] = value
-        return args, kwargs
+    @property
+    def is_async(self) -> bool:
+        return _is_coroutine_function(self._func)
+
+    def _call(self, args, kwargs, *, refresh=False):
+        """Calls the function with parsed arguments, closing any files it opened after
+
+        `async def` functions are run to completion on a new event loop. Cached commands
+        replay a stored result instead, unless `refresh`.
+        """
+        if self.cache is not None:
+            return self.cache.call(self, args, kwargs, refresh=refresh)
+        return self._call_uncached(args, kwargs)
+
+    def _call_uncached(self, args, kwargs):
+        if self.stats is not None:
+            with self.stats.phase('call'):
+                return self._call_unrecorded(args, kwargs)
+        return self._call_unrecorded(args, kwargs)
+
+    def _call_unrecorded(self, args, kwargs):
+        if self._map is not None:
+            from .parallel import map_run
+            return map_run(self, args, kwargs)
+        try:
+            if self.is_async:
+                import asyncio
+                result = asyncio.run(self._func(*args, **kwargs))
+            else:
+                result = self._func(*args, **kwargs)
+        except BaseException:
+            self._close_files(args, kwargs)
+            raise
+        if _is_iterator(result) and getattr(self.parser, 'opens_files', False):
+            # a generator only uses its files as it runs, so they're closed once it's done
+            return _closing(result, self._close_files, args, kwargs)
+        self._close_files(args, kwargs)
+        return result
+
+    def _close_files(self, args, kwargs):
+        if getattr(self.parser, 'opens_files', False):
+            from .files import close_files
+            close_files(args)
+            close_files(kwargs.values())
+
+    def serve(self, socket_path, *, workers: int = 4) -> NoReturn:
+        """Serves invocations over a Unix socket from pre-forked workers
+
+        Pair with `python -m autoarg.daemon SOCKET module:name ...` (or
+        `autoarg.daemon.forward`) on the client side. See `autoarg.daemon`.
+        """
+        from .daemon import serve
+        serve(self, socket_path, workers=workers)
+
+    def run_many(self, argvs, *, workers=None, ordered=True, executor='thread'):
+        """Runs the command once per argv in `argvs`, yielding a `BatchResult` for each
+
+        Parse errors and exceptions are captured per item instead of stopping the batch,
+        and nothing is printed for them. See `autoarg.batch.run_many`.
+        """
+        from .batch import run_many
+        return run_many(self, argvs, workers=workers, ordered=ordered, executor=executor)
+
+    def run_file(self, file=None, **kwargs):
+        """`run_many` over the shell-quoted argv lines of `file` (default: stdin)
+        """
+        from .batch import run_file
+        return run_file(self, file, **kwargs)
+
+    def batch_main(self, file=None, **kwargs) -> NoReturn:
+        """Like `main()`, but runs every argv line of `file` (default: stdin)
+        """
+        from .batch import batch_main
+        batch_main(self, file, **kwargs)
+
+
+def _resolve_command(reference: Tuple[str, str]) -> Command:
+    module, qualname = reference
+    obj = sys.modules.get(module) or importlib.import_module(module)
+    for attr in qualname.split('.'):
+        obj = getattr(obj, attr)
+    return obj
+
+
+def _unpickle_command(reference: Tuple[str, str], parser) -> Command:
+    command = _resolve_command(reference)
+    if parser is not None and command._parser is None and command.stats is None:
+        command._parser = parser
+    return command
+
+
+def _rebuild_command(func: Callable, spec_defaults, parser, map_over, quiet, cache,
+                     parser_kw) -> Command:
+    command = Command(func, parser, map_over=map_over, quiet=quiet, cache=cache, **parser_kw)
+    # so that a parser generated again (e.g. by enable_stats) has the `Arg`s' help
+    command._spec_func.__defaults__, command._spec_func.__kwdefaults__ = spec_defaults
+    return command
+
+
+def _exit_status(ret) -> int:
+    if ret is None:
+        return 0
+    elif isinstance(ret, int):
+        return ret
+    else:
+        return int(not ret)  # Truthy -> 0, Falsy -> 1
+
+
+_CO_VARARGS = 0x04  # inspect.CO_VARARGS
+_CO_GENERATOR = 0x20  # inspect.CO_GENERATOR
+_CO_COROUTINE = 0x80  # inspect.CO_COROUTINE, without importing inspect
+
+
+def _map_options(fn, param: str, **options):
+    code = getattr(fn, '__code__', None)
+    if code is None or not code.co_flags & _CO_VARARGS:
+        raise TypeError(f"map_over: {fn.__qualname__} has no *{param} parameter")
+    varargs = code.co_varnames[code.co_argcount + code.co_kwonlyargcount]
+    if varargs != param:
+        raise TypeError(f"map_over: expected {varargs!r} (the *args parameter), not {param!r}")
+    from .parallel import MapOptions
+    return MapOptions(param, **options)
+
+
+def _is_coroutine_function(fn) -> bool:
+    code = getattr(fn, '__code__', None)
+    return code is not None and bool(code.co_flags & _CO_COROUTINE)
+
+
+def _yields(fn) -> bool:
+    """Whether `fn` is a generator function, or annotated to return an iterator
+    """
+    code = getattr(fn, '__code__', None)
+    if code is not None and code.co_flags & _CO_GENERATOR:
+        return True
+    returns = getattr(fn, '__annotations__', {}).get('return')
+    origin = getattr(returns, '__origin__', returns)  # Iterator[T] -> Iterator
+    return origin in (
+        collections.abc.Iterator, collections.abc.Iterable, collections.abc.Generator,
+    )
+
+
+def _is_iterator(value) -> bool:
+    # files iterate over their lines, but are returned to be used as files
+    return hasattr(type(value), '__next__') and not isinstance(value, io.IOBase)
+
+
+def _closing(items, close, *close_args):
+    """Yields from `items`, then calls `close`, also if it is closed (or dropped) early
+    """
+    try:
+        return (yield from items)
+    finally:
+        close(*close_args)
+
+
+def _copy_function(fn):
+    """Makes a shallow copy of a function that keeps its own defaults
+    """
+    if not isinstance(fn, FunctionType):
+        return fn
+    copy = FunctionType(fn.__code__, fn.__globals__, fn.__name__, fn.__defaults__, fn.__closure__)
+    copy.__kwdefaults__ = fn.__kwdefaults__
+    copy.__annotations__ = fn.__annotations__
+    copy.__qualname__ = fn.__qualname__
+    copy.__module__ = fn.__module__
+    copy.__doc__ = fn.__doc__
+    copy.__dict__.update(fn.__dict__)
+    return copy
 
 
 def _sanitize_defaults(fn):
     """Strips out `Arg`s and headers from the function's defaults
     """
-    sig = signature(fn)
     # TODO: handle ... properly for obvious default values, e.g. Count, bool
     if fn.__defaults__ is not None:
         fn.__defaults__ = tuple(
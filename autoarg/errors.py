@@ -0,0 +1,28 @@
+from typing import Optional
+
+__all__ = [
+    'ParseError',
+]
+
+
+class ParseError(Exception):
+    """A command line that could not be parsed
+
+    Raised instead of printing the usage and exiting when a parse is asked not to exit.
+    Besides the full `message`, it tells what went wrong where it can: `argument` is the
+    argument at fault as the message names it (`'--size'`, `'src'`), `token` the
+    command-line string that was rejected, and `reason` the message without the
+    argument. `argument` and `token` are None when they don't apply, e.g. for missing
+    arguments.
+
+    `status` is what the parse would have exited with: 2 for errors, and 0 for `--help`
+    and `--version`, whose `message` is then the text they would have printed.
+    """
+    def __init__(self, message: str, *, argument: Optional[str] = None,
+                 token: Optional[str] = None, reason: Optional[str] = None, status: int = 2):
+        super().__init__(message)
+        self.message = message
+        self.argument = argument
+        self.token = token
+        self.reason = message if reason is None else reason
+        self.status = status
@@ -0,0 +1,391 @@
+"""A parse engine that bypasses argparse for the common case
+
+`_FastParser` interprets the same `CommandSpec` that would be replayed onto an
+`ArgumentParser`, but parses with a precomputed option lookup table and a single
+linear pass over argv. It only handles what it can reproduce exactly; anything
+else - errors, `--help`, abbreviated long options, `--` or unusual nargs - raises
+`_Fallback`, and the caller re-parses the same argv with argparse. That way the
+results (and error messages) are always argparse's, only faster.
+"""
+import re
+import sys
+from argparse import SUPPRESS, ArgumentTypeError, Namespace
+from operator import itemgetter
+from typing import Any, Dict, List, Optional, Sequence, Set
+
+from .choices import _FlagChoiceAction
+
+_NEGATIVE_NUMBER = re.compile(r'^-\d+$|^-\d*\.\d+$')
+
+_UNBOUNDED = sys.maxsize
+
+_CONSTANT_ACTIONS = {
+    'store_const': (None, None),
+    'store_true': (True, False),
+    'store_false': (False, True),
+    'append_const': (None, None),
+    'count': (None, None),
+}
+
+
+def _first_chars(args: Sequence[str]) -> str:
+    """The first character of each string (a space for empty ones), to find options with `find`
+    """
+    if '' in args:
+        return ''.join([arg[:1] or ' ' for arg in args])
+    return ''.join(map(itemgetter(0), args))
+
+
+class _Fallback(Exception):
+    """Raised when argparse has to take over
+    """
+
+
+class _Unsupported(Exception):
+    """Raised while building when the spec uses something the fast engine doesn't handle
+    """
+
+
+class _FastAction:
+    __slots__ = (
+        'dest', 'action', 'option_strings', 'nargs', 'const', 'default',
+        'type', 'choices', 'required', 'mutex', 'min_args', 'max_args', 'flag_values',
+    )
+
+    def __init__(self, names: Sequence[str], kwargs: Dict[str, Any], defaults: Dict[str, Any]):
+        kwargs = dict(kwargs)
+        for ignored in ('help', 'metavar'):
+            kwargs.pop(ignored, None)
+
+        self.action = kwargs.pop('action', None) or 'store'
+        self.flag_values = kwargs.pop('flag_values', None)
+        if self.action is _FlagChoiceAction:
+            self.action = 'flag_choice'  # a large Literal flag group (see autoarg.choices)
+        elif self.action not in ('store', 'append') and self.action not in _CONSTANT_ACTIONS:
+            raise _Unsupported(self.action)
+        self.nargs = kwargs.pop('nargs', None)
+        self.type = kwargs.pop('type', None)
+        self.choices = kwargs.pop('choices', None)
+        self.mutex: Optional[int] = None
+
+        if names and names[0][:1] == '-':
+            self.option_strings = tuple(names)
+            if 'dest' in kwargs:
+                self.dest = kwargs.pop('dest')
+            else:
+                long_names = [name for name in names if name[:2] == '--']
+                self.dest = (long_names or names)[0].lstrip('-').replace('-', '_')
+            self.required = kwargs.pop('required', False)
+            if self.nargs not in (None, '+') and not isinstance(self.nargs, int):
+                raise _Unsupported(self.nargs)  # options with optional values
+        else:
+            self.option_strings = ()
+            self.dest, = names
+            if self.nargs not in (None, '?', '*', '+') and not isinstance(self.nargs, int):
+                raise _Unsupported(self.nargs)  # REMAINDER and friends
+            self.required = self.nargs not in ('?', '*') or (
+                self.nargs == '*' and 'default' not in kwargs
+            )
+            kwargs.pop('required', None)
+
+        const, default = _CONSTANT_ACTIONS.get(self.action, (None, None))
+        self.const = kwargs.pop('const', const)
+        if 'default' in kwargs:
+            self.default = kwargs.pop('default')
+        elif self.dest in defaults:
+            self.default = defaults[self.dest]
+        else:
+            self.default = default
+
+        if kwargs:
+            raise _Unsupported(kwargs)
+        if self.type is not None and not callable(self.type):
+            raise _Unsupported(self.type)
+
+        if self.action in _CONSTANT_ACTIONS or self.flag_values is not None:
+            self.min_args = self.max_args = 0
+        elif self.nargs is None:
+            self.min_args = self.max_args = 1
+        elif isinstance(self.nargs, int):
+            self.min_args = self.max_args = self.nargs
+        else:
+            self.min_args = 1 if self.nargs == '+' else 0
+            self.max_args = 1 if self.nargs == '?' else _UNBOUNDED
+
+    def convert(self, arg_string: str):
+        if self.type is None:
+            value = arg_string
+        else:
+            try:
+                value = self.type(arg_string)
+            except (ArgumentTypeError, TypeError, ValueError):
+                raise _Fallback
+        if self.choices is not None and value not in self.choices:
+            raise _Fallback
+        return value
+
+    def values(self, arg_strings: List[str]):
+        """Same as `argparse.ArgumentParser._get_values`, minus the `--` handling
+        """
+        if not arg_strings and self.nargs == '?':
+            value = self.default
+            if isinstance(value, str):
+                value = self.convert(value)
+            return value
+        if not arg_strings and self.nargs == '*':
+            value = self.default if self.default is not None else arg_strings
+            if self.choices is not None and value not in self.choices:
+                raise _Fallback
+            return value
+        if len(arg_strings) == 1 and self.nargs in (None, '?'):
+            return self.convert(arg_strings[0])
+        if self.type is None and self.choices is None:
+            return list(arg_strings)  # e.g. Array[...], converted later all at once
+        return [self.convert(arg) for arg in arg_strings]
+
+    def take(self, values: Dict[str, Any], arg_strings: List[str], owned: Set[str],
+             option_string: Optional[str] = None):
+        """Stores the action's value(s) in `values`
+
+        `owned` holds the dests whose value was set during this parse; lists there can be
+        appended to in place rather than copied every time like argparse does.
+        """
+        action = self.action
+        if action == 'store':
+            values[self.dest] = self.values(arg_strings)
+        elif action == 'count':
+            count = values.get(self.dest)
+            values[self.dest] = (0 if count is None else count) + 1
+        elif action == 'flag_choice':
+            value = self.flag_values[option_string]
+            if self.dest in owned and values[self.dest] != value:
+                raise _Fallback  # two flags of the group: argparse reports the conflict
+            values[self.dest] = value
+            owned.add(self.dest)
+        elif action == 'append' or action == 'append_const':
+            items = values.get(self.dest)
+            if self.dest not in owned:
+                if items is None:
+                    items = []
+                elif type(items) is list:
+                    items = items[:]
+                else:
+                    import copy
+                    items = copy.copy(items)
+                values[self.dest] = items
+                owned.add(self.dest)
+            items.append(self.values(arg_strings) if action == 'append' else self.const)
+        else:
+            values[self.dest] = self.const
+
+
+class _FastParser:
+    """Parses argv into a `Namespace` without going through argparse
+
+    Build with `from_spec()`, which returns `None` when the spec can't be handled.
+    """
+    def __init__(self, actions: List[_FastAction], mutex_required: List[bool], help_options):
+        self._actions = actions
+        self._positionals = [action for action in actions if not action.option_strings]
+        self._options: Dict[str, _FastAction] = {}
+        for action in actions:
+            for option_string in action.option_strings:
+                if option_string in self._options or option_string in help_options:
+                    raise _Unsupported(f"conflicting option string {option_string}")
+                if _NEGATIVE_NUMBER.match(option_string):
+                    raise _Unsupported("options that look like negative numbers")
+                if option_string[:2] != '--' and len(option_string) != 2:
+                    raise _Unsupported("single-dash long options")
+                self._options[option_string] = action
+        self._help_options = frozenset(help_options)
+        self._mutex_required = mutex_required
+
+    @classmethod
+    def from_spec(cls, spec, *, add_help=True, prefix_chars='-', argument_default=None,
+                  fromfile_prefix_chars=None, **_) -> Optional['_FastParser']:
+        if prefix_chars != '-' or argument_default is not None or fromfile_prefix_chars:
+            return None
+        try:
+            return cls._from_arguments(spec.arguments, add_help)
+        except _Unsupported:
+            return None
+
+    @classmethod
+    def _from_arguments(cls, arguments, add_help):
+        actions: List[_FastAction] = []
+        defaults: Dict[str, Any] = {}
+        mutex_of_container: Dict[int, int] = {}
+        mutex_required: List[bool] = []
+        n_containers = 1
+        for arg in arguments:
+            method, kwargs = arg.method, arg.options
+            if method == 'add_argument':
+                action = _FastAction(arg.names, kwargs, defaults)
+                action.mutex = mutex_of_container.get(arg.container)
+                actions.append(action)
+            elif method == 'add_argument_group':
+                n_containers += 1
+            elif method == 'add_mutually_exclusive_group':
+                mutex_of_container[n_containers] = len(mutex_required)
+                mutex_required.append(kwargs.get('required', False))
+                n_containers += 1
+            elif method == 'set_defaults':
+                defaults.update(kwargs)
+                for action in actions:
+                    if action.dest in kwargs:
+                        action.default = kwargs[action.dest]
+            else:
+                raise _Unsupported(method)
+        help_options = ('-h', '--help') if add_help else ()
+        return cls(actions, mutex_required, help_options)
+
+    def parse_args(self, args: Optional[Sequence[str]] = None) -> Namespace:
+        """Parses `args` (default: `sys.argv[1:]`), raising `_Fallback` if it can't
+        """
+        if args is None:
+            args = sys.argv[1:]
+        options = self._options
+        n = len(args)
+
+        values: Dict[str, Any] = {}
+        for action in self._actions:
+            if action.dest not in values and action.default is not SUPPRESS:
+                values[action.dest] = action.default
+
+        taken = set()
+        owned: Set[str] = set()
+        mutex_taken: Dict[int, _FastAction] = {}
+        # consecutive positional strings, split wherever an option interrupts them
+        runs: List[List[str]] = []
+        heads = _first_chars(args)
+
+        i = 0
+        while i < n:
+            arg = args[i]
+            if not arg or arg[0] != '-' or arg == '-' or _NEGATIVE_NUMBER.match(arg):
+                start = i
+                i = heads.find('-', i + 1)
+                while i != -1 and (args[i] == '-' or _NEGATIVE_NUMBER.match(args[i])):
+                    i = heads.find('-', i + 1)
+                if i == -1:
+                    i = n
+                runs.append(list(args[start:i]))
+                continue
+            i += 1
+
+            explicit = None
+            option_string = arg
+            action = options.get(arg)
+            if action is None:
+                if arg in self._help_options or arg == '--':
+                    raise _Fallback
+                if arg[1] == '-':
+                    option_string, eq, explicit = arg.partition('=')
+                    action = options.get(option_string) if eq else None
+                else:
+                    name, eq, value = arg.partition('=')
+                    if eq and name in options:
+                        option_string, explicit = name, value
+                    else:
+                        option_string, explicit = arg[:2], arg[2:]
+                    action = options.get(option_string)
+                if action is None:
+                    raise _Fallback  # unknown, abbreviated or help option
+
+            while True:
+                if action.max_args:
+                    if explicit is not None:
+                        if action.min_args != 1:
+                            raise _Fallback
+                        arg_strings = [explicit]
+                    else:
+                        end = i + action.min_args
+                        if end > n:
+                            raise _Fallback
+                        if action.max_args > action.min_args:
+                            # nargs='+': like argparse, take everything up to the next option
+                            while end < n and (
+                                args[end][:1] != '-' or args[end] == '-'
+                                or _NEGATIVE_NUMBER.match(args[end])
+                            ):
+                                end += 1
+                        arg_strings = list(args[i:end])
+                        for value in arg_strings:
+                            if (value[:1] == '-' and value != '-'
+                                    and not _NEGATIVE_NUMBER.match(value)):
+                                raise _Fallback  # argparse would see an option here
+                        i = end
+                    explicit = None
+                else:
+                    arg_strings = []
+
+                if action.mutex is not None:
+                    other = mutex_taken.setdefault(action.mutex, action)
+                    if other is not action:
+                        raise _Fallback
+                action.take(values, arg_strings, owned, option_string)
+                taken.add(action)
+
+                if explicit is None:
+                    break
+                # a cluster of short flags, e.g. -xvf
+                if arg[1] == '-' or not explicit:
+                    raise _Fallback
+                option_string = '-' + explicit[0]
+                action = options.get(option_string)
+                if action is None:
+                    raise _Fallback
+                explicit = explicit[1:] or None
+
+        self._take_positionals(values, runs, owned)
+
+        for action in self._actions:
+            if action.option_strings and action not in taken:
+                if action.required:
+                    raise _Fallback
+                default = action.default
+                if (
+                    default is not None and isinstance(default, str)
+                    and values.get(action.dest) is default
+                ):
+                    values[action.dest] = action.convert(default)
+
+        for group, required in enumerate(self._mutex_required):
+            if required and group not in mutex_taken:
+                raise _Fallback
+
+        return Namespace(**values)
+
+    def _take_positionals(self, values: Dict[str, Any], runs: List[List[str]], owned: Set[str]):
+        """Distributes positional strings the way argparse's `consume_positionals` does
+
+        Each run is matched against as many of the remaining positionals as can take
+        it, each one greedily taking as much as the following ones allow.
+        """
+        positionals = self._positionals
+        n_positionals = len(positionals)
+        j = 0
+        for run in runs:
+            k = len(run)
+            m = needed = 0
+            while j + m < n_positionals and needed + positionals[j + m].min_args <= k:
+                needed += positionals[j + m].min_args
+                m += 1
+
+            start = 0
+            for action in positionals[j:j + m]:
+                needed -= action.min_args
+                count = min(action.max_args, k - start - needed)
+                action.take(values, run[start:start + count], owned)
+                start += count
+            j += m
+
+            if start < k:
+                raise _Fallback  # unrecognized arguments
+
+        # argparse always makes a final attempt with no strings left
+        while j < n_positionals and positionals[j].min_args == 0:
+            positionals[j].take(values, [], owned)
+            j += 1
+        if j < n_positionals:
+            raise _Fallback  # missing positionals
@@ -0,0 +1,381 @@
+"""Lazily opened `File[...]` arguments
+
+`argparse.FileType` opens every file while parsing, so a command taking
+`*files: File['r']` holds one descriptor per path before it has read any of them.
+`File[mode]` produces `LazyFile`s instead: parsing only checks that the file can be
+opened, the file is opened on first use, and `Command` closes whatever was opened
+once the function returns. (So a `File['w']` that is never written to is never
+created either.)
+
+Reading modes recognise gzip, bzip2 and xz input by its magic bytes and decompress
+it transparently. `File['mmap']` maps the file read-only instead of opening it, for
+zero-copy scanning of large inputs.
+
+`AsyncFile[mode]` produces `AsyncLazyFile`s, whose reads and writes run on the
+event loop's default executor so that many files can be consumed concurrently.
+
+`JSON` arguments may name a file to parse instead (`@path`, or `-` for stdin), and
+`JSONLines` produces `JSONRecords`, which decode one record at a time while the file
+is read in large chunks, so arbitrarily large dumps are processed in constant memory.
+Both take their decoder from `Arg(decoder=...)`: any `json.loads` work-alike that
+accepts `str` and `bytes` (e.g. `orjson.loads`), with `json.loads` as the default.
+"""
+import _thread
+import errno
+import importlib
+import io
+import os
+import stat
+import sys
+from argparse import ArgumentTypeError
+
+from .spec import _ByValue
+
+__all__ = [
+    'AsyncLazyFile',
+    'JSONRecords',
+    'LazyFile',
+]
+
+_MAGIC = [
+    (b'\x1f\x8b', 'gzip'),
+    (b'BZh', 'bz2'),
+    (b'\xfd7zXZ\x00', 'lzma'),
+]
+_MAGIC_LENGTH = max(len(magic) for magic, _ in _MAGIC)
+
+# a file shared by the calls of a parallel map may be used by several threads at once
+_open_lock = _thread.allocate_lock()
+
+
+class LazyFile:
+    """A file argument that is opened the first time it is used
+
+    Attribute access, iteration and `with` are forwarded to the opened file, so it
+    can be used wherever the file object itself would be. In `'mmap'` mode the opened
+    object is a read-only `mmap.mmap` (or a `memoryview` of the contents when the input
+    is stdin, empty or compressed).
+    """
+    __slots__ = ('path', 'mode', 'encoding', '_file', '_resources')
+
+    def __init__(self, path: str, mode: str = 'r', encoding=None):
+        self.path = path
+        self.mode = mode
+        self.encoding = encoding
+        self._file = None
+        self._resources = []
+
+    @property
+    def name(self) -> str:
+        return self.path
+
+    @property
+    def is_open(self) -> bool:
+        return self._file is not None
+
+    @property
+    def reading(self) -> bool:
+        return self.mode == 'mmap' or 'r' in self.mode and '+' not in self.mode
+
+    def open(self):
+        """The underlying file object (or mapping), opening it if necessary
+        """
+        if self._file is None:
+            with _open_lock:
+                if self._file is None:
+                    if self.path == '-':
+                        self._file = self._open_std()
+                    elif self.mode == 'mmap':
+                        self._file = self._open_mmap()
+                    else:
+                        self._file = self._open_path()
+        return self._file
+
+    def _open_std(self):
+        stream = sys.stdin if self.reading else sys.stdout
+        if self.mode == 'mmap':
+            return memoryview(stream.buffer.read())
+        return stream.buffer if 'b' in self.mode else stream
+
+    def _open_path(self):
+        if not self.reading:
+            return self._track(open(self.path, self.mode, encoding=self.encoding))
+        raw = self._track(open(self.path, 'rb'))
+        opener = _compression_of(raw)
+        if opener is None:
+            if 'b' in self.mode:
+                return raw
+            return self._track(io.TextIOWrapper(raw, encoding=self.encoding))
+        text_mode = 'rb' if 'b' in self.mode else 'rt'
+        return self._track(opener(raw, text_mode, encoding=self.encoding))
+
+    def _open_mmap(self):
+        import mmap
+        raw = self._track(open(self.path, 'rb'))
+        opener = _compression_of(raw)
+        if opener is not None:
+            with opener(raw, 'rb') as decompressed:
+                return memoryview(decompressed.read())
+        if os.fstat(raw.fileno()).st_size == 0:
+            return memoryview(b'')  # empty files can't be mapped
+        return self._track(mmap.mmap(raw.fileno(), 0, access=mmap.ACCESS_READ))
+
+    def _track(self, resource):
+        self._resources.append(resource)
+        return resource
+
+    def close(self):
+        """Closes the file if it was opened; stdin and stdout are left alone
+        """
+        resources, self._resources = self._resources, []
+        self._file = None
+        for resource in reversed(resources):
+            try:
+                resource.close()
+            except BufferError:
+                pass  # a mapping the caller still holds views of; left to the GC
+
+    def __enter__(self):
+        return self.open()
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def __iter__(self):
+        return iter(self.open())
+
+    def __getattr__(self, attr):
+        if attr[:1] == '_':
+            raise AttributeError(attr)  # don't open the file for copy/pickle probing
+        return getattr(self.open(), attr)
+
+    def __eq__(self, other):
+        if not isinstance(other, LazyFile):
+            return NotImplemented
+        return (self.path, self.mode, self.encoding) == (other.path, other.mode, other.encoding)
+
+    def __hash__(self):
+        return hash((self.path, self.mode, self.encoding))
+
+    def __fspath__(self) -> str:
+        return self.path
+
+    def __repr__(self):
+        state = 'open' if self.is_open else 'unopened'
+        return f"<LazyFile {self.path!r} mode={self.mode!r} {state}>"
+
+
+def _compression_of(raw):
+    """The `open` function of the compression module matching `raw`'s first bytes
+    """
+    head = raw.peek(_MAGIC_LENGTH)[:_MAGIC_LENGTH] if hasattr(raw, 'peek') else b''
+    for magic, module in _MAGIC:
+        if head.startswith(magic):
+            return importlib.import_module(module).open
+    return None
+
+
+class AsyncLazyFile(LazyFile):
+    """A `LazyFile` whose I/O is awaited, for use in `async def` commands
+
+    `read`, `readline`, `write` and `aopen` are coroutines that run the blocking call
+    in the event loop's default executor; `async for` yields lines, fetched in batches.
+    The synchronous file object is still available from `open()`.
+    """
+    __slots__ = ()
+
+    _BATCH_SIZE = 1 << 16
+
+    async def aopen(self):
+        if self.is_open:
+            return self._file
+        return await _in_executor(self.open)
+
+    async def read(self, size: int = -1):
+        return await _in_executor((await self.aopen()).read, size)
+
+    async def readline(self, size: int = -1):
+        return await _in_executor((await self.aopen()).readline, size)
+
+    async def write(self, data) -> int:
+        return await _in_executor((await self.aopen()).write, data)
+
+    async def aclose(self):
+        await _in_executor(self.close)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.aclose()
+
+    def __aiter__(self):
+        return self._lines()
+
+    async def _lines(self):
+        file = await self.aopen()
+        while True:
+            lines = await _in_executor(file.readlines, self._BATCH_SIZE)
+            if not lines:
+                return
+            for line in lines:
+                yield line
+
+    def __repr__(self):
+        return '<Async' + super().__repr__()[1:]
+
+
+async def _in_executor(fn, *args):
+    import asyncio
+    return await asyncio.get_running_loop().run_in_executor(None, fn, *args)
+
+
+class _FileFactory(_ByValue):
+    """The argparse `type` for `File[mode]`: checks the path and returns a `LazyFile`
+    """
+    def __init__(self, mode: str = 'r', encoding=None, *, asynchronous=False):
+        self.mode = mode
+        self.encoding = encoding
+        self.asynchronous = asynchronous
+        self.__name__ = 'file'
+
+    def _new(self, path: str) -> LazyFile:
+        cls = AsyncLazyFile if self.asynchronous else LazyFile
+        return cls(path, self.mode, self.encoding)
+
+    def __call__(self, path: str) -> LazyFile:
+        file = self._new(path)
+        if path != '-':
+            error = _access_error(path, reading=file.reading)
+            if error is not None:
+                raise ArgumentTypeError(f"can't open '{path}': {error}")
+        return file
+
+    def __repr__(self):
+        return f"{'AsyncFile' if self.asynchronous else 'File'}[{self.mode!r}]"
+
+
+class JSONRecords(LazyFile):
+    """The records of a JSON Lines file, decoded as they are iterated over
+
+    The file is read in chunks of `_CHUNK_SIZE` bytes; blank lines are skipped. A record
+    that fails to decode raises `ValueError` naming the file and line.
+    """
+    __slots__ = ('decoder',)
+
+    _CHUNK_SIZE = 1 << 20
+
+    def __init__(self, path: str, decoder=None):
+        super().__init__(path, 'rb')
+        self.decoder = decoder
+
+    def __iter__(self):
+        decode = self.decoder or _default_decoder()
+        read = self.open().read
+        partial = []  # pieces of a line that spans chunks
+        line_number = 0
+        while True:
+            chunk = read(self._CHUNK_SIZE)
+            if not chunk:
+                break
+            *lines, rest = chunk.split(b'\n')
+            if lines and partial:
+                partial.append(lines[0])
+                lines[0] = b''.join(partial)
+                partial = []
+            for line in lines:
+                line_number += 1
+                if line.strip():
+                    yield self._decode(decode, line, line_number)
+            partial.append(rest)
+        line = b''.join(partial)
+        if line.strip():
+            yield self._decode(decode, line, line_number + 1)
+
+    def _decode(self, decode, line: bytes, line_number: int):
+        try:
+            return decode(line)
+        except ValueError as err:
+            raise ValueError(f"{self.path}, line {line_number}: {err}") from err
+
+    def __repr__(self):
+        state = 'open' if self.is_open else 'unopened'
+        return f"<JSONRecords {self.path!r} {state}>"
+
+
+def _default_decoder():
+    import json  # only commands that take JSON pay for importing it
+    return json.loads
+
+
+class _JSONFactory(_ByValue):
+    """The argparse `type` for `JSON`: a document, or `@path` or `-` to read one from
+    """
+    def __init__(self, decoder=None):
+        self.decoder = decoder
+        self.__name__ = 'json'  # argparse names it in "invalid json value" errors
+
+    def __call__(self, text: str):
+        decode = self.decoder or _default_decoder()
+        if text == '-' or text.startswith('@'):
+            path = text[1:] or '-'
+            if path != '-':
+                error = _access_error(path, reading=True)
+                if error is not None:
+                    raise ArgumentTypeError(f"can't open '{path}': {error}")
+            with LazyFile(path, 'rb') as file:
+                text = file.read()
+        return decode(text)
+
+    def __repr__(self):
+        return 'JSON'
+
+
+class _JSONLinesFactory(_FileFactory):
+    """The argparse `type` for `JSONLines`: checks the path and returns `JSONRecords`
+    """
+    def __init__(self, decoder=None):
+        super().__init__('rb')
+        self.decoder = decoder
+        self.__name__ = 'jsonlines'
+
+    def _new(self, path: str) -> LazyFile:
+        return JSONRecords(path, self.decoder)
+
+    def __call__(self, path: str) -> LazyFile:
+        return super().__call__(path[1:] if path.startswith('@') else path)
+
+    def __repr__(self):
+        return 'JSONLines'
+
+
+def _access_error(path: str, *, reading: bool):
+    """Why `path` can't be opened, as cheaply as that can be determined without opening it
+    """
+    try:
+        mode = os.stat(path).st_mode
+    except FileNotFoundError:
+        if reading:
+            return os.strerror(errno.ENOENT)
+        target = os.path.dirname(path) or '.'  # it will be created
+    except OSError as err:
+        return err.strerror
+    else:
+        if stat.S_ISDIR(mode):
+            return os.strerror(errno.EISDIR)
+        target = path
+    if not os.access(target, os.R_OK if reading else os.W_OK):
+        return os.strerror(errno.EACCES)
+    return None
+
+
+def close_files(values):
+    """Closes every `LazyFile` among `values`, or inside a list or tuple among them
+    """
+    for value in values:
+        if isinstance(value, LazyFile):
+            value.close()
+        elif isinstance(value, (list, tuple)):
+            for item in value:
+                if isinstance(item, LazyFile):
+                    item.close()
@@ -1,25 +1,195 @@
 import argparse
-import json
+import copy
+import threading
+from contextlib import nullcontext
 from enum import Enum
 from inspect import Parameter, signature
-from typing import Any, Callable, Dict, List, MutableSet, Optional, Tuple, Union, IO
+from typing import (
+    IO,
+    TYPE_CHECKING,
+    Any,
+    Callable,
+    Dict,
+    List,
+    MutableSet,
+    NoReturn,
+    Optional,
+    Sequence,
+    Text,
+    Tuple,
+    Type,
+    Union,
+)
+
+from ._compat import Annotated, Literal, get_args, get_origin
+from .arrays import TYPECODES, _ArrayConverter
+from .choices import (
+    COMPACT_FLAGS,
+    Choices,
+    _DropAttribute,
+    _EnumLookup,
+    _FlagChoiceAction,
+)
+from .errors import ParseError
+from .files import _FileFactory, _JSONFactory, _JSONLinesFactory
+from .spec import (
+    KEYWORD,
+    POSITIONAL,
+    VAR_POSITIONAL,
+    ArgSpec,
+    CommandSpec,
+    _ByValue,
+    _intern,
+)
+from .types import _AnnotatedValue, Count, Level, Remainder
 
-from typing_extensions import Annotated, Literal, Text, Type, TypeGuard, get_args, get_origin
+if TYPE_CHECKING:
+    from typing_extensions import TypeGuard
 
-from .types import _AnnotatedValue, Count, Level, Remainder
+    from .stats import Stats
 
 
 def generate_argparser(
     func: Callable,
     *,
     add_help=True,
+    spec_cache=None,
+    engine='argparse',
+    stats: Optional['Stats'] = None,
+    extra_arguments: Sequence[ArgSpec] = (),
     **parser_kw
 ):
+    """Generate an argument parser from the signature of `func`
+
+    With `engine='fast'`, `parse_args` uses `autoarg.fastparse` and only falls back
+    to argparse (built on demand) for errors, `--help` and argv it can't handle.
+
+    `spec_cache` enables the on-disk cache of resolved argument specs
+    (see `autoarg.cache`). It may be `True` for the default location, a directory,
+    or `False` to disable it. When `None`, the `AUTOARG_SPEC_CACHE` environment
+    variable decides.
+
+    With `stats` (an `autoarg.stats.Stats`), building the parser, parsing and
+    converting each argument are timed there.
+
+    `extra_arguments` are added after the function's own, for options that the caller
+    looks for itself (such as the `--no-cache` of cached commands); they are parsed, but
+    not passed to the function.
+    """
+    cache = None
+    with _phase(stats, 'spec_cache'):
+        if spec_cache is None and _spec_cache_off_in_environment():
+            spec_cache = False  # so that autoarg.cache isn't imported just to find that out
+        if spec_cache is not False:
+            from .cache import resolve_spec_cache
+            cache = resolve_spec_cache(spec_cache)
+
+        spec = cache.load(func, add_help=add_help) if cache is not None else None
+    if spec is None:
+        with _phase(stats, 'inspect'):
+            spec = _build_parser_spec(func, add_help=add_help)
+            if cache is not None:
+                cache.store(func, spec, add_help=add_help)
+    if extra_arguments:
+        spec = CommandSpec((*spec.arguments, *extra_arguments), spec.postprocessors, spec.bindings)
+
+    kw = {'prog': func.__name__, **parser_kw}
+    return _parser_from_spec(
+        spec, kw, docstring=func.__doc__, add_help=add_help, engine=engine, stats=stats,
+    )
+
+
+def _spec_cache_off_in_environment() -> bool:
+    import os
+    return os.environ.get('AUTOARG_SPEC_CACHE', '') in ('', '0')
+
+
+def _parser_from_spec(
+    spec: CommandSpec,
+    parser_kw: Dict[str, Any],
+    *,
+    docstring: Optional[str] = None,
+    add_help=True,
+    engine='argparse',
+    stats: Optional['Stats'] = None,
+    lazy=False,
+) -> '_ArgumentParserWrapper':
+    """The rest of `generate_argparser`, once `spec` has been resolved
+
+    With `lazy`, the argparse parser isn't built until it is used, whatever the engine.
+    """
+    parse_spec = spec if stats is None else _timed_spec(spec, stats)
+    # everything needed to do this again, e.g. in another process (see __reduce__)
+    recipe = (spec, parser_kw, docstring, add_help, engine)
+
+    def build_parser():
+        with _phase(stats, 'build'):
+            parser = _ArgumentParser(add_help=add_help, docstring=docstring, **parser_kw)
+            parse_spec.replay(parser)
+        return parser
+
+    def wrap(parser, build_parser=None, fast_parser=None):
+        if stats is None:
+            return _ArgumentParserWrapper(parser, spec, build_parser, fast_parser, recipe=recipe)
+        return _TimedParserWrapper(
+            parser, spec, parse_spec, stats, build_parser, fast_parser, recipe=recipe,
+        )
+
+    if engine == 'fast':
+        from .fastparse import _FastParser
+        with _phase(stats, 'build_fast'):
+            fast_parser = _FastParser.from_spec(parse_spec, add_help=add_help, **parser_kw)
+        if fast_parser is not None:
+            return wrap(None, build_parser, fast_parser)
+    elif engine != 'argparse':
+        raise ValueError(f"unknown parse engine: {engine!r}")
+
+    if lazy:
+        return wrap(None, build_parser)
+    return wrap(build_parser())
+
+
+def _unpickle_parser(spec, parser_kw, docstring, add_help, engine) -> '_ArgumentParserWrapper':
+    return _parser_from_spec(
+        spec, parser_kw, docstring=docstring, add_help=add_help, engine=engine, lazy=True,
+    )
+
+
+def _phase(stats: Optional['Stats'], name: str):
+    return nullcontext() if stats is None else stats.phase(name)
+
+
+def _timed_spec(spec: CommandSpec, stats: 'Stats') -> CommandSpec:
+    """A copy of `spec` whose argument factories and converters record their cost in `stats`
+    """
+    arguments = []
+    for arg in spec.arguments:
+        if arg.method == 'add_argument' and callable(arg.get('type')):
+            options = {**arg.options, 'type': stats.timed_conversion(arg.dest, arg.get('type'))}
+            arg = ArgSpec(arg.method, arg.names, options, arg.container)
+        arguments.append(arg)
+    postprocessors = []
+    for post in spec.postprocessors:
+        if getattr(post, 'convert', None) is not None:  # _Postprocess, _StreamPostprocess
+            post = copy.copy(post)
+            post.convert = stats.timed_conversion(post.dest, post.convert)
+        postprocessors.append(post)
+    return CommandSpec(arguments, postprocessors, spec.bindings)
+
+
+_BINDINGS = {
+    Parameter.POSITIONAL_OR_KEYWORD: POSITIONAL,
+    Parameter.VAR_POSITIONAL: VAR_POSITIONAL,
+    Parameter.KEYWORD_ONLY: KEYWORD,
+}
+
+
+def _build_parser_spec(func: Callable, /, *, add_help=True) -> CommandSpec:
     arg_groups, short_opts = _inspect_fn(func, add_help=add_help)
 
-    parser = argparse.ArgumentParser(func.__name__, add_help=add_help, **parser_kw)
-    group_parser = parser
-    postprocessors: List[Callable[[argparse.Namespace], None]] = []
+    builder = _SpecBuilder()
+    parser = group_parser = builder.recorder()
+    stream_options = []
 
     for group, args in arg_groups:
         if group is not None:
@@ -29,9 +199,70 @@ def generate_argparser(
                 arg.auto_assign_short_opts(short_opts)
             arg.add_to_parser(group_parser)
             if arg.has_postprocessing:
-                postprocessors.append(arg.postprocess_namespace)
+                builder.postprocessors.append(arg.namespace_postprocessor())
+            builder.bindings.append((arg.dest, _BINDINGS[arg.fn_param.kind]))
+            if isinstance(arg, _StreamPositional):
+                stream_options.append(arg.from_file_option)
+
+    if stream_options:
+        _check_stream_options(func, builder.arguments, stream_options)
+
+    # the _CommandArgs (and the inspect objects they hold) aren't needed past this point
+    return builder.build()
+
+
+def _check_stream_options(func: Callable, arguments: List[ArgSpec], stream_options: List[str]):
+    names = [name for argument in arguments if argument.method == 'add_argument'
+             for name in argument.names]
+    for option in stream_options:
+        if names.count(option) > 1:
+            raise TypeError(
+                f"{func.__qualname__}: {option} (values of a Stream read from a file)"
+                + " clashes with another option; rename one of the parameters"
+            )
+
 
-    return _ArgumentParserWrapper(parser, postprocessors)
+class _SpecBuilder:
+    """Collects the parts of a `CommandSpec` while `_CommandArg`s add themselves to a parser
+    """
+    def __init__(self):
+        self.arguments: List[ArgSpec] = []
+        self.postprocessors: List[Callable[[argparse.Namespace], None]] = []
+        self.bindings: List[Tuple[str, str]] = []
+        self._n_containers = 1
+
+    def recorder(self) -> '_RecordingContainer':
+        return _RecordingContainer(self, 0)
+
+    def record(self, container: int, method: str, args: tuple, kwargs: dict):
+        self.arguments.append(ArgSpec(method, args, kwargs, container))
+        if method in ('add_argument_group', 'add_mutually_exclusive_group'):
+            self._n_containers += 1
+            return _RecordingContainer(self, self._n_containers - 1)
+        return None
+
+    def build(self) -> CommandSpec:
+        return CommandSpec(map(_intern, self.arguments), self.postprocessors, self.bindings)
+
+
+class _RecordingContainer:
+    """Stands in for an argparse parser or group while recording a `CommandSpec`
+    """
+    def __init__(self, builder: _SpecBuilder, index: int):
+        self._builder = builder
+        self._index = index
+
+    def add_argument(self, *args, **kwargs):
+        self._builder.record(self._index, 'add_argument', args, kwargs)
+
+    def add_argument_group(self, *args, **kwargs):
+        return self._builder.record(self._index, 'add_argument_group', args, kwargs)
+
+    def add_mutually_exclusive_group(self, **kwargs):
+        return self._builder.record(self._index, 'add_mutually_exclusive_group', (), kwargs)
+
+    def set_defaults(self, **kwargs):
+        self._builder.record(self._index, 'set_defaults', (), kwargs)
 
 
 def _inspect_fn(func: Callable, /, *, add_help=True):
@@ -47,8 +278,19 @@ def _inspect_fn(func: Callable, /, *, add_help=True):
             group = _ArgGroup(name, param.default)
             args = []
         elif param.kind == Parameter.POSITIONAL_OR_KEYWORD:
-            args.append(_Positional(param))
+            if _is_stream(param.annotation):
+                args.append(_StreamPositional(param))
+            elif _is_array(param.annotation):
+                args.append(_ArrayPositional(param))
+            else:
+                args.append(_Positional(param))
         elif param.kind == Parameter.VAR_POSITIONAL:
+            if _is_stream(param.annotation) or _is_array(param.annotation):
+                kind = 'Stream' if _is_stream(param.annotation) else 'Array'
+                raise TypeError(
+                    f"parameter *{name}: {kind}[...] needs a regular parameter,"
+                    + " since *args is collected into a tuple before the call"
+                )
             args.append(_VarPositional(param))
         elif param.kind == Parameter.KEYWORD_ONLY:
             opt = _inspect_opt(param)
@@ -89,11 +331,11 @@ class _CommandArg:
 
         if 'help' in self.arg:
             self.help = self.arg['help']
-        # TODO: get help from parsed docstring
         else:
-            self.help = None
+            self.help = None  # filled from the docstring if help is ever shown
 
         self.nargs = None
+        self._choices = None
 
         if 'factory' in kwargs:
             self.factory = kwargs['factory']
@@ -119,20 +361,19 @@ class _CommandArg:
         if get_origin(self.type) is Annotated:
             T, *annotations = get_args(self.type)
             if T is IO:
-                return argparse.FileType(*annotations)
+                mode, *flags = annotations
+                return _FileFactory(mode, asynchronous='async' in flags)
             if T is Any and 'json' in annotations:
-                return json.loads
+                return _JSONFactory(self.arg.get('decoder'))
+            if 'jsonlines' in annotations:
+                return _JSONLinesFactory(self.arg.get('decoder'))
             if is_simple_factory(T):
                 if 'level' in annotations or 'count' in annotations:
                     return None
                 return T
 
         if is_enum_class(self.type):
-            first_base = self.type.__mro__[1]
-            if not issubclass(first_base, (str, Enum)):
-                return first_base
-            else:
-                return None
+            return self.choices  # resolves abbreviations; _EnumLookup does the rest
 
         if get_origin(self.type) is tuple:
             targs = get_args(self.type)
@@ -157,36 +398,84 @@ class _CommandArg:
             return None
 
         if is_enum_class(self.type):
-            return self.type
+            return _EnumLookup(self.type)
 
         if get_origin(self.type) is tuple:
-            return lambda values, types=get_args(self.type): tuple(
-                T(x) for x, T in zip(values, types)
-            )
+            return _TupleFactory(get_args(self.type))
 
         return None
 
     @property
-    def choices(self) -> Optional[List[str]]:
+    def choices(self) -> Optional[Choices]:
         if is_enum_class(self.type):
-            return [str(choice._value_) for choice in self.type]
+            if self._choices is None:
+                self._choices = Choices(
+                    (str(choice._value_) for choice in self.type),
+                    allow_abbrev=self.arg.get('allow_abbrev', False),
+                )
+            return self._choices
+        return None
+
+    @property
+    def metavar(self) -> Optional[str]:
+        if 'metavar' in self.arg:
+            return self.arg['metavar']
+        choices = self.choices
+        if choices is not None and choices.is_large:
+            # rather than argparse's {every,single,choice}
+            if self.fn_param.kind is Parameter.KEYWORD_ONLY:
+                return self.dest.upper()
+            return self.dest
         return None
 
-    def postprocess_namespace(self, namespace):
+    def namespace_postprocessor(self) -> Callable[[argparse.Namespace], None]:
         assert self.postprocessor
-        setattr(namespace, self.dest, self.postprocessor(getattr(namespace, self.dest)))
+        return _Postprocess(self.dest, self.postprocessor)
 
     @property
     def has_postprocessing(self) -> bool:
         return self.postprocessor is not None
 
 
+class _Postprocess(_ByValue):
+    """Converts a single namespace attribute after parsing
+    """
+    def __init__(self, dest: str, convert: Callable[[Any], Any]):
+        self.dest = dest
+        self.convert = convert
+
+    def __call__(self, namespace):
+        setattr(namespace, self.dest, self.convert(getattr(namespace, self.dest)))
+
+
+class _TupleFactory(_ByValue):
+    """Converts each value of a fixed-length `nargs` with its own factory
+    """
+    def __init__(self, types: Tuple[Callable[[str], Any], ...]):
+        self.types = types
+
+    def __call__(self, values):
+        return tuple(T(x) for x, T in zip(values, self.types))
+
+
+class _EachFactory(_ByValue):
+    """Applies a postprocessor to every item of an appended list
+    """
+    def __init__(self, convert: Callable[[Any], Any]):
+        self.convert = convert
+
+    def __call__(self, values):
+        if values is None:
+            return None
+        return [self.convert(x) for x in values]
+
+
 class _Positional(_CommandArg):
     def add_to_parser(self, parser: argparse.ArgumentParser):
         kw = {
             'choices': self.choices,
             'type': self.factory,
-            'metavar': self.arg.get('metavar'),
+            'metavar': self.metavar,
             'help': self.help,
         }
 
@@ -205,7 +494,7 @@ class _VarPositional(_Positional):
             'nargs': '*',
             'choices': self.choices,
             'type': self.factory,
-            'metavar': self.arg.get('metavar'),
+            'metavar': self.metavar,
             'help': self.help,
         }
 
@@ -215,6 +504,71 @@ class _VarPositional(_Positional):
         parser.add_argument(self.dest, **kw)
 
 
+class _StreamPositional(_Positional):
+    """`Stream[T]`: any number of values (or files of them), converted as they are consumed
+    """
+    def __init__(self, param: Parameter):
+        iterator_type, *_ = get_args(param.annotation)
+        item_type, = get_args(iterator_type) or (str,)
+        super().__init__(param, type=item_type)
+        self.from_file_dest = f"_{self.dest}__from_file_"
+        # named after the parameter, so that a command can have more than one Stream
+        self.from_file_option = f"--{self.dest.replace('_', '-')}-from"
+
+    def add_to_parser(self, parser: argparse.ArgumentParser):
+        parser.add_argument(
+            self.dest,
+            nargs='*',
+            metavar=self.metavar,
+            help=self.help,
+        )
+        parser.add_argument(
+            self.from_file_option,
+            dest=self.from_file_dest,
+            action='append',
+            metavar='PATH',
+            help=f"read more {self.dest} from PATH (- for stdin), one per line or NUL-terminated",
+        )
+
+    def namespace_postprocessor(self) -> Callable[[argparse.Namespace], None]:
+        from .streams import _StreamItem, _StreamPostprocess
+        convert = _StreamItem(self.dest, self.factory, self.choices, self.postprocessor)
+        return _StreamPostprocess(self.dest, self.from_file_dest, convert)
+
+    @property
+    def has_postprocessing(self) -> bool:
+        return True
+
+
+def _array_converter(param: Parameter, numpy=False) -> _ArrayConverter:
+    """The conversion for an `Array[T]` or `Array[Tuple[T, ...]]` parameter
+    """
+    sequence_type, *_ = get_args(param.annotation)
+    item_type, = get_args(sequence_type)
+    size = 1
+    if get_origin(item_type) is tuple:
+        item_types = set(get_args(item_type))
+        size = len(get_args(item_type))
+        if len(item_types) != 1 or ... in item_types:
+            raise TypeError(
+                f"parameter {param.name}: Array[{item_type}] needs a fixed number"
+                + " of values of one type"
+            )
+        item_type, = item_types
+    if item_type not in TYPECODES:
+        raise TypeError(f"parameter {param.name}: Array[...] holds int or float, not {item_type}")
+    return _ArrayConverter(param.name, item_type, size, numpy=numpy)
+
+
+class _ArrayPositional(_Positional):
+    """`Array[T]`: any number of numbers, converted into one array after parsing
+    """
+    def __init__(self, param: Parameter):
+        super().__init__(param, factory=None, postprocessor=None)
+        self.postprocessor = _array_converter(param, numpy=self.arg.get('numpy', False))
+        self.nargs = '*'
+
+
 class _Option(_CommandArg):
     def __init__(self, param: Parameter, **kwargs):
         super().__init__(param, **kwargs)
@@ -238,7 +592,7 @@ class _Option(_CommandArg):
             'dest': self.dest,
             'choices': self.choices,
             'type': self.factory,
-            'metavar': self.arg.get('metavar'),
+            'metavar': self.metavar,
             'help': self.help,
         }
 
@@ -274,22 +628,41 @@ class _Option(_CommandArg):
 
 
 class _AppendOption(_Option):
+    def __init__(self, param: Parameter):
+        # Append[T] is Annotated[List[T], 'append']: each occurrence is parsed as a T
+        list_type, *_ = get_args(param.annotation)
+        item_type, = get_args(list_type) or (str,)
+        super().__init__(param, type=item_type)
+        if self.postprocessor is not None:
+            self.postprocessor = _EachFactory(self.postprocessor)
+
     def add_to_parser(self, parser: argparse.ArgumentParser):
         kw = {
             'dest': self.dest,
             'action': 'append',
             'choices': self.choices,
             'type': self.factory,
-            'metavar': self.arg.get('metavar'),
+            'metavar': self.metavar,
             'help': self.help,
         }
 
         if self.default is not ...:
             kw['default'] = self.default
+        if self.nargs is not None:
+            kw['nargs'] = self.nargs
 
         parser.add_argument(*self.all_names, **kw)
 
 
+class _ArrayOption(_Option):
+    """`--name N [N ...]` for `Array[T]`, converted into one array after parsing
+    """
+    def __init__(self, param: Parameter):
+        super().__init__(param, factory=None, postprocessor=None)
+        self.postprocessor = _array_converter(param, numpy=self.arg.get('numpy', False))
+        self.nargs = '+'
+
+
 class _Flag(_Option):
     def __init__(self, param: Parameter):
         super().__init__(param, type=bool, factory=None, postprocessor=None)
@@ -348,20 +721,34 @@ class _LevelFlag(_CommandArg):
     def auto_assign_short_opts(self, reservations: MutableSet[str]):
         ...
 
-    def postprocess_namespace(self, namespace):
+    def namespace_postprocessor(self) -> Callable[[argparse.Namespace], None]:
+        return _LevelPostprocess(self.dest, self.default, self.dest_up, self.dest_down)
+
+    @property
+    def has_postprocessing(self) -> bool:
+        return True
+
+
+class _LevelPostprocess(_ByValue):
+    """Combines the up and down counts of a `Level` into its value
+    """
+    def __init__(self, dest: str, default: int, dest_up: str, dest_down: str):
+        self.dest = dest
+        self.default = default
+        self.dest_up = dest_up
+        self.dest_down = dest_down
+
+    def __call__(self, namespace):
         up = getattr(namespace, self.dest_up)
         down = getattr(namespace, self.dest_down)
         setattr(namespace, self.dest, self.default + up - down)
         delattr(namespace, self.dest_up)
         delattr(namespace, self.dest_down)
 
-    @property
-    def has_postprocessing(self) -> bool:
-        return True
-
 
 class _FlagGroup(_CommandArg):
     _ACTION = 'store_const'
+    _COMPACT_ACTION = _FlagChoiceAction
 
     def __init__(self, param: Parameter, flag_values: Tuple[str]):
         for val in flag_values:
@@ -373,6 +760,10 @@ class _FlagGroup(_CommandArg):
         self.long_opts = self.arg['longs'] if 'longs' in self.arg else {}
 
     def add_to_parser(self, parser: argparse.ArgumentParser):
+        if self.is_compact:
+            self._add_compact(parser)
+            return
+
         mutex_group = parser.add_mutually_exclusive_group(
             required=self._ACTION == 'store_const' and self.default is ...
         )
@@ -383,17 +774,48 @@ class _FlagGroup(_CommandArg):
                 'const': flag,
                 'help': self.help,
             }
-            if flag in self.long_opts:
-                flags = self.long_opts[flag]
-            else:
-                flags = [f"--{flag.replace('_', '-')}"]
-            if short := self.short_opts.get(flag):
-                flags.insert(0, '-' + short)
-            mutex_group.add_argument(*flags, **kw)
+            mutex_group.add_argument(*self._option_strings(flag), **kw)
 
         if self.default is not ...:
             parser.set_defaults(**{self.dest: self.default})
 
+    @property
+    def is_compact(self) -> bool:
+        return self._COMPACT_ACTION is not None and len(self.flag_values) > COMPACT_FLAGS
+
+    def _add_compact(self, parser: argparse.ArgumentParser):
+        flag_values = {
+            option_string: flag
+            for flag in self.flag_values
+            for option_string in self._option_strings(flag)
+        }
+        kw = {
+            'dest': self.dest,
+            'action': self._COMPACT_ACTION,
+            'flag_values': flag_values,
+            'required': self.default is ...,
+            'help': self.help,
+        }
+        if self.default is not ...:
+            kw['default'] = self.default
+        parser.add_argument(*flag_values, **kw)
+
+    def _option_strings(self, flag: str) -> List[str]:
+        if flag in self.long_opts:
+            option_strings = list(self.long_opts[flag])
+        else:
+            option_strings = [f"--{flag.replace('_', '-')}"]
+        if short := self.short_opts.get(flag):
+            option_strings.insert(0, '-' + short)
+        return option_strings
+
+    def namespace_postprocessor(self) -> Callable[[argparse.Namespace], None]:
+        return _DropAttribute(_FlagChoiceAction.marker(self.dest))
+
+    @property
+    def has_postprocessing(self) -> bool:
+        return self.is_compact
+
     def reserve_short_opts(self, reservations: MutableSet[str]):
         for flag in self.flag_values:
             if not self.short_opts.get(flag):
@@ -417,6 +839,7 @@ class _FlagGroup(_CommandArg):
 
 class _AppendFlagGroup(_FlagGroup):
     _ACTION = 'append_const'
+    _COMPACT_ACTION = None
 
 
 def _inspect_opt(param: Parameter):
@@ -428,6 +851,8 @@ def _inspect_opt(param: Parameter):
             return _LevelFlag(param, is_verbosity='verbosity' in annotations)
         if 'append' in annotations:
             return _AppendOption(param)
+        if 'array' in annotations:
+            return _ArrayOption(param)
 
     if get_origin(param.annotation) is Literal:
         return _FlagGroup(param, get_args(param.annotation))
@@ -452,48 +877,371 @@ class _ArgGroup:
         return parser.add_argument_group(self.title, self.description)
 
 
-class _ArgumentParserWrapper:
-    def __init__(self, parser, postprocessors: List[Callable[[argparse.Namespace], None]]):
-        self._parser = parser
-        self._postprocessors = postprocessors
+class _Binder:
+    """Turns a parsed namespace into the function's arguments in a single pass
 
-    def _postprocess(self, namespace):
+    The plan is worked out once from the kind of each parameter, so invocations don't
+    have to inspect the signature again. Plain conversions (Enums, Tuples) are applied
+    on the way instead of being written back to the namespace first.
+    """
+    def __init__(self, spec: CommandSpec):
+        converters = {}
+        self._namespace_postprocessors = []
+        for post in spec.postprocessors:
+            if isinstance(post, _Postprocess):
+                converters[post.dest] = post.convert
+            else:
+                self._namespace_postprocessors.append(post)
+
+        self._positional = []
+        self._var_positional = None
+        self._keyword = []
+        for dest, kind in spec.bindings:
+            if kind == VAR_POSITIONAL:
+                self._var_positional = (dest, converters.get(dest))
+            elif kind == KEYWORD:
+                self._keyword.append((dest, converters.get(dest)))
+            else:
+                self._positional.append((dest, converters.get(dest)))
+
+    def __call__(self, namespace) -> Tuple[list, dict]:
+        _postprocess_namespace(self._namespace_postprocessors, namespace)
+        values = vars(namespace)
+        dest = None
         try:
-            for post in self._postprocessors:
-                post(namespace)
+            args = []
+            for dest, convert in self._positional:
+                args.append(values[dest] if convert is None else convert(values[dest]))
+            if self._var_positional is not None:
+                dest, convert = self._var_positional
+                args.extend(values[dest] if convert is None else convert(values[dest]))
+            kwargs = {}
+            for dest, convert in self._keyword:
+                kwargs[dest] = values[dest] if convert is None else convert(values[dest])
         except ValueError as err:
-            self._parser.error(str(err))
+            raise _conversion_error(dest, err) from err
+        return args, kwargs
+
+
+def _postprocess_namespace(postprocessors, namespace):
+    try:
+        for post in postprocessors:
+            post(namespace)
+    except ValueError as err:
+        raise _conversion_error(getattr(post, 'dest', None), err) from err
+
+
+def _conversion_error(dest: Optional[str], err: ValueError) -> ParseError:
+    """A `ParseError` for a conversion of `dest` that failed after parsing
+    """
+    message = str(err)
+    if dest is None:
+        return ParseError(message)
+    prefix = f"argument {dest}: "
+    if message.startswith(prefix):
+        return ParseError(message, argument=dest, reason=message[len(prefix):])
+    return ParseError(prefix + message, argument=dest, reason=message)
+
+
+class _QuietParse(threading.local):
+    output: Optional[List[str]] = None  # what the parse printed, while it's a quiet one
+
+
+_quiet = _QuietParse()
+
+
+class _ArgumentParser(argparse.ArgumentParser):
+    """An `ArgumentParser` that reports errors by raising `ParseError`
+
+    Printing and exiting is left to `_ArgumentParserWrapper`, so that callers can
+    choose not to.
+
+    Help is only worked out when it is shown: the function's `docstring` is parsed
+    (with `docstring_parser`) for the description and the help of arguments that
+    don't have any the first time help is formatted, and the formatted help and usage
+    are kept for each terminal width.
+    """
+    _adding_argument = False
+    _metavar_formatter = None
+
+    def __init__(self, *args, docstring: Optional[str] = None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._docstring = docstring
+        self._formatted: Dict[Tuple[str, int], str] = {}
+
+    def error(self, message: str) -> NoReturn:
+        raise ParseError(message)
+
+    # `--help` and `--version` print and exit from inside the parse; a quiet one collects
+    # what they print and raises it instead
+
+    def _print_message(self, message, file=None):
+        if _quiet.output is None:
+            super()._print_message(message, file)
+        elif message:
+            _quiet.output.append(message)
+
+    def exit(self, status=0, message=None):
+        if _quiet.output is None:
+            super().exit(status, message)
+        if message:
+            _quiet.output.append(message)
+        text = ''.join(_quiet.output)
+        raise ParseError(text, status=status)
+
+    # argparse reports most errors as ArgumentErrors, which only reach error() as text
+
+    def parse_args(self, args=None, namespace=None):
+        namespace, extras = self.parse_known_args(args, namespace)
+        if extras:
+            raise ParseError(
+                f"unrecognized arguments: {' '.join(extras)}",
+                token=extras[0], reason="unrecognized arguments",
+            )
+        return namespace
+
+    def _parse_known_args(self, *args, **kwargs):
+        try:
+            return super()._parse_known_args(*args, **kwargs)
+        except argparse.ArgumentError as err:
+            raise _argument_error(err) from None
+
+    def _get_value(self, action, arg_string):
+        try:
+            return super()._get_value(action, arg_string)
+        except argparse.ArgumentError as err:
+            raise _argument_error(err, arg_string) from None
+
+    def _check_value(self, action, value):
+        try:
+            super()._check_value(action, value)
+        except argparse.ArgumentError as err:
+            raise _argument_error(err, value if isinstance(value, str) else None) from None
+
+    def add_argument(self, *args, **kwargs):
+        self._adding_argument = True
+        try:
+            return super().add_argument(*args, **kwargs)
+        finally:
+            self._adding_argument = False
+
+    def _get_formatter(self):
+        # add_argument only wants a formatter to check the metavar, which doesn't need a new
+        # one (or the terminal size that HelpFormatter looks up) for every argument
+        if self._adding_argument:
+            if self._metavar_formatter is None:
+                self._metavar_formatter = self.formatter_class(self.prog, width=80)
+            return self._metavar_formatter
+        return super()._get_formatter()
+
+    def format_usage(self) -> str:
+        return self._format_cached('usage', super().format_usage)
+
+    def format_help(self) -> str:
+        if self._docstring is not None:
+            self._apply_docstring(self._docstring)
+            self._docstring = None
+        return self._format_cached('help', super().format_help)
+
+    def _format_cached(self, kind: str, format: Callable[[], str]) -> str:
+        import shutil
+        key = (kind, shutil.get_terminal_size().columns)
+        text = self._formatted.get(key)
+        if text is None:
+            text = self._formatted[key] = format()
+        return text
+
+    def _apply_docstring(self, docstring: str):
+        try:
+            import docstring_parser
+        except ImportError:
+            return
+        doc = docstring_parser.parse(docstring)
+        if self.description is None:
+            self.description = '\n\n'.join(
+                text for text in (doc.short_description, doc.long_description) if text
+            ) or None
+        params = {param.arg_name.lstrip('*'): param.description for param in doc.params}
+        for action in self._actions:
+            if action.help is None and params.get(action.dest):
+                action.help = params[action.dest].replace('%', '%%')
+
+
+def _argument_error(err: argparse.ArgumentError, token: Optional[str] = None) -> ParseError:
+    return ParseError(str(err), argument=err.argument_name, token=token, reason=err.message)
+
+
+class _ArgumentParserWrapper:
+    def __init__(
+        self,
+        parser: Optional[argparse.ArgumentParser],
+        spec: CommandSpec,
+        build_parser: Optional[Callable[[], argparse.ArgumentParser]] = None,
+        fast_parser=None,
+        *,
+        recipe: Optional[tuple] = None,
+    ):
+        self._argparser = parser
+        self.spec = spec
+        self._recipe = recipe
+        self._postprocessors = spec.postprocessors
+        self._binder = _Binder(spec)
+        self._bound = frozenset(dest for dest, _ in spec.bindings)
+        self._build_parser = build_parser
+        self._build_lock = threading.Lock()
+        self._fast_parser = fast_parser
+        # lets Command close the LazyFiles of File[...] arguments after the call
+        self.opens_files = any(
+            isinstance(arg.get('type'), _FileFactory) for arg in spec.arguments
+        )
+
+    @property
+    def _parser(self) -> argparse.ArgumentParser:
+        # with the fast engine, argparse is only needed for errors and help
+        if self._argparser is None:
+            with self._build_lock:
+                if self._argparser is None:
+                    self._argparser = self._build_parser()
+        return self._argparser
+
+    def _postprocess(self, namespace):
+        _postprocess_namespace(self._postprocessors, namespace)
+
+    def _parse_unprocessed(self, args=None, namespace=None):
+        if self._fast_parser is not None and namespace is None:
+            from .fastparse import _Fallback
+            try:
+                return self._fast_parser.parse_args(args)
+            except _Fallback:
+                pass
+        return self._parser.parse_args(args, namespace)
+
+    def error(self, message: str) -> NoReturn:
+        """Prints the usage and `message` to stderr and exits with status 2
+        """
+        argparse.ArgumentParser.error(self._parser, message)
 
     def parse_args(self, args=None, namespace=None):
-        ns = self._parser.parse_args(args, namespace)
-        self._postprocess(ns)
+        try:
+            ns = self._parse_unprocessed(args, namespace)
+            self._postprocess(ns)
+        except ParseError as err:
+            self.error(err.message)
         return ns
 
+    def parse_call_args(self, args=None, *, exit_on_error=True,
+                        extras: Optional[Dict[str, Any]] = None) -> Tuple[list, dict]:
+        """Parses `args` directly into the positional and keyword arguments for the function
+
+        With `exit_on_error=False`, a `ParseError` is raised instead of printing the
+        usage and exiting, and `--help` and `--version` raise one (with status 0) whose
+        message is the text they would have printed. `extras`, a dict, receives the
+        values that aren't passed to the function (those of `generate_argparser`'s
+        `extra_arguments`), by dest.
+        """
+        quiet = _quiet.output
+        if not exit_on_error:
+            _quiet.output = []
+        try:
+            namespace = self._parse_unprocessed(args)
+            bound = self._binder(namespace)
+            if extras is not None:
+                extras.update(
+                    item for item in vars(namespace).items() if item[0] not in self._bound
+                )
+            return bound
+        except ParseError as err:
+            if not exit_on_error:
+                raise
+            self.error(err.message)
+        finally:
+            _quiet.output = quiet
+
     def parse_known_args(self, args=None, namespace=None):
-        ns, unknown = self._parser.parse_known_args(args, namespace)
-        self._postprocess(ns)
+        try:
+            ns, unknown = self._parser.parse_known_args(args, namespace)
+            self._postprocess(ns)
+        except ParseError as err:
+            self.error(err.message)
         return ns, unknown
 
     def parse_intermixed_args(self, args=None, namespace=None):
-        ns = self._parser.parse_intermixed_args(args, namespace)
-        self._postprocess(ns)
+        try:
+            ns = self._parser.parse_intermixed_args(args, namespace)
+            self._postprocess(ns)
+        except ParseError as err:
+            self.error(err.message)
         return ns
 
     def parse_known_intermixed_args(self, args=None, namespace=None):
-        ns, unknown = self._parser.parse_known_intermixed_args(args, namespace)
-        self._postprocess(ns)
+        try:
+            ns, unknown = self._parser.parse_known_intermixed_args(args, namespace)
+            self._postprocess(ns)
+        except ParseError as err:
+            self.error(err.message)
         return ns, unknown
 
+    def __reduce__(self):
+        # argparse parsers don't pickle (they hold local functions), and are rebuilt
+        # from the spec on first use instead; timings stay with the original
+        if self._recipe is None:
+            raise TypeError(f"{type(self).__name__} without a recipe can't be pickled")
+        return _unpickle_parser, self._recipe
+
     # proxy remaining methods to _parser, unmodified
     def __getattr__(self, attr):
         return getattr(self._parser, attr)
 
 
-def is_enum_class(val) -> TypeGuard[Type[Enum]]:
+class _TimedParserWrapper(_ArgumentParserWrapper):
+    """Records the parse and postprocess phases of each invocation in `stats`
+
+    `timed_spec` is `spec` with its conversions timed (see `_timed_spec`); `spec`
+    itself is kept for introspection.
+    """
+    def __init__(
+        self,
+        parser: Optional[argparse.ArgumentParser],
+        spec: CommandSpec,
+        timed_spec: CommandSpec,
+        stats: 'Stats',
+        build_parser: Optional[Callable[[], argparse.ArgumentParser]] = None,
+        fast_parser=None,
+        *,
+        recipe: Optional[tuple] = None,
+    ):
+        super().__init__(parser, spec, build_parser, fast_parser, recipe=recipe)
+        self.stats = stats
+        self._postprocessors = timed_spec.postprocessors
+        self._timed_binder = _Binder(timed_spec)
+        self._binder = self._bind
+
+    def _bind(self, namespace) -> Tuple[list, dict]:
+        with self.stats.phase('postprocess'):
+            return self._timed_binder(namespace)
+
+    def _parse_unprocessed(self, args=None, namespace=None):
+        with self.stats.phase('parse'):
+            return super()._parse_unprocessed(args, namespace)
+
+    def _postprocess(self, namespace):
+        with self.stats.phase('postprocess'):
+            super()._postprocess(namespace)
+
+
+def _is_stream(annotation) -> bool:
+    return get_origin(annotation) is Annotated and 'stream' in get_args(annotation)[1:]
+
+
+def _is_array(annotation) -> bool:
+    return get_origin(annotation) is Annotated and 'array' in get_args(annotation)[1:]
+
+
+def is_enum_class(val) -> 'TypeGuard[Type[Enum]]':
     return isinstance(val, type) and issubclass(val, Enum)
 
 
-def is_simple_factory(val) -> TypeGuard[Callable[[str], Any]]:
+def is_simple_factory(val) -> 'TypeGuard[Callable[[str], Any]]':
     return callable(val) and isinstance(val, type)
     # this logic is flawed, but it *does* correctly reject generic annotations
     # TODO: check the signature of the type
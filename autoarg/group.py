@@ -0,0 +1,285 @@
+"""`git`-style tools made of several commands
+
+A `CommandGroup` maps subcommand names to commands, which can be given as
+`"package.module:function"` strings so that nothing is imported until a subcommand
+is actually run:
+
+    app = CommandGroup('tool', "Does several things")
+    app.add('build', 'tool.build:main')
+    app.add('deploy', 'tool.deploy:main', summary="Ship it")
+    remote = app.group('remote', "Manage remotes")
+    remote.add('add', 'tool.remote:add')
+
+    if __name__ == '__main__':
+        app.main()
+
+Dispatching on `argv[0]` is a dict lookup; only the selected subcommand's module is
+imported and only its parser is built. The top-level `--help` lists one-line
+summaries, which come from `summary=`, from subcommands that are already loaded, or
+from the summary cache (see `SpecCache`), which imports each subcommand once to fill
+it. Without the cache, subcommands that aren't loaded are listed without a summary
+rather than imported, so `--help` never imports anything.
+"""
+import importlib
+import os
+import sys
+from typing import Callable, Dict, List, NoReturn, Optional, Sequence, Union
+
+from .decorators import Command, command
+
+__all__ = [
+    'CommandGroup',
+]
+
+
+class _Entry:
+    __slots__ = ('name', 'target', 'summary', 'resolved')
+
+    def __init__(self, name: str, target, summary: Optional[str]):
+        self.name = name
+        self.target = target
+        self.summary = summary
+        self.resolved = None if isinstance(target, str) else target
+
+    def resolve(self) -> Union[Command, 'CommandGroup']:
+        if self.resolved is None:
+            self.resolved = _as_runnable(_import_target(self.target), self.target)
+        return self.resolved
+
+
+class CommandGroup:
+    """A set of named subcommands, which may themselves be groups
+
+    `name` is the program name shown in usage messages (default: the basename of
+    `sys.argv[0]`). `summary_cache` is interpreted like `generate_argparser`'s
+    `spec_cache`.
+    """
+    def __init__(self, name: Optional[str] = None, description: Optional[str] = None, *,
+                 summary_cache=None):
+        self.name = name
+        self.description = description
+        self._summary_cache = summary_cache
+        self._entries: Dict[str, _Entry] = {}
+
+    @property
+    def prog(self) -> str:
+        return self.name or os.path.basename(sys.argv[0])
+
+    @property
+    def summary(self) -> str:
+        return (self.description or '').strip().split('\n', 1)[0]
+
+    def add(self, name: str, target: Union[str, Command, 'CommandGroup', Callable], *,
+            summary: Optional[str] = None):
+        """Registers a subcommand
+
+        `target` is a `Command`, a nested `CommandGroup`, a plain function (which is
+        wrapped with `command`) or a `"module:attribute"` string naming one of those,
+        which is only imported when the subcommand is run.
+        """
+        if name in self._entries:
+            raise TypeError(f"{self.prog}: subcommand {name!r} is already registered")
+        if isinstance(target, str):
+            if ':' not in target:
+                raise TypeError(
+                    f"subcommand target must be given as 'module:name', not {target!r}"
+                )
+        else:
+            target = _as_runnable(target, name)
+        self._entries[name] = _Entry(name, target, summary)
+        return target
+
+    def command(self, maybe_fn=None, /, *, name: Optional[str] = None,
+                summary: Optional[str] = None, **command_kw):
+        """Decorator form of `add()` for commands defined alongside the group
+
+        The subcommand is named after the function, with underscores as dashes.
+        """
+        def _decorator(fn):
+            cmd = command(fn, **command_kw)
+            return self.add(name or fn.__name__.replace('_', '-'), cmd, summary=summary)
+
+        if maybe_fn is None:
+            return _decorator
+        else:
+            return _decorator(maybe_fn)
+
+    def group(self, name: str, description: Optional[str] = None, *,
+              summary: Optional[str] = None) -> 'CommandGroup':
+        """Creates and registers a nested group
+        """
+        subgroup = CommandGroup(name, description, summary_cache=self._summary_cache)
+        self.add(name, subgroup, summary=summary)
+        return subgroup
+
+    def __getitem__(self, name: str) -> Union[Command, 'CommandGroup']:
+        """The subcommand registered as `name`, importing it if necessary
+        """
+        return self._entries[name].resolve()
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._entries
+
+    def __iter__(self):
+        return iter(self._entries)
+
+    def _select(self, argv: Sequence[str]):
+        if not argv:
+            self._error("a subcommand is required")
+        name = argv[0]
+        entry = self._entries.get(name)
+        if entry is None:
+            if name in ('-h', '--help'):
+                sys.stdout.write(self.format_help())
+                sys.exit(0)
+            self._error(f"unknown subcommand {name!r}")
+        runnable = entry.resolve()
+        runnable._set_prog(f"{self.prog} {name}")
+        return runnable, list(argv[1:])
+
+    def _set_prog(self, prog: str):
+        self.name = prog
+
+    def main(self, argv: Optional[Sequence[str]] = None) -> NoReturn:
+        """Runs the subcommand named by `argv[0]` (default: `sys.argv[1:]`) and exits
+        """
+        if argv is None:
+            argv = sys.argv[1:]
+        runnable, rest = self._select(argv)
+        runnable.main(rest)
+
+    def run(self, *str_args: str):
+        """Runs the subcommand named by the first argument, returning its result
+        """
+        try:
+            runnable, rest = self._select(str_args)
+        except SystemExit as err:
+            raise TypeError(str(err))
+        return runnable.run(*rest)
+
+    def _error(self, message: str) -> NoReturn:
+        sys.stderr.write(f"{self.format_usage()}{self.prog}: error: {message}\n")
+        sys.exit(2)
+
+    def format_usage(self) -> str:
+        return f"usage: {self.prog} {{{','.join(self._entries)}}} ...\n"
+
+    def format_help(self) -> str:
+        lines = [self.format_usage()]
+        if self.description:
+            lines += ['', self.description.strip()]
+        summaries = self.summaries()
+        if summaries:
+            width = min(max(map(len, summaries)), 20)
+            lines += ['', 'subcommands:']
+            for name, summary in summaries.items():
+                if not summary:
+                    lines.append(f"  {name}")
+                elif len(name) > width:
+                    lines += [f"  {name}", f"  {'':{width}}  {summary}"]
+                else:
+                    lines.append(f"  {name:{width}}  {summary}")
+        return '\n'.join(line.rstrip('\n') for line in lines) + '\n'
+
+    def summaries(self) -> Dict[str, Optional[str]]:
+        """One-line summaries of the subcommands, by name
+
+        Summaries not given to `add()` are looked up in the summary cache, and only
+        subcommands missing from it (or whose module changed since) are imported.
+        Without a summary cache, subcommands that haven't been imported yet have none.
+        """
+        cache = _SummaryCache.resolve(self._summary_cache)
+        result = {}
+        for name, entry in self._entries.items():
+            summary = entry.summary
+            if summary is None and cache is not None and isinstance(entry.target, str):
+                summary = cache.get(entry.target)
+                if summary is None:
+                    summary = entry.resolve().summary
+                    cache.put(entry.target, summary)
+            elif summary is None and entry.resolved is not None:
+                summary = entry.resolved.summary
+            result[name] = summary
+        if cache is not None:
+            cache.save()
+        return result
+
+
+def _import_target(target: str):
+    module_name, _, qualname = target.partition(':')
+    obj = importlib.import_module(module_name)
+    for attr in qualname.split('.'):
+        obj = getattr(obj, attr)
+    return obj
+
+
+def _as_runnable(obj, target) -> Union[Command, CommandGroup]:
+    if isinstance(obj, (Command, CommandGroup)):
+        return obj
+    if callable(obj):
+        return command(obj)
+    raise TypeError(f"{target!r} is not a command, group or function")
+
+
+class _SummaryCache:
+    """Subcommand summaries keyed by import target, stored as JSON next to the specs
+
+    An entry is valid while the file of the target's module has the same mtime and
+    size as when the summary was read.
+    """
+    _FILENAME = 'summaries.json'
+
+    def __init__(self, path):
+        self.path = path
+        self._dirty = False
+        import json
+        try:
+            with open(path, encoding='utf-8') as f:
+                self._entries: Dict[str, List] = json.load(f)
+            if not isinstance(self._entries, dict):
+                raise ValueError
+        except (OSError, ValueError):
+            self._entries = {}
+
+    @classmethod
+    def resolve(cls, summary_cache) -> Optional['_SummaryCache']:
+        if summary_cache is None and os.environ.get('AUTOARG_SPEC_CACHE', '') in ('', '0'):
+            return None  # without importing autoarg.cache
+        from .cache import resolve_spec_cache
+        spec_cache = resolve_spec_cache(summary_cache)
+        if spec_cache is None:
+            return None
+        return cls(spec_cache.directory / cls._FILENAME)
+
+    def get(self, target: str) -> Optional[str]:
+        try:
+            summary, path, stamp = self._entries[target]
+            if list(_stamp(path)) == stamp:
+                return summary
+        except (KeyError, ValueError, TypeError, OSError):
+            pass
+        return None
+
+    def put(self, target: str, summary: str):
+        module = sys.modules.get(target.partition(':')[0])
+        path = getattr(module, '__file__', None)
+        if path is None:
+            return
+        try:
+            self._entries[target] = [summary, path, list(_stamp(path))]
+        except OSError:
+            return
+        self._dirty = True
+
+    def save(self):
+        if not self._dirty:
+            return
+        import json
+        from .cache import _atomic_write
+        _atomic_write(self.path, json.dumps(self._entries).encode())
+        self._dirty = False
+
+
+def _stamp(path: str):
+    st = os.stat(path)
+    return st.st_mtime_ns, st.st_size
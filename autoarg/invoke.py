@@ -0,0 +1,374 @@
+"""Calling commands with typed values instead of argv
+
+`Command.invoke(mapping)` takes the arguments as a dict from parameter names to
+values that are already typed (an Enum member, a tuple of ints, a list for an
+`Append`), checks and coerces them against the types the parser would have converted
+argument strings to, and calls the function. A string is still accepted wherever a
+single value is, and is converted as it would be on the command line. Parameters that
+aren't given get the function's defaults; mistakes raise `ParseError`, and nothing
+is ever printed.
+
+`Command.serve_jsonl(stdin, stdout)` is a worker loop around `invoke`: each line of
+input is a JSON object of arguments, and each gets one line of output, in order:
+`{"result": ...}`, or `{"error": {"type": ..., "message": ...}}` (with the
+`argument`, `token` and `reason` of a `ParseError`). What the command prints is
+captured rather than mixed into the responses, and returned as the response's
+`"output"`. Blank lines are skipped. Input is read in large chunks, and the
+responses to all the requests in a chunk are written and flushed together.
+"""
+import io
+import os
+import sys
+from argparse import ArgumentTypeError
+from array import array
+from enum import Enum
+from typing import Any, Callable, Dict, Iterable, List, Mapping, Optional, Tuple
+
+from .arrays import _ArrayConverter, _to_numpy
+from .choices import _EnumLookup
+from .errors import ParseError
+from .files import _FileFactory, _JSONFactory
+from .generate import _conversion_error, _EachFactory, _Postprocess, _TupleFactory
+from .output import _jsonable
+from .spec import KEYWORD, POSITIONAL, VAR_POSITIONAL, ArgSpec, CommandSpec
+from .streams import _StreamItem, _StreamPostprocess
+
+__all__ = [
+    'serve_jsonl',
+]
+
+_CHUNK_SIZE = 1 << 16
+
+
+class _Invoker:
+    """Turns a mapping of typed values into the function's arguments
+
+    The coercion of each parameter is worked out once, from the `CommandSpec` the parser
+    was built from; which parameters may be left out comes from the function's own
+    (sanitized) defaults.
+    """
+    def __init__(self, spec: CommandSpec, func: Callable):
+        by_dest: Dict[str, List[ArgSpec]] = {}
+        for arg in spec.arguments:
+            if arg.method == 'add_argument':
+                by_dest.setdefault(arg.dest, []).append(arg)
+        converts = {
+            post.dest: post
+            for post in spec.postprocessors
+            if isinstance(post, (_Postprocess, _StreamPostprocess))
+        }
+        self._known = frozenset(dest for dest, _ in spec.bindings)
+        self._coerce: Dict[str, Callable[[Any], Any]] = {
+            dest: _coercion(dest, by_dest[dest], converts.get(dest))
+            for dest, _ in spec.bindings
+            if dest in by_dest  # Level parameters have none of their own
+        }
+
+        defaults = getattr(func, '__defaults__', None) or ()
+        kwdefaults = getattr(func, '__kwdefaults__', None) or {}
+        self._positional = [dest for dest, how in spec.bindings if how == POSITIONAL]
+        self._defaults = dict(zip(self._positional[len(self._positional) - len(defaults):],
+                                  defaults))
+        self._var_positional = next(
+            (dest for dest, how in spec.bindings if how == VAR_POSITIONAL), None
+        )
+        self._required = [
+            dest for dest in self._positional if self._defaults.get(dest, ...) is ...
+        ] + [
+            dest for dest, how in spec.bindings
+            if how == KEYWORD and kwdefaults.get(dest, ...) is ...
+        ]
+
+    def __call__(self, mapping: Mapping[str, Any]) -> Tuple[list, dict]:
+        unknown = [str(key) for key in mapping if key not in self._known]
+        if unknown:
+            raise ParseError(
+                f"unrecognized arguments: {', '.join(unknown)}",
+                token=unknown[0], reason="unrecognized arguments",
+            )
+        missing = [dest for dest in self._required if dest not in mapping]
+        if missing:
+            raise ParseError(f"the following arguments are required: {', '.join(missing)}")
+
+        kwargs = {}
+        for key, value in mapping.items():
+            coerce = self._coerce.get(key)
+            if coerce is None:
+                kwargs[key] = value
+                continue
+            try:
+                kwargs[key] = coerce(value)
+            except (ArgumentTypeError, TypeError, ValueError) as err:
+                error = _conversion_error(key, ValueError(str(err)))
+                error.token = value if isinstance(value, str) else None
+                raise error from None
+
+        # positionals go by position (some may be positional-only), up to the last one given
+        rest = kwargs.pop(self._var_positional, None) if self._var_positional else None
+        given = len(self._positional) if rest else max(
+            (i + 1 for i, dest in enumerate(self._positional) if dest in kwargs), default=0
+        )
+        args = [
+            kwargs.pop(dest) if dest in kwargs else self._defaults[dest]
+            for dest in self._positional[:given]
+        ]
+        if rest:
+            args.extend(rest)
+        return args, kwargs
+
+
+def _coercion(dest: str, args: List[ArgSpec], post) -> Callable[[Any], Any]:
+    first = args[0]
+    action = first.get('action')
+    nargs = first.get('nargs')
+    convert = post.convert if post is not None else None
+
+    if isinstance(post, _StreamPostprocess):
+        item: _StreamItem = post.convert
+        return _Each(_Item(dest, item.factory, item.choices, item.postprocessor), lazy=True)
+    if action in ('store_true', 'store_false'):
+        return _Bool()
+    if action == 'count':
+        return _Count()
+    if action == 'store_const':  # a group of flags, one per Literal value
+        return _OneOf([arg.get('const') for arg in args])
+    if action == 'append_const':
+        return _Each(_OneOf([arg.get('const') for arg in args]))
+    if first.get('flag_values') is not None:  # the same, as a single _FlagChoiceAction
+        return _OneOf(first.get('flag_values').values())
+    if isinstance(convert, _ArrayConverter):
+        return _ArrayValue(convert)
+
+    each = action == 'append' or nargs in ('*', '+', '...', 'A...')
+    if isinstance(convert, _EachFactory):
+        convert = convert.convert
+    if isinstance(convert, _TupleFactory):
+        item = _Fixed([_Item(dest, T, None, None) for T in convert.types])
+    else:
+        item = _Item(dest, first.get('type'), first.get('choices'), convert)
+        if isinstance(nargs, int):
+            item = _Fixed([item] * nargs)
+    if each:
+        return _Each(item, at_least=1 if nargs == '+' else 0)
+    return item
+
+
+class _Item:
+    """Coerces a single value
+
+    A string is converted the way argparse would have (see `_StreamItem`). Anything else
+    has to be an instance of the type it would have been converted to, or convertible
+    to it without loss: an `int` for a `float`, the value of an Enum member.
+    """
+    def __init__(self, dest: str, factory, choices, convert):
+        self.from_text = _StreamItem(dest, factory, choices, convert)
+        self.target = convert.enum_class if isinstance(convert, _EnumLookup) else factory
+        self.choices = None if isinstance(convert, _EnumLookup) else choices
+
+    def __call__(self, value):
+        target = self.target
+        if isinstance(target, _JSONFactory):
+            return value  # already decoded
+        if isinstance(value, str):
+            return self.from_text(value)
+        if target is None:
+            raise TypeError(f"expected a string, not {type(value).__name__}")
+        if isinstance(target, _FileFactory):
+            if isinstance(value, os.PathLike):
+                return target(os.fspath(value))
+            return value  # an open file, presumably
+        if isinstance(target, type):
+            value = _coerce_to(target, value)
+        if self.choices is not None and value not in self.choices:
+            raise ValueError(f"invalid choice: {value!r}")
+        return value
+
+
+def _coerce_to(target: type, value):
+    if isinstance(value, target) and not (isinstance(value, bool) and target is not bool):
+        return value
+    if issubclass(target, Enum):
+        return target(value)  # by value, or the usual ValueError
+    if target is float and isinstance(value, int) and not isinstance(value, bool):
+        return float(value)
+    raise TypeError(f"expected {target.__name__}, not {type(value).__name__}")
+
+
+class _Bool:
+    def __call__(self, value):
+        if not isinstance(value, bool):
+            raise TypeError(f"expected a bool, not {type(value).__name__}")
+        return value
+
+
+class _Count:
+    def __call__(self, value):
+        if not isinstance(value, int) or isinstance(value, bool) or value < 0:
+            raise ValueError(f"expected a count of at least 0, not {value!r}")
+        return value
+
+
+class _OneOf:
+    def __init__(self, values: Iterable[Any]):
+        self.values = list(values)
+
+    def __call__(self, value):
+        if value not in self.values:
+            shown = ', '.join(map(repr, self.values[:25]))
+            raise ValueError(f"invalid choice: {value!r} (choose from {shown})")
+        return value
+
+
+class _Each:
+    """Coerces every item of a list (or, with `lazy`, of an iterable, as it is consumed)
+    """
+    def __init__(self, item: Callable[[Any], Any], *, at_least=0, lazy=False):
+        self.item = item
+        self.at_least = at_least
+        self.lazy = lazy
+
+    def __call__(self, values):
+        if isinstance(values, (str, bytes)) or not hasattr(values, '__iter__'):
+            raise TypeError(f"expected a list, not {type(values).__name__}")
+        if self.lazy:
+            return map(self.item, values)
+        values = [self.item(value) for value in values]
+        if len(values) < self.at_least:
+            raise ValueError(f"expected at least {self.at_least} value")
+        return values
+
+
+class _Fixed:
+    """Coerces a sequence of a fixed length into a tuple, item by item
+    """
+    def __init__(self, items: List[Callable[[Any], Any]]):
+        self.items = items
+
+    def __call__(self, values):
+        if isinstance(values, (str, bytes)) or not hasattr(values, '__len__'):
+            raise TypeError(f"expected {len(self.items)} values, not {type(values).__name__}")
+        if len(values) != len(self.items):
+            raise ValueError(f"expected {len(self.items)} values, got {len(values)}")
+        return tuple(item(value) for item, value in zip(self.items, values))
+
+
+class _ArrayValue:
+    def __init__(self, convert: _ArrayConverter):
+        self.convert = convert
+
+    def __call__(self, values):
+        if isinstance(values, (str, bytes)) or not hasattr(values, '__iter__'):
+            raise TypeError(f"expected numbers, not {type(values).__name__}")
+        convert = self.convert
+        values = list(values)
+        if any(isinstance(value, str) for value in values):
+            return convert(values)  # converted like argument strings
+        if any(isinstance(value, bool) for value in values):
+            raise TypeError(f"expected {convert.item_type.__name__} values, not bool")
+        if len(values) % convert.size:
+            raise ValueError(f"expected a multiple of {convert.size} values, got {len(values)}")
+        try:
+            result = array(convert.typecode, values)  # no silent truncation of floats to ints
+        except TypeError:
+            raise TypeError(f"expected {convert.item_type.__name__} values") from None
+        if convert.numpy:
+            return _to_numpy(result, convert.size)
+        return result
+
+
+def serve_jsonl(command, stdin=None, stdout=None, *, decoder=None, encoder=None) -> int:
+    """Invokes `command` once per JSON object in `stdin`, writing one response line each
+
+    `stdin` and `stdout` default to the standard streams; text or binary files work.
+    `decoder` and `encoder` replace `json.loads` and `json.dumps` (e.g. with orjson's;
+    the encoder may return `str` or `bytes`). Returns the number of failed requests.
+    What the command prints is sent back as the `"output"` of its response.
+    """
+    import json  # only workers pay for importing it
+
+    from .parallel import _routed_stdout
+    stdin = sys.stdin if stdin is None else stdin
+    stdout = sys.stdout if stdout is None else stdout
+    stdin = getattr(stdin, 'buffer', stdin)  # reading and writing bytes skips a codec
+    stdout = getattr(stdout, 'buffer', stdout)
+    text_out = isinstance(stdout, io.TextIOBase)  # e.g. a StringIO
+    decode = decoder or json.loads
+    encode = encoder or _json_encoder(json)
+    read = getattr(stdin, 'read1', stdin.read)
+    failures = 0
+
+    def write(data: bytes):
+        stdout.write(data.decode() if text_out else data)
+
+    def respond(line: bytes) -> bytes:
+        nonlocal failures
+        response = _response(command, decode, line, router)
+        try:
+            encoded = encode(response)
+        except (TypeError, ValueError) as err:
+            response = _error('TypeError', f"result can't be encoded: {err}")
+            encoded = encode(response)
+        if 'error' in response:
+            failures += 1
+        return (encoded.encode() if isinstance(encoded, str) else encoded) + b'\n'
+
+    partial = []  # pieces of a line that spans chunks
+    with _routed_stdout() as router:
+        while True:
+            chunk = read(_CHUNK_SIZE)
+            if not chunk:
+                break
+            if isinstance(chunk, str):
+                chunk = chunk.encode()
+            *lines, rest = chunk.split(b'\n')
+            if lines and partial:
+                partial.append(lines[0])
+                lines[0] = b''.join(partial)
+                partial = []
+            partial.append(rest)
+            responses = [respond(line) for line in lines if line.strip()]
+            if responses:
+                write(b''.join(responses))
+                stdout.flush()
+        line = b''.join(partial)
+        if line.strip():
+            write(respond(line))
+        stdout.flush()
+    return failures
+
+
+def _response(command, decode, line: bytes, router) -> Dict[str, Any]:
+    try:
+        request = decode(line)
+    except ValueError as err:
+        return _parse_error(ParseError(f"invalid JSON: {err}"))
+    if not isinstance(request, dict):
+        return _parse_error(ParseError(f"expected a JSON object, not {type(request).__name__}"))
+    buffer = router.capture()
+    try:
+        response = {'result': command.invoke(request)}
+    except ParseError as err:
+        response = _parse_error(err)
+    except (Exception, SystemExit) as err:
+        response = _error(type(err).__name__, str(err))
+    finally:
+        router.release()
+    output = buffer.getvalue()
+    if output:
+        response['output'] = output  # what the command printed, kept out of the protocol
+    return response
+
+
+def _parse_error(err: ParseError) -> Dict[str, Any]:
+    return _error('ParseError', err.message, argument=err.argument, token=err.token,
+                  reason=err.reason)
+
+
+def _error(kind: str, message: str, **details: Optional[str]) -> Dict[str, Any]:
+    return {'error': {'type': kind, 'message': message, **details}}
+
+
+def _json_encoder(json):
+    def encode(value) -> str:
+        return json.dumps(value, default=_jsonable, ensure_ascii=False)
+    return encode
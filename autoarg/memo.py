@@ -0,0 +1,317 @@
+"""Remembering the results of commands that are pure functions of their arguments
+
+With `@command(cache=True)` (or a directory, or a `ResultCache`), each invocation is
+keyed by the parsed arguments and the command's code, and what it returned and printed
+is stored on disk. Running it again with the same arguments - in this process or any
+later one - replays the output and returns the stored value without calling the
+function. This suits transforms that pipelines and build tools run over and over on
+inputs that mostly haven't changed.
+
+`File[...]` inputs are keyed by their absolute path, size and modification time, or
+by a hash of their contents with `ResultCache(files='hash')`. Invocations that can't
+be keyed reliably are simply run: ones that write files or read stdin, consume a
+`Stream`, or have arguments without a stable repr. Calls that raise, and results that
+can't be pickled, aren't stored.
+
+Entries are evicted least recently used first once there are more than `max_entries`
+of them or they take up more than `max_bytes`. Cached commands get a `--no-cache`
+flag, which runs the function regardless and replaces the stored entry. Hits, misses
+and the rest are counted in `ResultCache.info()`.
+
+The function's output is captured while it runs (see `autoarg.parallel`), so it only
+appears once the call has returned. Results are only keyed by the arguments: a
+command whose result depends on anything else, such as the environment, the current
+directory or the time, shouldn't be cached.
+"""
+import hashlib
+import os
+import pickle
+import sys
+import threading
+import time
+from array import array
+from contextlib import nullcontext
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple, Union
+from weakref import WeakKeyDictionary
+
+from .cache import _atomic_write, _Unserializable, default_cache_dir, fingerprint
+from .files import LazyFile
+from .spec import ArgSpec
+
+__all__ = [
+    'ResultCache',
+    'resolve_result_cache',
+]
+
+_FORMAT_VERSION = 1
+_HASH_CHUNK_SIZE = 1 << 20
+
+# added to the parser of cached commands, which read it from the parse's extras
+_NO_CACHE_ARGUMENT = ArgSpec('add_argument', ['--no-cache'], {
+    'dest': '_no_cache_',
+    'action': 'store_true',
+    'help': "run the command even if its result is cached, replacing the cached result",
+})
+
+
+class _Uncacheable(Exception):
+    pass
+
+
+def resolve_result_cache(cache) -> Optional['ResultCache']:
+    """Interprets the `cache` argument of `command`
+    """
+    if cache is None or cache is False:
+        return None
+    if cache is True:
+        return ResultCache(default_cache_dir() / 'results')
+    if isinstance(cache, ResultCache):
+        return cache
+    return ResultCache(cache)
+
+
+class ResultCache:
+    """A directory of pickled command results, bounded in number and total size
+
+    `files` is how `File[...]` inputs are keyed: `'stat'` (path, size and modification
+    time) or `'hash'` (path and SHA-256 of the contents, which costs a full read but
+    isn't fooled by files that are rewritten with the same contents, or touched).
+    """
+    def __init__(self, directory: Union[str, os.PathLike], *, max_entries: int = 1024,
+                 max_bytes: int = 256 << 20, files: str = 'stat'):
+        if files not in ('stat', 'hash'):
+            raise TypeError(f"files must be 'stat' or 'hash', not {files!r}")
+        self.directory = Path(directory)
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.files = files
+        self.hits = 0
+        self.misses = 0
+        self.bypassed = 0  # uncacheable arguments, or --no-cache
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._function_keys: 'WeakKeyDictionary[Callable, Optional[str]]' = WeakKeyDictionary()
+
+    def _path(self, key: str) -> Path:
+        return self.directory / f'{key}.pickle'
+
+    def call(self, command, args: list, kwargs: dict, *, refresh=False):
+        """Calls `command` with already parsed arguments, or replays its cached result
+
+        With `refresh`, the function is called anyway and its result replaces the
+        cached one.
+        """
+        with _phase(command.stats, 'cache_lookup'):
+            key = self.key(command, args, kwargs)
+            entry = None if key is None or refresh else self.load(key)
+        if entry is not None:
+            self._count('hits')
+            command._close_files(args, kwargs)
+            value, output = entry
+            if output:
+                sys.stdout.write(output)
+            return value
+
+        self._count('misses' if key is not None and not refresh else 'bypassed')
+        if key is None:
+            return command._call_uncached(args, kwargs)
+        value, output = _call_captured(command, args, kwargs)
+        with _phase(command.stats, 'cache_store'):
+            self.store(key, value, output)
+        return value
+
+    def key(self, command, args: Sequence[Any], kwargs: Dict[str, Any]) -> Optional[str]:
+        """The key of an invocation, or None if it can't be keyed reliably
+        """
+        func = command._spec_func
+        try:
+            func_key = self._function_keys[func]
+        except (KeyError, TypeError):
+            func_key = self._function_keys[func] = _function_key(func)
+        if func_key is None:
+            return None
+        try:
+            normalized = repr((
+                _FORMAT_VERSION,
+                func_key,
+                [self._normalize(value) for value in args],
+                sorted((name, self._normalize(value)) for name, value in kwargs.items()),
+            ))
+        except (_Uncacheable, OSError):
+            return None
+        if ' at 0x' in normalized:
+            return None  # something in there has no stable repr
+        return hashlib.sha256(normalized.encode()).hexdigest()
+
+    def _normalize(self, value) -> Any:
+        if value is None or isinstance(value, (str, bytes, bool, int, float)):
+            return value
+        if isinstance(value, LazyFile):
+            return self._file_key(value)
+        if isinstance(value, (list, tuple)):
+            return (type(value).__name__, [self._normalize(item) for item in value])
+        if isinstance(value, dict):
+            return ('dict', sorted((repr(k), self._normalize(v)) for k, v in value.items()))
+        if isinstance(value, (set, frozenset)):
+            return (type(value).__name__, sorted(repr(self._normalize(item)) for item in value))
+        if isinstance(value, array):
+            return ('array', value.typecode, hashlib.sha256(value).hexdigest())
+        if hasattr(value, 'dtype') and hasattr(value, 'tobytes'):  # NumPy arrays
+            digest = hashlib.sha256(value.tobytes()).hexdigest()
+            return ('ndarray', str(value.dtype), getattr(value, 'shape', ()), digest)
+        if hasattr(value, '__next__'):
+            raise _Uncacheable(value)  # a Stream, which can only be consumed once
+        return repr(value)
+
+    def _file_key(self, file: LazyFile) -> tuple:
+        if file.path == '-' or not file.reading:
+            raise _Uncacheable(file)  # stdin can't be keyed, and outputs must be written
+        path = os.path.abspath(file.path)
+        st = os.stat(path)
+        if self.files == 'stat':
+            return ('file', path, file.mode, st.st_size, st.st_mtime_ns)
+        digest = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(_HASH_CHUNK_SIZE), b''):
+                digest.update(chunk)
+        return ('file', path, file.mode, st.st_size, digest.hexdigest())
+
+    def load(self, key: str) -> Optional[Tuple[Any, str]]:
+        """The `(value, output)` stored under `key`, marking it as recently used
+        """
+        path = self._path(key)
+        try:
+            with open(path, 'rb') as f:
+                version, value, output = pickle.load(f)
+        except Exception:
+            # missing, evicted meanwhile, corrupt or referring to something that moved
+            return None
+        if version != _FORMAT_VERSION:
+            return None
+        _touch(path)
+        return value, output
+
+    def store(self, key: str, value, output: str) -> bool:
+        try:
+            data = pickle.dumps((_FORMAT_VERSION, value, output), protocol=pickle.HIGHEST_PROTOCOL)
+        except Exception:
+            return False  # e.g. generators, open files, locally defined classes
+        if len(data) > self.max_bytes:
+            return False
+        if not _atomic_write(self._path(key), data):
+            return False
+        _touch(self._path(key))
+        self._evict()
+        return True
+
+    def _entries(self) -> List[Tuple[int, int, Path]]:
+        entries = []
+        for path in self.directory.glob('*.pickle'):
+            try:
+                st = path.stat()
+            except OSError:
+                continue  # removed by another process
+            entries.append((st.st_mtime_ns, st.st_size, path))
+        return entries
+
+    def _evict(self):
+        entries = self._entries()
+        total = sum(size for _, size, _ in entries)
+        if len(entries) <= self.max_entries and total <= self.max_bytes:
+            return
+        entries.sort()  # least recently used first
+        n = len(entries)
+        for _, size, path in entries:
+            if n <= self.max_entries and total <= self.max_bytes:
+                break
+            try:
+                path.unlink()
+            except OSError:
+                continue
+            n -= 1
+            total -= size
+            self._count('evictions')
+
+    def _count(self, counter: str):
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def info(self) -> Dict[str, Any]:
+        """Hit and miss counts for this process, and the size of the store
+        """
+        entries = self._entries()
+        looked_up = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'bypassed': self.bypassed,
+            'evictions': self.evictions,
+            'hit_rate': self.hits / looked_up if looked_up else None,
+            'entries': len(entries),
+            'bytes': sum(size for _, size, _ in entries),
+        }
+
+    def clear(self):
+        for entry in self.directory.glob('*.pickle'):
+            try:
+                entry.unlink()
+            except OSError:
+                pass
+
+    def __reduce__(self):
+        return _unpickle_cache, (self.directory, self.max_entries, self.max_bytes, self.files)
+
+    def __repr__(self):
+        return f"ResultCache({str(self.directory)!r})"
+
+
+def _touch(path: Path):
+    # the file system's own timestamps may only tick every few milliseconds
+    now = time.time_ns()
+    try:
+        os.utime(path, ns=(now, now))
+    except OSError:
+        pass
+
+
+def _unpickle_cache(directory, max_entries, max_bytes, files) -> ResultCache:
+    return ResultCache(directory, max_entries=max_entries, max_bytes=max_bytes, files=files)
+
+
+def _function_key(func: Callable) -> Optional[str]:
+    try:
+        key = fingerprint(func)
+    except _Unserializable:
+        return None
+    closure = getattr(func, '__closure__', None)
+    if closure:
+        # a local function's result may depend on the variables it closes over
+        try:
+            cells = repr([cell.cell_contents for cell in closure])
+        except ValueError:  # an empty cell
+            return None
+        if ' at 0x' in cells:
+            return None
+        key = hashlib.sha256(f'{key}{cells}'.encode()).hexdigest()
+    return key
+
+
+def _call_captured(command, args: list, kwargs: dict) -> Tuple[Any, str]:
+    """Calls the command, capturing what it prints, which is written out afterwards
+    """
+    from .parallel import _routed_stdout
+    with _routed_stdout() as router:
+        buffer = router.capture()
+        try:
+            value = command._call_uncached(args, kwargs)
+        finally:
+            router.release()
+            output = buffer.getvalue()
+            if output:
+                sys.stdout.write(output)
+    return value, output
+
+
+def _phase(stats, name: str):
+    return nullcontext() if stats is None else stats.phase(name)
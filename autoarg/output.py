@@ -0,0 +1,175 @@
+"""Streaming the items of commands that yield their results
+
+When the function of a command run with `main()` returns an iterator (a generator
+function, typically), the items are written to stdout as they are produced instead of
+the function printing each one. They are formatted by the writer that
+`--output-format` selects and encoded in batches, with one write per batch rather than
+per line:
+
+    lines   str(item) on a line of its own (the default)
+    jsonl   one JSON document per line
+    csv     one row per item: a tuple or list is a row, a dict is a row under a header
+            made of the first dict's keys, anything else is a row of one column
+    nul     str(item) followed by a NUL byte, for `xargs -0`
+
+`--output-format` is added to the commands of generator functions and of functions
+annotated to return an `Iterator`, `Iterable` or `Generator`. More formats can be
+added with `register_format` before the parser is built.
+
+The exit status comes from the generator's return value, like a plain function's.
+When the reader goes away (`... | head`), the generator is closed and the process
+exits with status 141, as if killed by SIGPIPE, without a traceback.
+"""
+import os
+import sys
+from enum import Enum
+from typing import Any, Callable, Dict, Iterable, Iterator
+
+from .spec import ArgSpec
+
+__all__ = [
+    'FORMATS',
+    'register_format',
+    'stream',
+]
+
+_BUFFER_SIZE = 1 << 16
+_BROKEN_PIPE_STATUS = 141  # 128 + SIGPIPE, what the shell reports for a killed writer
+
+
+def _lines(items: Iterable[Any]) -> Iterator[str]:
+    return map('{}\n'.format, items)
+
+
+def _nul(items: Iterable[Any]) -> Iterator[str]:
+    return map('{}\0'.format, items)
+
+
+def _jsonl(items: Iterable[Any]) -> Iterator[str]:
+    import json  # only commands that write JSON pay for importing it
+    encode = json.JSONEncoder(default=_jsonable, ensure_ascii=False).encode
+    for item in items:
+        yield encode(item) + '\n'
+
+
+def _csv(items: Iterable[Any]) -> Iterator[str]:
+    import csv
+    import io
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator='\n')
+    header = None
+    for item in items:
+        if isinstance(item, dict):
+            if header is None:
+                header = list(item)
+                writer.writerow(header)
+            writer.writerow([item.get(key, '') for key in header])
+        elif isinstance(item, (tuple, list)):
+            writer.writerow(item)
+        else:
+            writer.writerow([item])
+        # the writer only writes to a file, so the row is taken back out of the buffer
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+
+
+FORMATS: Dict[str, Callable[[Iterable[Any]], Iterable[str]]] = {
+    'lines': _lines,
+    'jsonl': _jsonl,
+    'csv': _csv,
+    'nul': _nul,
+}
+
+
+def register_format(name: str, writer: Callable[[Iterable[Any]], Iterable[str]]):
+    """Makes `writer` available as `--output-format NAME`
+
+    `writer` takes the iterator of items and returns (or yields) the text to write,
+    in pieces of any size.
+    """
+    FORMATS[name] = writer
+
+
+def stream(items: Iterator[Any], format: str = 'lines', file=None) -> Any:
+    """Writes the items to `file` (default: stdout) in `format`, returning what the
+    generator returned, if anything
+
+    Raises `BrokenPipeError` if the reader goes away, after closing the generator.
+    """
+    file = sys.stdout if file is None else file
+    file.flush()  # anything printed before goes first
+    binary = getattr(file, 'buffer', None)
+    if binary is not None:
+        encoding, errors = file.encoding or 'utf-8', file.errors or 'strict'
+
+        def write(text: str):
+            binary.write(text.encode(encoding, errors))
+    else:
+        write = file.write
+
+    returned = _Returned()
+    pieces = []
+    size = 0
+    try:
+        for piece in FORMATS[format](returned.track(items)):
+            pieces.append(piece)
+            size += len(piece)
+            if size >= _BUFFER_SIZE:
+                write(''.join(pieces))
+                pieces.clear()
+                size = 0
+        write(''.join(pieces))
+        (binary or file).flush()
+    except BrokenPipeError:
+        close = getattr(items, 'close', None)
+        if close is not None:
+            close()  # runs the generator's `finally` blocks
+        raise
+    return returned.value
+
+
+class _Returned:
+    """Keeps the return value of the generator it passes the items of through
+    """
+    value = None
+
+    def track(self, items: Iterator[Any]) -> Iterator[Any]:
+        self.value = yield from items
+
+
+def _format_argument() -> ArgSpec:
+    """`--output-format`, for the parsers of commands that yield their results
+    """
+    return ArgSpec('add_argument', ['--output-format'], {
+        'dest': '_output_format_',
+        'choices': tuple(FORMATS),
+        'default': 'lines',
+        'help': "how to write the items the command yields (default: %(default)s)",
+    })
+
+
+def _exit_after_broken_pipe() -> int:
+    """Points stdout at /dev/null, so that nothing fails flushing it at exit, and returns
+    the exit status to use
+    """
+    try:
+        devnull = os.open(os.devnull, os.O_WRONLY)
+        os.dup2(devnull, sys.stdout.fileno())
+    except (OSError, ValueError, AttributeError):  # no real stdout to redirect
+        pass
+    return _BROKEN_PIPE_STATUS
+
+
+def _jsonable(value):
+    """What `json.dumps` should write for the values it doesn't know
+    """
+    if isinstance(value, Enum):
+        return value._value_
+    if isinstance(value, (set, frozenset)):
+        return list(value)
+    if isinstance(value, os.PathLike):
+        return os.fspath(value)
+    if hasattr(value, 'tolist'):  # array.array, NumPy arrays and scalars
+        return value.tolist()
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
@@ -0,0 +1,226 @@
+"""Calling a command once per element of its variadic positional, in a pool
+
+With `@command(map_over='files', workers=N)`, `grep(pattern, *files)` is called as
+`grep(pattern, *chunk)` for each chunk of `files` (one element by default) on a
+thread or process pool, with every other argument passed unchanged. What each call
+prints to stdout is captured and written out in the order results are merged (input
+order, or completion order with `ordered=False`), so output from different calls
+never interleaves.
+"""
+import io
+import sys
+import threading
+from contextlib import contextmanager
+from typing import Any, Iterator, List, NoReturn, Optional, Sequence
+
+from .batch import BatchResult, _command_reference, _resolve_command, _run_pooled
+from .decorators import _is_coroutine_function
+
+__all__ = [
+    'MapOptions',
+]
+
+
+class MapOptions:
+    """How a `map_over` command distributes its variadic positional
+    """
+    __slots__ = ('param', 'workers', 'executor', 'chunksize', 'ordered')
+
+    def __init__(self, param: str, *, workers: Optional[int] = None, executor='thread',
+                 chunksize: int = 1, ordered=True):
+        if executor not in ('thread', 'process'):
+            raise TypeError(f"unknown executor: {executor!r}")
+        if chunksize < 1:
+            raise TypeError(f"chunksize must be positive, not {chunksize}")
+        self.param = param
+        self.workers = workers
+        self.executor = executor
+        self.chunksize = chunksize
+        self.ordered = ordered
+
+
+def map_results(command, args: Sequence[Any], kwargs) -> Iterator[BatchResult]:
+    """Runs one call per chunk, yielding a `BatchResult` (whose `argv` is the chunk) each
+
+    Each call's captured stdout is written just before its result is yielded.
+    """
+    options: MapOptions = command._map
+    n_fixed = command._func.__code__.co_argcount
+    fixed, items = tuple(args[:n_fixed]), args[n_fixed:]
+    step = options.chunksize
+    chunks = (items[i:i + step] for i in range(0, len(items), step))
+    workers = options.workers or _default_workers()
+
+    if options.executor == 'process':
+        if any(_is_output(value) for value in (*fixed, *kwargs.values())):
+            raise TypeError(
+                f"{command.__name__}: a File opened for writing can't be shared"
+                + " between worker processes"
+            )
+        target = _command_reference(command)
+        make_pool = _process_pool
+    else:
+        target = command._func
+        make_pool = _thread_pool
+
+    def submit(pool, index, chunk):
+        return pool.submit(_call_captured, target, index, chunk, fixed, kwargs)
+
+    try:
+        with _routed_stdout():
+            for result in _run_pooled(make_pool, workers, options.ordered, chunks, submit):
+                if result.ok:
+                    result.value, result.error, output = result.value
+                    if output:
+                        sys.stdout.write(output)
+                yield result
+    finally:
+        # shared by every call, so only closed once they have all finished
+        from .files import close_files
+        close_files(fixed)
+        close_files(kwargs.values())
+
+
+def _is_output(value) -> bool:
+    from .files import LazyFile
+    return isinstance(value, LazyFile) and not value.reading
+
+
+def map_run(command, args, kwargs) -> List[Any]:
+    """The return value of each call, in merge order; re-raises the first failure
+    """
+    values = []
+    results = map_results(command, args, kwargs)
+    try:
+        for result in results:
+            if not result.ok:
+                raise result.error
+            values.append(result.value)
+    finally:
+        results.close()  # waits for the calls still running before closing the files
+    return values
+
+
+def map_main(command, args, kwargs) -> NoReturn:
+    """Exits with the highest exit status of all the calls
+
+    Calls that raise are reported on stderr and count as status 1; the rest still run.
+    """
+    status = 0
+    for result in map_results(command, args, kwargs):
+        if not result.ok and not isinstance(result.error, SystemExit):
+            sys.stdout.flush()
+            print(f"{command.__name__}: {result.argv!r}: {result.error!r}", file=sys.stderr)
+        status = max(status, result.exit_status)
+    sys.exit(status)
+
+
+def _default_workers() -> int:
+    import os
+    return os.cpu_count() or 1
+
+
+def _thread_pool(workers):
+    from concurrent.futures import ThreadPoolExecutor
+    return ThreadPoolExecutor(workers)
+
+
+def _process_pool(workers):
+    from concurrent.futures import ProcessPoolExecutor
+    return ProcessPoolExecutor(workers)
+
+
+def _call_captured(target, index: int, chunk, fixed, kwargs) -> BatchResult:
+    """Calls `target` with one chunk
+
+    The result's value is `(value, error, output)`, so that what the call printed is
+    kept even when it fails.
+    """
+    in_process = isinstance(target, tuple)
+    if in_process:  # in a worker process
+        target = _resolve_command(target)._func
+    args = fixed + tuple(chunk)
+    value = error = None
+    with _routed_stdout() as router:
+        buffer = router.capture()
+        try:
+            value = target(*args, **kwargs)
+            if _is_coroutine_function(target):
+                import asyncio
+                value = asyncio.run(value)
+        except (Exception, SystemExit) as err:
+            error = err
+        finally:
+            router.release()
+            from .files import close_files
+            if in_process:  # the worker's own copies of the shared arguments
+                close_files(args)
+                close_files(kwargs.values())
+            else:  # the shared arguments are closed once the whole map is done
+                close_files(chunk)
+    return BatchResult(index, chunk, value=(value, error, buffer.getvalue()))
+
+
+class _StdoutRouter:
+    """Stands in for `sys.stdout`, sending each thread's writes to its own buffer
+    """
+    def __init__(self, stream):
+        self.stream = stream
+        self.local = threading.local()
+        self.users = 0
+
+    def capture(self) -> io.StringIO:
+        """A new buffer for this thread's writes, until `release()`
+
+        Captures nest: releasing one sends the writes back to the enclosing capture.
+        """
+        buffer = io.StringIO()
+        self._buffers().append(buffer)
+        return buffer
+
+    def release(self):
+        self._buffers().pop()
+
+    def _buffers(self) -> List[io.StringIO]:
+        try:
+            return self.local.buffers
+        except AttributeError:
+            self.local.buffers = []
+            return self.local.buffers
+
+    def _target(self):
+        buffers = getattr(self.local, 'buffers', None)
+        return buffers[-1] if buffers else self.stream
+
+    def write(self, text):
+        return self._target().write(text)
+
+    def writelines(self, lines):
+        self._target().writelines(lines)
+
+    def flush(self):
+        self._target().flush()
+
+    def __getattr__(self, attr):
+        return getattr(self.stream, attr)
+
+
+_router_lock = threading.Lock()
+
+
+@contextmanager
+def _routed_stdout() -> Iterator[_StdoutRouter]:
+    """Installs a `_StdoutRouter` as `sys.stdout` for the duration (re-entrant)
+    """
+    with _router_lock:
+        router = sys.stdout
+        if not isinstance(router, _StdoutRouter):
+            router = sys.stdout = _StdoutRouter(sys.stdout)
+        router.users += 1
+    try:
+        yield router
+    finally:
+        with _router_lock:
+            router.users -= 1
+            if router.users == 0 and sys.stdout is router:
+                sys.stdout = router.stream
@@ -0,0 +1,263 @@
+"""The resolved arguments of a command, independent of introspection
+
+`CommandSpec` is what a function's signature is resolved to, and what everything
+downstream consumes: the argparse and fast parse engines, completion scripts and the
+spec cache. It lists the calls that build the parser (`ArgSpec`s), the namespace
+postprocessors, and how the parsed values bind to the function's parameters.
+
+Specs are immutable and hold no `inspect` objects or other leftovers of introspection.
+They hash, compare and pickle by value, so that specs resolved separately from the
+same signature are equal.
+"""
+from itertools import repeat
+from operator import is_
+from typing import Any, Callable, Dict, Iterable, Optional, Tuple
+from weakref import WeakValueDictionary
+
+__all__ = [
+    'ArgSpec',
+    'CommandSpec',
+    'KEYWORD',
+    'POSITIONAL',
+    'VAR_POSITIONAL',
+]
+
+# how a parsed value is passed to the function (see `CommandSpec.bindings`)
+POSITIONAL = 'positional'
+VAR_POSITIONAL = 'var_positional'
+KEYWORD = 'keyword'
+
+_CONTAINER_METHODS = ('add_argument_group', 'add_mutually_exclusive_group')
+
+# add_argument treats these the same whether they are None or not given at all
+_NONE_IS_DEFAULT = frozenset({'choices', 'const', 'help', 'metavar', 'nargs', 'type'})
+
+# one tuple per distinct set of option names, shared by every ArgSpec that has it
+_interned_keys: Dict[Tuple[str, ...], Tuple[str, ...]] = {}
+
+# equal ArgSpecs (e.g. the same --verbose on many commands) are shared too, as long as
+# their values are of the same types as well (a default of 1 isn't one of 1.0)
+_interned_args: 'WeakValueDictionary[tuple, ArgSpec]' = WeakValueDictionary()
+
+
+class _Frozen:
+    __slots__ = ()
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f"{type(self).__name__} is immutable")
+
+    def __delattr__(self, name):
+        raise AttributeError(f"{type(self).__name__} is immutable")
+
+
+class ArgSpec(_Frozen):
+    """One call that builds the parser: `method(*names, **options)` on a container
+
+    `method` is `'add_argument'`, `'add_argument_group'`,
+    `'add_mutually_exclusive_group'` or `'set_defaults'`. Container 0 is the parser
+    itself; each group call adds the next one.
+    """
+    # everything in one tuple, which makes them quick to build, hash and compare
+    __slots__ = ('_key', '_hash', '__weakref__')
+
+    def __init__(self, method: str, names: Iterable[str] = (),
+                 options: Optional[Dict[str, Any]] = None, container: int = 0):
+        options = options or {}
+        values = tuple(options.values())
+        # `None in values` would compare with ==, which NumPy arrays (as defaults) refuse
+        if method == 'add_argument' and any(map(is_, values, repeat(None))):
+            options = dict(options)
+            for key in _NONE_IS_DEFAULT.intersection(options):
+                if options[key] is None:
+                    del options[key]
+            values = tuple(options.values())
+        keys = tuple(options)
+        keys = _interned_keys.setdefault(keys, keys)
+        object.__setattr__(self, '_key', (method, tuple(names), container, keys, values))
+
+    @property
+    def method(self) -> str:
+        return self._key[0]
+
+    @property
+    def names(self) -> Tuple[str, ...]:
+        return self._key[1]
+
+    @property
+    def container(self) -> int:
+        return self._key[2]
+
+    @property
+    def options(self) -> Dict[str, Any]:
+        """The keyword arguments of the call (a new dict each time)
+        """
+        return dict(zip(self._key[3], self._key[4]))
+
+    def get(self, key: str, default=None):
+        try:
+            return self._key[4][self._key[3].index(key)]
+        except ValueError:
+            return default
+
+    @property
+    def is_option(self) -> bool:
+        return self.method == 'add_argument' and bool(self.names) and self.names[0][:1] == '-'
+
+    @property
+    def dest(self) -> Optional[str]:
+        """The namespace attribute an `add_argument` call sets, worked out like argparse does
+        """
+        if self.method != 'add_argument':
+            return None
+        dest = self.get('dest')
+        if dest is not None:
+            return dest
+        if not self.is_option:
+            return self.names[0]
+        long_names = [name for name in self.names if name[:2] == '--']
+        return (long_names or list(self.names))[0].lstrip('-').replace('-', '_')
+
+    def apply(self, container):
+        """Makes the call on `container`, returning what it returns
+        """
+        method, names, _, keys, values = self._key
+        return getattr(container, method)(*names, **dict(zip(keys, values)))
+
+    def __eq__(self, other):
+        if not isinstance(other, ArgSpec):
+            return NotImplemented
+        return self is other or (hash(self) == hash(other) and self._key == other._key)
+
+    def __hash__(self):
+        try:
+            return self._hash
+        except AttributeError:
+            object.__setattr__(self, '_hash', hash(_freeze(self._key)))
+            return self._hash
+
+    def __reduce__(self):
+        return _unpickle_arg, (self._key,)
+
+    def __repr__(self):
+        args = [repr(self.method), repr(self.names)]
+        args.extend(f'{key}={value!r}' for key, value in zip(self._key[3], self._key[4]))
+        if self.container:
+            args.append(f'container={self.container}')
+        return f"ArgSpec({', '.join(args)})"
+
+
+class CommandSpec(_Frozen):
+    """Everything needed to parse a command line into a function's arguments
+
+    - `arguments`: the `ArgSpec`s, in the order they are applied to a new parser
+    - `postprocessors`: called with the parsed namespace, in order
+    - `bindings`: `(dest, how)` for each parameter in signature order, where `how` is
+      `POSITIONAL`, `VAR_POSITIONAL` or `KEYWORD`
+    """
+    __slots__ = ('arguments', 'postprocessors', 'bindings', '_hash')
+
+    def __init__(self, arguments: Iterable[ArgSpec] = (),
+                 postprocessors: Iterable[Callable[[Any], None]] = (),
+                 bindings: Iterable[Tuple[str, str]] = ()):
+        _set = object.__setattr__
+        _set(self, 'arguments', tuple(arguments))
+        _set(self, 'postprocessors', tuple(postprocessors))
+        _set(self, 'bindings', tuple(bindings))
+        _set(self, '_hash', None)
+
+    def replay(self, parser):
+        """Adds the arguments to `parser`, a fresh `argparse.ArgumentParser`
+        """
+        containers = [parser]
+        for arg in self.arguments:
+            result = arg.apply(containers[arg.container])
+            if arg.method in _CONTAINER_METHODS:
+                containers.append(result)
+
+    def _key(self):
+        return (self.arguments, self.postprocessors, self.bindings)
+
+    def __eq__(self, other):
+        if not isinstance(other, CommandSpec):
+            return NotImplemented
+        return self is other or (hash(self) == hash(other) and self._key() == other._key())
+
+    def __hash__(self):
+        if self._hash is None:
+            object.__setattr__(self, '_hash', hash(_freeze(self._key())))
+        return self._hash
+
+    def __reduce__(self):
+        return CommandSpec, self._key()
+
+    def __repr__(self):
+        return f"<CommandSpec of {len(self.bindings)} parameters>"
+
+
+def _intern(arg: ArgSpec) -> ArgSpec:
+    """`arg`, or an equal `ArgSpec` already in use by another spec
+    """
+    # specs with unhashable values (lists, say) just aren't shared, and neither are
+    # NumPy arrays, which can't be compared with ==
+    try:
+        return _interned_args.setdefault((arg._key, _types(arg._key[4])), arg)
+    except (TypeError, ValueError):
+        return arg
+
+
+def _types(value) -> Any:
+    """The types of `value` and what it contains, which `==` doesn't tell apart
+    """
+    if isinstance(value, (tuple, list)):
+        return (type(value), tuple(map(_types, value)))
+    if isinstance(value, dict):
+        return (dict, tuple((_types(k), _types(v)) for k, v in value.items()))
+    return type(value)
+
+
+def _unpickle_arg(key: tuple) -> ArgSpec:
+    arg = object.__new__(ArgSpec)
+    object.__setattr__(arg, '_key', key)
+    return _intern(arg)
+
+
+class _ByValue:
+    """Equality and hashing by type and attributes, for the callables that specs hold
+    """
+    __slots__ = ()
+
+    def _fields(self) -> tuple:
+        return tuple(vars(self).values())
+
+    def __eq__(self, other):
+        if type(other) is not type(self):
+            return NotImplemented
+        return self._fields() == other._fields()
+
+    def __hash__(self):
+        return hash((type(self), _freeze(self._fields())))
+
+
+def _freeze(value) -> Any:
+    """A hashable stand-in for `value`, for values that are equal when `value`s are
+    """
+    try:
+        hash(value)
+        return value
+    except TypeError:
+        pass
+    if isinstance(value, (list, tuple)):
+        frozen = tuple(value)
+        try:
+            hash(frozen)
+        except TypeError:
+            return tuple(map(_freeze, value))
+        return frozen
+    if isinstance(value, dict):
+        try:
+            return frozenset(value.items())
+        except TypeError:
+            return frozenset((key, _freeze(item)) for key, item in value.items())
+    if isinstance(value, set):
+        return frozenset(value)
+    return type(value)  # still consistent with ==, if not very selective
@@ -0,0 +1,206 @@
+"""Where a command's time goes, phase by phase
+
+`Command.enable_stats()` (or `AUTOARG_TRACE` in the environment) makes a command record
+the wall and CPU time of each phase of an invocation - loading the spec cache,
+inspecting the signature, building the parser, parsing, postprocessing and the call
+itself - together with the time spent converting each argument (factories such as
+`int`, `File[...]` or `JSON`). With `memory=True` (or `AUTOARG_TRACE_MEMORY=1`), the
+peak memory allocated during each phase is recorded too, using `tracemalloc`, which
+slows everything down considerably. Commands that don't enable it run exactly the
+code they would otherwise.
+
+`AUTOARG_TRACE` selects where the results go when the process exits:
+
+    AUTOARG_TRACE=1                    JSON on stderr
+    AUTOARG_TRACE=stats.json           JSON in stats.json
+    AUTOARG_TRACE=chrome:trace.json    Chrome trace events (chrome://tracing, Perfetto)
+
+Time spent before the command was defined (interpreter startup and imports) is only
+available as CPU time; `python -X importtime` breaks it down further.
+"""
+import json
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+__all__ = [
+    'Phase',
+    'Stats',
+]
+
+
+class Phase:
+    """One timed phase: `wall` and `cpu` in seconds, `peak_memory` in bytes (or `None`)
+    """
+    __slots__ = ('name', 'start', 'wall', 'cpu', 'peak_memory')
+
+    def __init__(self, name: str, start: float, wall: float, cpu: float,
+                 peak_memory: Optional[int] = None):
+        self.name = name
+        self.start = start
+        self.wall = wall
+        self.cpu = cpu
+        self.peak_memory = peak_memory
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {name: getattr(self, name) for name in self.__slots__}
+
+    def __repr__(self):
+        return f"<Phase {self.name} {self.wall * 1e3:.3f} ms>"
+
+
+class Stats:
+    """Phases and argument conversion costs recorded for one command
+    """
+    def __init__(self, name: str, *, memory=False):
+        self.name = name
+        self.memory = memory
+        self.startup_cpu = time.process_time()
+        self.phases: List[Phase] = []
+        # dest -> [number of conversions, total seconds]
+        self.conversions: Dict[str, List[float]] = {}
+        self._origin = time.perf_counter()
+        self._lock = threading.Lock()
+        self._peaks: List[int] = []  # of the phases running, innermost last
+        if memory:
+            import tracemalloc
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        """Records the time spent in the body as a phase called `name`
+        """
+        if self.memory:
+            import tracemalloc
+            if self._peaks:  # resetting the peak loses the enclosing phase's peak so far
+                self._peaks[-1] = max(self._peaks[-1], tracemalloc.get_traced_memory()[1])
+            self._peaks.append(0)
+            if hasattr(tracemalloc, 'reset_peak'):  # Python 3.9+
+                tracemalloc.reset_peak()
+        start = time.perf_counter()
+        cpu_start = time.process_time()
+        try:
+            yield
+        finally:
+            cpu = time.process_time() - cpu_start
+            wall = time.perf_counter() - start
+            peak = None
+            if self.memory:
+                peak = max(self._peaks.pop(), tracemalloc.get_traced_memory()[1])
+            self.phases.append(Phase(name, start - self._origin, wall, cpu, peak))
+
+    def timed_conversion(self, dest: str, convert: Callable[[Any], Any]) -> Callable[[Any], Any]:
+        """`convert`, adding the time each call takes to the conversions of `dest`
+        """
+        return _TimedConversion(self, dest, convert)
+
+    def totals(self) -> Dict[str, float]:
+        """Total wall time per phase name
+        """
+        totals: Dict[str, float] = {}
+        for phase in self.phases:
+            totals[phase.name] = totals.get(phase.name, 0.0) + phase.wall
+        return totals
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'command': self.name,
+            'startup_cpu': self.startup_cpu,
+            'phases': [phase.to_dict() for phase in self.phases],
+            'totals': self.totals(),
+            'conversions': {
+                dest: {'count': count, 'seconds': seconds}
+                for dest, (count, seconds) in self.conversions.items()
+            },
+        }
+
+    def to_json(self, **dumps_kw) -> str:
+        return json.dumps(self.to_dict(), **dumps_kw)
+
+    def chrome_trace(self) -> Dict[str, Any]:
+        """The phases as Chrome trace events (the JSON object format)
+        """
+        pid = os.getpid()
+        events = [
+            {
+                'name': phase.name, 'cat': 'autoarg', 'ph': 'X', 'pid': pid, 'tid': 0,
+                'ts': phase.start * 1e6, 'dur': phase.wall * 1e6,
+                'args': {'cpu_ms': phase.cpu * 1e3, 'peak_memory': phase.peak_memory},
+            }
+            for phase in self.phases
+        ]
+        events.append({
+            'name': 'process_name', 'ph': 'M', 'pid': pid, 'tid': 0,
+            'args': {'name': self.name},
+        })
+        return {
+            'traceEvents': events,
+            'displayTimeUnit': 'ms',
+            'otherData': {
+                'startup_cpu': self.startup_cpu,
+                'conversions': self.to_dict()['conversions'],
+            },
+        }
+
+    def write(self, path, format='json'):
+        """Writes the stats to `path` as `'json'` or `'chrome'` trace events
+        """
+        if format == 'chrome':
+            data = self.chrome_trace()
+        elif format == 'json':
+            data = self.to_dict()
+        else:
+            raise ValueError(f"unknown stats format: {format!r}")
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, indent=2)
+
+    def __repr__(self):
+        totals = ', '.join(f"{name}={wall * 1e3:.3f}ms" for name, wall in self.totals().items())
+        return f"<Stats {self.name}: {totals}>"
+
+
+class _TimedConversion:
+    def __init__(self, stats: Stats, dest: str, convert: Callable[[Any], Any]):
+        self.stats = stats
+        self.dest = dest
+        self.convert = convert
+        # argparse names the type in "invalid <name> value" errors
+        self.__name__ = getattr(convert, '__name__', repr(convert))
+
+    def __call__(self, value):
+        start = time.perf_counter()
+        try:
+            return self.convert(value)
+        finally:
+            elapsed = time.perf_counter() - start
+            with self.stats._lock:  # a command may parse on many threads at once
+                totals = self.stats.conversions.setdefault(self.dest, [0, 0.0])
+                totals[0] += 1
+                totals[1] += elapsed
+
+
+def from_environment(name: str) -> Optional[Stats]:
+    """A `Stats` that is written out at exit, if `AUTOARG_TRACE` asks for it
+    """
+    target = os.environ.get('AUTOARG_TRACE', '')
+    if target in ('', '0'):
+        return None
+    import atexit
+    stats = Stats(name, memory=os.environ.get('AUTOARG_TRACE_MEMORY', '') not in ('', '0'))
+    atexit.register(_report, stats, target)
+    return stats
+
+
+def _report(stats: Stats, target: str):
+    if not stats.phases:
+        return  # e.g. one of a group's commands that didn't run
+    if target == '1':
+        sys.stderr.write(stats.to_json(indent=2) + '\n')
+    elif target.startswith('chrome:'):
+        stats.write(target[len('chrome:'):], 'chrome')
+    else:
+        stats.write(target)
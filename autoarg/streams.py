@@ -0,0 +1,149 @@
+"""Lazily supplied positional values
+
+A parameter annotated `Stream[T]` takes any number of values, like `*args`, but the
+function receives an iterator that converts each value as it is consumed. Besides
+plain arguments, `@path` (or `@-` for stdin) and `--<name>-from PATH` (e.g.
+`--files-from` for a `files` parameter) supply values read from a file, one per line
+or NUL-terminated (as written by `find -print0`), without them ever being held in
+memory all at once, so there is no `ARG_MAX` and no need for `xargs`. Regular files
+are memory-mapped; stdin and pipes are read in chunks.
+
+(`*args` can't be streamed: Python collects it into a tuple before the call.)
+"""
+import os
+import stat
+import sys
+from argparse import ArgumentTypeError
+from typing import Any, Callable, Iterator, List
+
+from .spec import _ByValue
+
+__all__ = [
+    'read_values',
+]
+
+_CHUNK_SIZE = 1 << 20
+
+
+def read_values(path: str) -> Iterator[str]:
+    """The values in the file at `path` (`-` for stdin), decoded like command line arguments
+
+    Values are NUL-terminated if there is a NUL byte in the first chunk of input and
+    newline-terminated otherwise; empty values are skipped.
+    """
+    if path == '-':
+        yield from _split(_read_chunks(sys.stdin.buffer))
+        return
+    with open(path, 'rb') as file:
+        if stat.S_ISREG(os.fstat(file.fileno()).st_mode):
+            yield from _split(_mapped_chunks(file))
+        else:
+            yield from _split(_read_chunks(file))
+
+
+def _mapped_chunks(file) -> Iterator[bytes]:
+    import mmap
+
+    size = os.fstat(file.fileno()).st_size
+    if size == 0:
+        return  # empty files can't be mapped
+    with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+        for start in range(0, size, _CHUNK_SIZE):
+            yield data[start:start + _CHUNK_SIZE]
+
+
+def _read_chunks(file) -> Iterator[bytes]:
+    while True:
+        chunk = file.read(_CHUNK_SIZE)
+        if not chunk:
+            return
+        yield chunk
+
+
+def _split(chunks: Iterator[bytes]) -> Iterator[str]:
+    # whole chunks are decoded and split at once; only the values are handled one by one
+    delimiter = None
+    partial = b''
+    for chunk in chunks:
+        if delimiter is None:
+            delimiter = b'\0' if b'\0' in chunk else b'\n'
+        end = chunk.rfind(delimiter)
+        if end == -1:
+            partial += chunk
+            continue
+        yield from _values_of(partial + chunk[:end], delimiter)
+        partial = chunk[end + 1:]
+    if partial:
+        yield from _values_of(partial, delimiter)
+
+
+def _values_of(data: bytes, delimiter: bytes) -> List[str]:
+    text = os.fsdecode(data)  # the same way argv is decoded
+    values = text.split(delimiter.decode())
+    if delimiter == b'\n' and '\r' in text:
+        values = [value[:-1] if value.endswith('\r') else value for value in values]
+    return [value for value in values if value]
+
+
+class _StreamItem(_ByValue):
+    """Converts one streamed value the way argparse would have converted an argument
+    """
+    def __init__(self, dest: str, factory=None, choices=None, postprocessor=None):
+        self.dest = dest
+        self.factory = factory
+        self.choices = choices
+        self.postprocessor = postprocessor
+
+    def __call__(self, text: str):
+        value = text
+        if self.factory is not None:
+            try:
+                value = self.factory(text)
+            except (ArgumentTypeError, TypeError, ValueError) as err:
+                raise ValueError(self._invalid(text, err)) from None
+        if self.choices is not None and value not in self.choices:
+            choices = ', '.join(map(repr, self.choices))
+            raise ValueError(
+                f"argument {self.dest}: invalid choice: {value!r} (choose from {choices})"
+            )
+        if self.postprocessor is not None:
+            value = self.postprocessor(value)
+        return value
+
+    def _invalid(self, text: str, err: Exception) -> str:
+        if isinstance(err, ArgumentTypeError):
+            return f"argument {self.dest}: {err}"
+        name = getattr(self.factory, '__name__', repr(self.factory))
+        return f"argument {self.dest}: invalid {name} value: {text!r}"
+
+
+class _StreamPostprocess(_ByValue):
+    """Replaces a `Stream[T]` argument's raw values with an iterator over the converted values
+    """
+    def __init__(self, dest: str, from_file_dest: str, convert: Callable[[str], Any]):
+        self.dest = dest
+        self.from_file_dest = from_file_dest
+        self.convert = convert
+
+    def __call__(self, namespace):
+        tokens = getattr(namespace, self.dest) or []
+        from_files = getattr(namespace, self.from_file_dest) or []
+        delattr(namespace, self.from_file_dest)
+        # unreadable files are reported now, as argument errors, rather than mid-stream
+        from .files import _access_error
+        paths = [token[1:] for token in tokens if token.startswith('@') and len(token) > 1]
+        for path in paths + from_files:
+            error = None if path == '-' else _access_error(path, reading=True)
+            if error is not None:
+                raise ValueError(f"argument {self.dest}: can't open '{path}': {error}")
+        setattr(namespace, self.dest, map(self.convert, _values(tokens, from_files)))
+
+
+def _values(tokens: List[str], from_files: List[str]) -> Iterator[str]:
+    for token in tokens:
+        if token.startswith('@') and len(token) > 1:
+            yield from read_values(token[1:])
+        else:
+            yield token
+    for path in from_files:
+        yield from read_values(path)
@@ -5,8 +5,10 @@ from typing import (
     Callable,
     Dict,
     Generic,
+    Iterator,
     List,
     Optional,
+    Sequence,
     Tuple,
     Type,
     TypeVar,
@@ -15,16 +17,20 @@ from typing import (
     overload,
 )
 
-from typing_extensions import Annotated, Literal, get_args, get_origin
+from ._compat import Annotated, Literal, get_args, get_origin
 
 __all__ = [
     'Append',
     'Arg',
+    'Array',
+    'AsyncFile',
     'Count',
     'File',
     'JSON',
+    'JSONLines',
     'OneOrMore',
     'Remainder',
+    'Stream',
 ]
 
 
@@ -46,16 +52,42 @@ class Append:
         return Annotated[List[T], 'append']
 
 
+class Stream:
+    """Any number of positional values, received as an iterator that converts them lazily
+
+    `@path` arguments and `--<name>-from PATH` supply values from a file (`-` for stdin).
+    """
+    def __class_getitem__(cls, T):
+        return Annotated[Iterator[T], 'stream']
+
+
+class Array:
+    """Any number of `int`s or `float`s (or fixed-size `Tuple`s of them), as one `array.array`
+
+    See `autoarg.arrays`.
+    """
+    def __class_getitem__(cls, T):
+        return Annotated[Sequence[T], 'array']
+
+
 class File:
     def __class_getitem__(cls, mode: str):
         return Annotated[IO, mode]
 
 
+class AsyncFile:
+    """Like `File`, but with awaitable reads and writes and `async for` over lines
+    """
+    def __class_getitem__(cls, mode: str):
+        return Annotated[IO, mode, 'async']
+
+
 Count = Annotated[int, 'count']
 Level = Annotated[int, 'level']  # creates 2 count arguments: one for up, one for down
 Verbosity = Annotated[int, 'level', 'verbosity']  # same as level, but with sensible defaults
 Remainder = Annotated[List[str], 'remainder']
-JSON = Annotated[Any, 'json']
+JSON = Annotated[Any, 'json']  # also accepts @path or - to read the document from
+JSONLines = Annotated[Iterator[Any], 'jsonlines']  # a path (or -); yields decoded records
 
 
 def _sensible_default_value(typ: Type) -> Any:
@@ -86,6 +118,11 @@ class _AnnotatedValue:
         self.value = value
         self._annotations = annotations
 
+    def __repr__(self):
+        args = [] if self.value is ... else [repr(self.value)]
+        args.extend(f'{key}={value!r}' for key, value in self._annotations.items())
+        return f"Arg({', '.join(args)})"
+
     def get(self, key, default=None):
         return self._annotations.get(key, default)
 
@@ -167,12 +204,39 @@ def Arg(
     /, *,
     short: Optional[str] = None,
     long: Optional[List[str]] = None,
+    allow_abbrev: bool = False,
     help: Optional[str] = None,
     metavar: Optional[str] = None,
 ) -> T_Enum:
     ...
 
 
+@overload
+def Arg(
+    default: Any = None,
+    /, *,
+    short: Optional[str] = None,
+    long: Optional[List[str]] = None,
+    decoder: Optional[Callable[[Union[str, bytes]], Any]] = None,
+    help: Optional[str] = None,
+    metavar: Optional[str] = None,
+) -> Any:
+    ...
+
+
+@overload
+def Arg(
+    default: Any = None,
+    /, *,
+    short: Optional[str] = None,
+    long: Optional[List[str]] = None,
+    numpy: bool = False,
+    help: Optional[str] = None,
+    metavar: Optional[str] = None,
+) -> Any:
+    ...
+
+
 @overload
 def Arg(
     default: Optional[T] = None,
@@ -0,0 +1,86 @@
+"""Per-invocation overhead of `Command.run` for a 30-parameter command
+
+Compares the precomputed binder against re-inspecting the signature and
+postprocessing the namespace on every call (what `Command.run` used to do).
+
+    python benchmarks/bench_run.py [--number 2000]
+"""
+import argparse
+import sys
+import timeit
+from enum import Enum
+from inspect import Parameter, signature
+from pathlib import Path
+from typing import Tuple
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from autoarg import Count, command  # noqa: E402
+
+
+class Level(Enum):
+    Low = 'low'
+    High = 'high'
+
+
+def _make_command():
+    params = ['first: str', 'second: int', '*rest: float']
+    kinds = [
+        'o{i}: int = {i}',
+        'l{i}: Level = Level.Low',
+        't{i}: Tuple[int, str] = (0, "")',
+        'c{i}: Count = 0',
+        'f{i}: bool = False',
+        's{i}: str = "x"',
+    ]
+    params += [kinds[i % len(kinds)].format(i=i) for i in range(27)]
+    namespace = {'Count': Count, 'Level': Level, 'Tuple': Tuple}
+    exec(f"def wide({', '.join(params)}):\n    return first", namespace)
+    return command(namespace['wide'])
+
+
+ARGV = (
+    'a', '1', '0.5', '1.5',
+    '--o0', '7', '--l1', 'high', '--t2', '3', 'z', '--c3', '--c3', '--f4', '--s5', 'y',
+)
+
+
+def legacy_run(cmd, *str_args):
+    namespace = cmd.parser.parse_args(str_args)
+    args = []
+    kwargs = {}
+    for name, param in signature(cmd._func).parameters.items():
+        if hasattr(namespace, name):
+            value = getattr(namespace, name)
+            if param.kind in (Parameter.POSITIONAL_OR_KEYWORD, Parameter.POSITIONAL_ONLY):
+                args.append(value)
+            elif param.kind is Parameter.VAR_POSITIONAL:
+                args.extend(value)
+            elif param.kind is Parameter.KEYWORD_ONLY:
+                kwargs[name] = value
+    return cmd._func(*args, **kwargs)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--number', type=int, default=2000)
+    opts = parser.parse_args()
+
+    cmd = _make_command()
+    assert cmd.run(*ARGV) == legacy_run(cmd, *ARGV) == 'a'
+
+    namespace = cmd.parser._parse_unprocessed(list(ARGV))
+    timings = {
+        'parse only': lambda: cmd.parser._parse_unprocessed(list(ARGV)),
+        'bind (binder)': lambda: cmd.parser._binder(argparse.Namespace(**vars(namespace))),
+        'Command.run': lambda: cmd.run(*ARGV),
+        'legacy run': lambda: legacy_run(cmd, *ARGV),
+    }
+    print(f"30-parameter command, {len(ARGV)} argv tokens (best of 5 x {opts.number}):")
+    for name, fn in timings.items():
+        best = min(timeit.repeat(fn, number=opts.number, repeat=5)) / opts.number
+        print(f"  {name:14} {best * 1e6:8.1f} us")
+
+
+if __name__ == '__main__':
+    main()
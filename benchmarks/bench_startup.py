@@ -0,0 +1,85 @@
+"""Import cost of a module defining many `@command`s
+
+Compares lazy parser construction (the default) against eager construction
+(`AUTOARG_EAGER=1`, which is what every decoration used to cost).
+
+    python benchmarks/bench_startup.py [--commands 100] [--repeat 20]
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import textwrap
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+COMMAND_TEMPLATE = '''
+@command
+def cmd_{i}(
+    source: str,
+    count: int = 3,
+    *extra: float,
+    fruit: Fruit = Fruit.Apple,
+    mode: Literal['fast', 'slow', 'balanced'] = 'balanced',
+    verbose: Count = 0,
+    dry_run: bool = False,
+    name: str = 'x',
+):
+    """Command number {i}"""
+'''
+
+
+def write_module(directory: Path, n_commands: int) -> str:
+    header = textwrap.dedent('''
+        from enum import Enum
+        from typing_extensions import Literal
+        from autoarg import Count, command
+
+        class Fruit(Enum):
+            Apple = 'apple'
+            Banana = 'banana'
+    ''')
+    body = ''.join(COMMAND_TEMPLATE.format(i=i) for i in range(n_commands))
+    (directory / 'many_commands.py').write_text(header + body)
+    return 'many_commands'
+
+
+def time_import(module: str, directory: Path, eager: bool, repeat: int) -> float:
+    env = dict(os.environ)
+    env['PYTHONPATH'] = os.pathsep.join([str(ROOT), str(directory)])
+    env['AUTOARG_EAGER'] = '1' if eager else '0'
+    code = (
+        'import time; t = time.perf_counter(); '
+        f'import {module}; '
+        'print(time.perf_counter() - t)'
+    )
+    samples = []
+    for _ in range(repeat):
+        out = subprocess.run(
+            [sys.executable, '-c', code], env=env, check=True, capture_output=True, text=True
+        )
+        samples.append(float(out.stdout))
+    return statistics.median(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--commands', type=int, default=100)
+    parser.add_argument('--repeat', type=int, default=20)
+    opts = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        module = write_module(Path(tmp), opts.commands)
+        eager = time_import(module, Path(tmp), eager=True, repeat=opts.repeat)
+        lazy = time_import(module, Path(tmp), eager=False, repeat=opts.repeat)
+
+    print(f"import with {opts.commands} commands (median of {opts.repeat}):")
+    print(f"  eager: {eager * 1000:8.2f} ms")
+    print(f"  lazy:  {lazy * 1000:8.2f} ms  ({eager / lazy:.1f}x faster)")
+
+
+if __name__ == '__main__':
+    main()
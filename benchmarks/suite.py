@@ -0,0 +1,358 @@
+"""Benchmark suite for the hot paths: building, parsing and dispatching
+
+Times `_inspect_fn`, `generate_argparser`, `parse_args` (both engines) and
+`Command.run` on synthetic signatures of 1, 10, 100 and 1000 parameters that mix
+`Count`, `Literal` flag groups, Enums, `Tuple`, `Append` and `File`, parsing argv
+of up to 10^6 tokens (mostly positional, or mostly repeated options), and building
+and parsing commands whose Enum and `Literal` have up to 10^4 members, and
+converting up to 10^6 numbers as `*args: int` against `Array[int]` (whose
+`numeric_memory` results are the bytes allocated, not seconds). Results are
+written as JSON so that runs from different commits can be compared:
+
+    python benchmarks/suite.py run [-o results.json] [--quick]
+    python benchmarks/suite.py compare benchmarks/baseline.json results.json
+    python benchmarks/suite.py compare benchmarks/baseline.json   # runs the suite first
+
+`compare` exits with status 1 if anything got slower than `--threshold` times the
+baseline. The checked-in `benchmarks/baseline.json` is a full run on a quiet
+machine; refresh it (`run -o benchmarks/baseline.json`) when a change is meant to
+move the numbers.
+"""
+import argparse
+import json
+import platform
+import subprocess
+import sys
+import timeit
+from enum import Enum
+from pathlib import Path
+from typing import Callable, Dict, List, Sequence, Tuple
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from autoarg import Append, Array, Count, File, command, generate_argparser  # noqa: E402
+from autoarg._compat import Literal  # noqa: E402
+from autoarg.generate import _inspect_fn  # noqa: E402
+
+PARAM_COUNTS = (1, 10, 100, 1000)
+ARGV_LENGTHS = (10, 1000, 100_000, 1_000_000)
+QUICK_PARAM_COUNTS = (1, 10, 100)
+QUICK_ARGV_LENGTHS = (10, 1000)
+CHOICE_COUNTS = (10, 1000, 10_000)
+QUICK_CHOICE_COUNTS = (10, 1000)
+NUMBER_COUNTS = (1000, 100_000, 1_000_000)
+QUICK_NUMBER_COUNTS = (1000,)
+
+# argparse takes time quadratic in the number of options given (seconds for 10^4),
+# so its repeated-option cases stop here
+ARGPARSE_MAX_OPTIONS = 1000
+
+FORMAT_VERSION = 1
+
+
+class Level(Enum):
+    Low = 'low'
+    Mid = 'mid'
+    High = 'high'
+
+
+# keyword-only parameter kinds, cycled through; each yields (parameter, argv sample)
+_KINDS = [
+    ("c{i}: Count = 0", ['--c{i}']),
+    ("m{i}: Literal['a{i}', 'b{i}', 'c{i}'] = 'a{i}'", ['--b{i}']),
+    ("e{i}: Level = Level.Low", ['--e{i}', 'high']),
+    ("t{i}: Tuple[int, str] = (0, '')", ['--t{i}', '7', 'x']),
+    ("a{i}: Append[int] = []", ['--a{i}', '1', '--a{i}', '2']),
+    ("f{i}: File['r'] = None", ['--f{i}', '-']),
+    ("o{i}: int = 0", ['--o{i}', '5']),
+]
+
+
+def synthetic_command(n_params: int) -> Tuple[Callable, List[str]]:
+    """A function with `n_params` parameters and an argv that sets a few of each kind
+
+    The first parameter is a positional `str` and the second (if any) is `*rest: int`,
+    which is what the long-argv benchmarks fill.
+    """
+    params = ['first: str']
+    argv = ['name']
+    if n_params > 1:
+        params.append('*rest: int')
+        argv += ['1', '2', '3']
+    for i in range(n_params - 2):
+        param, sample = _KINDS[i % len(_KINDS)]
+        params.append(param.format(i=i))
+        if i < 2 * len(_KINDS):
+            argv += [token.format(i=i) for token in sample]
+
+    namespace = {
+        'Append': Append, 'Count': Count, 'File': File, 'Level': Level,
+        'Literal': Literal, 'Tuple': Tuple,
+    }
+    exec(f"def synthetic_{n_params}({', '.join(params)}):\n    return first", namespace)
+    return namespace[f'synthetic_{n_params}'], argv
+
+
+def large_choices_command(n_choices: int) -> Tuple[Callable, List[str]]:
+    """A function taking an Enum and a `Literal` flag group of `n_choices` members each
+    """
+    region = Enum(f'Region{n_choices}', [(f'r{i}', f'region-{i:05d}') for i in range(n_choices)])
+    tier = Literal[tuple(f'tier{i}' for i in range(n_choices))]
+
+    def large_choices(region: region, *, tier: tier = 'tier0'):
+        return region, tier
+
+    last = n_choices - 1
+    return large_choices, [f'region-{last:05d}', f'--tier{last}']
+
+
+def numbers_list(*values: int):
+    return values
+
+
+def numbers_array(values: Array[int]):
+    return values
+
+
+def numbers_argv(count: int) -> List[str]:
+    return [str(i * 7919 % 1_000_003) for i in range(count)]
+
+
+def allocated(fn: Callable[[], object]) -> int:
+    """Bytes still allocated by what `fn` returns (and keeps alive)
+    """
+    import tracemalloc
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        result = fn()  # noqa: F841 (kept alive for the measurement)
+        return tracemalloc.get_traced_memory()[0] - before
+    finally:
+        tracemalloc.stop()
+
+
+def long_argv(length: int) -> List[str]:
+    """`length` tokens for the 10-parameter command, almost all of them filling `*rest`
+    """
+    options = ['--c0', '--a4', '9', '--o6', '1'] * min(20, (length - 1) // 10)
+    return options + ['name'] + ['1'] * (length - len(options) - 1)
+
+
+def repeated_options(length: int) -> List[str]:
+    """`length` tokens for the 10-parameter command, almost all of them options
+    """
+    options = ['--c0', '--a4', '9', '--o6', '1'] * max(0, (length - 1) // 5)
+    return options + ['name'] + ['1'] * (length - len(options) - 1)
+
+
+def _measure(fn: Callable[[], object], repeat: int, min_time: float) -> float:
+    """Best time per call, in seconds
+    """
+    timer = timeit.Timer(fn)
+    number = 1
+    while True:  # like Timer.autorange, but with a configurable minimum
+        elapsed = timer.timeit(number)
+        if elapsed >= min_time or number >= 1 << 20:
+            break
+        number *= 2 if elapsed == 0 else max(2, min(10, int(min_time / elapsed) + 1))
+    best = elapsed
+    for _ in range(repeat - 1):
+        best = min(best, timer.timeit(number))
+    return best / number
+
+
+def iter_benchmarks(param_counts: Sequence[int], argv_lengths: Sequence[int],
+                    choice_counts: Sequence[int] = CHOICE_COUNTS,
+                    number_counts: Sequence[int] = NUMBER_COUNTS):
+    """Yields `(name, fn, repeat)`; everything a benchmark needs is built up front
+    """
+    for n in param_counts:
+        func, argv = synthetic_command(n)
+        yield f'inspect_fn/{n}', lambda func=func: _inspect_fn(func), 5
+        yield (
+            f'generate_argparser/{n}',
+            lambda func=func: generate_argparser(func, spec_cache=False)._parser,
+            5,
+        )
+        for engine in ('argparse', 'fast'):
+            parser = generate_argparser(func, spec_cache=False, engine=engine)
+            yield f'parse_args/{engine}/{n}', lambda p=parser, a=argv: p.parse_args(a), 5
+        cmd = command(func, spec_cache=False, engine='fast')
+        yield f'command_run/{n}', lambda cmd=cmd, a=argv: cmd.run(*a), 5
+
+    func, _ = synthetic_command(10)
+    parsers = {
+        engine: generate_argparser(func, spec_cache=False, engine=engine)
+        for engine in ('argparse', 'fast')
+    }
+    for length in argv_lengths:
+        repeat = 5 if length <= 10_000 else 2
+        for kind, make_argv in (('long_argv', long_argv), ('repeated_options', repeated_options)):
+            argv = make_argv(length)
+            for engine, parser in parsers.items():
+                if engine == 'argparse' and kind == 'repeated_options':
+                    if length > ARGPARSE_MAX_OPTIONS:
+                        continue
+                yield f'{kind}/{engine}/{length}', lambda p=parser, a=argv: p.parse_args(a), repeat
+
+    for n in choice_counts:
+        func, argv = large_choices_command(n)
+        yield (
+            f'large_choices/build/{n}',
+            lambda func=func: generate_argparser(func, spec_cache=False)._parser,
+            3,
+        )
+        for engine in ('argparse', 'fast'):
+            parser = generate_argparser(func, spec_cache=False, engine=engine)
+            yield f'large_choices/{engine}/{n}', lambda p=parser, a=argv: p.parse_args(a), 5
+
+    for n in number_counts:
+        argv = numbers_argv(n)
+        repeat = 5 if n <= 10_000 else 2
+        for kind, func in (('list', numbers_list), ('array', numbers_array)):
+            parser = generate_argparser(func, spec_cache=False, engine='fast')
+            yield f'numeric/{kind}/{n}', lambda p=parser, a=argv: p.parse_call_args(a), repeat
+
+
+def run_suite(param_counts=PARAM_COUNTS, argv_lengths=ARGV_LENGTHS,
+              choice_counts=CHOICE_COUNTS, number_counts=NUMBER_COUNTS, *, min_time=0.2,
+              select: Sequence[str] = (), log=None) -> Dict:
+    results = {}
+    benchmarks = iter_benchmarks(param_counts, argv_lengths, choice_counts, number_counts)
+    for name, fn, repeat in benchmarks:
+        if select and not any(pattern in name for pattern in select):
+            continue
+        results[name] = _measure(fn, repeat, min_time)
+        if log is not None:
+            print(f"{name:32} {_format_time(results[name]):>10}", file=log, flush=True)
+        if name.startswith('numeric/'):
+            memory_name = name.replace('numeric/', 'numeric_memory/', 1)
+            results[memory_name] = allocated(fn)
+            if log is not None:
+                print(f"{memory_name:32} {_format(memory_name, results[memory_name]):>10}",
+                      file=log, flush=True)
+    return {'format': FORMAT_VERSION, 'meta': _metadata(), 'results': results}
+
+
+def _metadata() -> Dict[str, str]:
+    try:
+        commit = subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT,
+            capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        'commit': commit,
+        'python': platform.python_version(),
+        'implementation': platform.python_implementation(),
+        'machine': platform.machine(),
+    }
+
+
+def _format_time(seconds: float) -> str:
+    for unit, scale in (('s', 1), ('ms', 1e-3), ('us', 1e-6)):
+        if seconds >= scale:
+            return f"{seconds / scale:.3g} {unit}"
+    return f"{seconds / 1e-9:.3g} ns"
+
+
+def _format(name: str, value: float) -> str:
+    if name.startswith('numeric_memory/'):
+        return f"{value / 1024:.3g} KiB"
+    return _format_time(value)
+
+
+def compare(baseline: Dict, current: Dict, *, threshold: float, out=sys.stdout) -> List[str]:
+    """Prints a side-by-side table and returns the names of the regressions
+    """
+    base, cur = baseline['results'], current['results']
+    regressions = []
+    print(f"{'benchmark':32} {'baseline':>10} {'current':>10} {'ratio':>7}", file=out)
+    for name in sorted(cur, key=_sort_key):
+        if name not in base:
+            print(f"{name:32} {'-':>10} {_format(name, cur[name]):>10}", file=out)
+            continue
+        ratio = cur[name] / base[name] if base[name] else float('inf')
+        mark = ''
+        if ratio > threshold:
+            mark = '  slower'
+            regressions.append(name)
+        elif ratio < 1 / threshold:
+            mark = '  faster'
+        print(
+            f"{name:32} {_format(name, base[name]):>10} {_format(name, cur[name]):>10}"
+            + f" {ratio:>6.2f}x{mark}",
+            file=out,
+        )
+    not_run = len(set(base) - set(cur))
+    if not_run:
+        print(f"({not_run} baseline benchmark(s) not run)", file=out)
+    return regressions
+
+
+def _sort_key(name: str):
+    *prefix, size = name.split('/')
+    return (prefix, int(size) if size.isdigit() else 0)
+
+
+def _load(path) -> Dict:
+    with open(path, encoding='utf-8') as f:
+        data = json.load(f)
+    if data.get('format') != FORMAT_VERSION:
+        raise SystemExit(f"{path}: unsupported results format {data.get('format')!r}")
+    return data
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    def add_run_options(sub):
+        sub.add_argument('--quick', action='store_true',
+                         help="skip the 1000-parameter, >1000-token, 10^4-choice and"
+                         + " >1000-number cases")
+        sub.add_argument('-k', dest='select', action='append', default=[],
+                         help="only run benchmarks whose name contains this (repeatable)")
+        sub.add_argument('--min-time', type=float, default=0.2,
+                         help="seconds per timing round (default: %(default)s)")
+
+    run = commands.add_parser('run', help="run the suite and write JSON results")
+    run.add_argument('-o', '--output', help="write results here instead of stdout")
+    add_run_options(run)
+
+    cmp = commands.add_parser('compare', help="compare results against a baseline")
+    cmp.add_argument('baseline')
+    cmp.add_argument('current', nargs='?', help="results file (default: run the suite now)")
+    cmp.add_argument('--threshold', type=float, default=1.25,
+                     help="ratio above which a benchmark counts as slower (default: %(default)s)")
+    add_run_options(cmp)
+
+    opts = parser.parse_args(argv)
+
+    def run_now():
+        sizes = (
+            QUICK_PARAM_COUNTS, QUICK_ARGV_LENGTHS, QUICK_CHOICE_COUNTS, QUICK_NUMBER_COUNTS,
+        ) if opts.quick else ()
+        return run_suite(*sizes, min_time=opts.min_time, select=opts.select, log=sys.stderr)
+
+    if opts.command == 'run':
+        text = json.dumps(run_now(), indent=2, sort_keys=True) + '\n'
+        if opts.output:
+            Path(opts.output).write_text(text, encoding='utf-8')
+        else:
+            sys.stdout.write(text)
+        return 0
+
+    baseline = _load(opts.baseline)
+    current = _load(opts.current) if opts.current else run_now()
+    regressions = compare(baseline, current, threshold=opts.threshold)
+    if regressions:
+        print(f"\n{len(regressions)} benchmark(s) slower than {opts.threshold}x baseline")
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
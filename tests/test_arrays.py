@@ -0,0 +1,67 @@
+from array import array
+from typing import Tuple
+
+import pytest
+
+from autoarg import Arg, Array, ParseError, command, generate_argparser
+
+
+def plot(ids: Array[int], *, points: Array[Tuple[float, float]] = None,
+         weights: Array[float] = Arg(None, numpy=True)):
+    return ids, points, weights
+
+
+@pytest.mark.parametrize('engine', ['argparse', 'fast'])
+def test_arrays(engine):
+    parser = generate_argparser(plot, spec_cache=False, engine=engine)
+    args, kwargs = parser.parse_call_args(['1', '-2', '3', '--points', '0', '1.5', '-2', '3'])
+    assert args == [array('q', [1, -2, 3])]
+    assert kwargs['points'] == array('d', [0, 1.5, -2, 3])
+    assert parser.parse_call_args([]) == ([array('q')], {'points': None, 'weights': None})
+    if engine == 'fast':
+        assert parser._argparser is None  # handled without falling back
+
+
+def test_same_as_argparse():
+    slow = generate_argparser(plot, spec_cache=False)
+    fast = generate_argparser(plot, spec_cache=False, engine='fast')
+    for argv in (['1', '--points', '1', '2', '3', '4', '5', '6'], ['--points', '1', '2', '7', '8'],
+                 ['9', '--points=1', '--points', '3', '4'], ['--points', '1', '2', '--', '3']):
+        assert fast.parse_call_args(argv) == slow.parse_call_args(argv)
+
+
+def test_errors():
+    parser = generate_argparser(plot, spec_cache=False)
+    with pytest.raises(ParseError, match="argument ids: invalid int value at index 2: 'x'"):
+        parser.parse_call_args(['1', '2', 'x'], exit_on_error=False)
+    with pytest.raises(ParseError, match="out of range at index 0"):
+        parser.parse_call_args([str(2 ** 64)], exit_on_error=False)
+    with pytest.raises(ParseError, match="multiple of 2 values, got 3"):
+        parser.parse_call_args(['--points', '1', '2', '3'], exit_on_error=False)
+
+
+def test_invalid_definitions():
+    def text(values: Array[str]):
+        pass
+
+    def mixed(values: Array[Tuple[int, float]]):
+        pass
+
+    def star(*values: Array[int]):
+        pass
+
+    for func in (text, mixed, star):
+        with pytest.raises(TypeError):
+            generate_argparser(func, spec_cache=False)
+
+
+def test_numpy():
+    numpy = pytest.importorskip('numpy')
+
+    @command
+    def mean(*, weights: Array[Tuple[float, float]] = Arg(None, numpy=True)):
+        return weights
+
+    weights = mean.run('--weights', '1', '2', '3', '4')
+    assert isinstance(weights, numpy.ndarray) and weights.shape == (2, 2)
+    assert weights.tolist() == [[1, 2], [3, 4]]
@@ -0,0 +1,81 @@
+import asyncio
+
+import pytest
+
+from autoarg import AsyncFile, AsyncLazyFile, command
+
+
+@command
+async def fetch(key: str, *, times: int = 1):
+    await asyncio.sleep(0)
+    return key * times
+
+
+@command
+async def count_lines(*files: AsyncFile['r']):
+    async def count(file):
+        return sum([1 async for _ in file])
+
+    return files, await asyncio.gather(*map(count, files))
+
+
+def test_run_and_main():
+    assert fetch.is_async
+    assert fetch.run('ab', '--times', '2') == 'abab'
+
+    with pytest.raises(SystemExit) as exc:
+        fetch.main(['x'])
+    assert exc.value.code == 0  # a truthy result, awaited rather than a coroutine
+
+    with pytest.raises(TypeError):
+        fetch.run()
+
+
+def test_arun():
+    async def both():
+        return await asyncio.gather(fetch.arun('a'), fetch.arun('b', '-t', '3'))
+
+    assert asyncio.run(both()) == ['a', 'bbb']
+
+
+def test_arun_sync_command():
+    @command
+    def add(a: int, b: int):
+        return a + b
+
+    assert not add.is_async
+    assert asyncio.run(add.arun('1', '2')) == 3
+
+
+def test_async_files(tmp_path):
+    paths = []
+    for i in range(20):
+        path = tmp_path / f'{i}.txt'
+        path.write_text('line\n' * i)
+        paths.append(str(path))
+
+    files, counts = count_lines.run(*paths)
+    assert counts == list(range(20))
+    assert all(isinstance(f, AsyncLazyFile) and not f.is_open for f in files)
+
+
+def test_async_file_io(tmp_path):
+    @command
+    async def copy(src: AsyncFile['rb'], dst: AsyncFile['wb']):
+        async with dst:
+            await dst.write(await src.read())
+        return await src.read()
+
+    (tmp_path / 'a').write_bytes(b'data')
+    assert copy.run(str(tmp_path / 'a'), str(tmp_path / 'b')) == b''
+    assert (tmp_path / 'b').read_bytes() == b'data'
+
+
+def test_arun_map_over():
+    @command(map_over='keys', workers=2)
+    async def upper(*keys):
+        await asyncio.sleep(0)
+        return [key.upper() for key in keys]
+
+    assert upper.run('a', 'b') == [['A'], ['B']]
+    assert asyncio.run(upper.arun('a', 'b')) == [['A'], ['B']]
@@ -0,0 +1,62 @@
+import io
+
+import pytest
+
+from autoarg import ParseError, command
+
+
+@command
+def divide(a: int, b: int, *, verbose=False):
+    return a // b
+
+
+def test_run_many():
+    results = list(divide.run_many([['7', '2'], ['1'], ['1', '0'], ['9', '3', '-v']]))
+
+    assert [result.index for result in results] == [0, 1, 2, 3]
+    assert results[0].ok and results[0].value == 3
+    assert isinstance(results[1].error, ParseError)
+    assert 'required' in results[1].error.message
+    assert results[1].exit_status == 2
+    assert isinstance(results[2].error, ZeroDivisionError)
+    assert results[2].exit_status == 1
+    assert results[3].value == 3
+
+
+def test_run_many_is_quiet(capsys):
+    results = list(divide.run_many([['x'], ['1', '2', '--bogus'], ['1', '2', '--help']]))
+    assert capsys.readouterr() == ('', '')
+    assert isinstance(results[2].error, ParseError) and results[2].exit_status == 2
+
+
+@pytest.mark.parametrize('executor', ['thread', 'process'])
+def test_run_many_pooled(executor):
+    argvs = ([str(i), '1'] for i in range(50))
+    results = list(divide.run_many(argvs, workers=3, executor=executor))
+    assert [result.value for result in results] == list(range(50))
+
+    results = divide.run_many([[str(i), '1'] for i in range(50)], workers=3, ordered=False)
+    assert sorted(result.value for result in results) == list(range(50))
+
+
+def test_process_pool_needs_importable_command():
+    @command
+    def local(a):
+        return a
+
+    with pytest.raises(TypeError):
+        local.run_many([['x']], workers=2, executor='process')
+
+
+def test_run_file():
+    lines = io.StringIO('8 2\n\n# comment\n"1\n 6 3 --verbose  # trailing comment\n')
+    results = list(divide.run_file(lines))
+    assert [result.value for result in results] == [4, None, 2]
+    assert isinstance(results[1].error, ParseError)
+
+
+def test_batch_main(capsys):
+    with pytest.raises(SystemExit) as exc_info:
+        divide.batch_main(io.StringIO('4 2\n4 0\n'))
+    assert exc_info.value.code == 1
+    assert 'job 2 (4 0)' in capsys.readouterr().err
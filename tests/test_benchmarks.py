@@ -0,0 +1,52 @@
+import importlib.util
+import io
+from pathlib import Path
+
+import pytest
+
+from autoarg import generate_argparser
+
+SUITE_PATH = Path(__file__).resolve().parent.parent / 'benchmarks' / 'suite.py'
+
+
+@pytest.fixture(scope='module')
+def suite():
+    spec = importlib.util.spec_from_file_location('benchmark_suite', SUITE_PATH)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+@pytest.mark.parametrize('n_params', [1, 10, 100])
+def test_synthetic_commands_parse_identically(suite, n_params):
+    func, argv = suite.synthetic_command(n_params)
+    expected = vars(generate_argparser(func, spec_cache=False).parse_args(argv))
+    fast = generate_argparser(func, spec_cache=False, engine='fast')
+    assert vars(fast.parse_args(argv)) == expected
+    assert fast._argparser is None  # the benchmark argv must not fall back
+
+
+def test_long_argv(suite):
+    func, _ = suite.synthetic_command(10)
+    parser = generate_argparser(func, spec_cache=False, engine='fast')
+    for make_argv in (suite.long_argv, suite.repeated_options):
+        for length in (1, 10, 1000):
+            argv = make_argv(length)
+            assert len(argv) == length
+            parser.parse_args(argv)
+
+
+def test_run_and_compare(suite):
+    results = suite.run_suite((1,), (10,), (10,), (1000,), min_time=0.001)
+    assert 'command_run/1' in results['results']
+    assert 'repeated_options/argparse/10' in results['results']
+    assert 'large_choices/fast/10' in results['results']
+    memory = results['results']
+    assert memory['numeric_memory/array/1000'] < memory['numeric_memory/list/1000']
+
+    slower = {**results, 'results': {k: v * 2 for k, v in results['results'].items()}}
+    out = io.StringIO()
+    assert suite.compare(results, results, threshold=1.25, out=out) == []
+    assert suite.compare(results, slower, threshold=1.25, out=out) == sorted(
+        results['results'], key=suite._sort_key
+    )
@@ -0,0 +1,94 @@
+from enum import Enum
+from typing import Tuple
+
+from typing_extensions import Literal
+
+from autoarg import Arg, Count, File, JSON, command, generate, generate_argparser
+from autoarg.cache import SpecCache, fingerprint
+from autoarg.spec import CommandSpec
+
+
+class Color(Enum):
+    Red = 'red'
+    Green = 'green'
+
+
+def paint(
+    target: str,
+    *,
+    point: Tuple[int, float] = (0, 0.0),
+    color: Color = Color.Green,
+    finish: Literal['matte', 'gloss'] = 'matte',
+    coats: Count = 0,
+    dry_run: bool = False,
+    config: JSON = None,
+    log: File['w'] = Arg(None, short='L'),
+):
+    pass
+
+
+def _parse_both(tmp_path, func, argv):
+    fresh = generate_argparser(func, spec_cache=False).parse_args(argv)
+    cached = generate_argparser(func, spec_cache=tmp_path).parse_args(argv)
+    return fresh, cached
+
+
+def test_round_trip(tmp_path, monkeypatch):
+    argv = [
+        'wall', '-p', '3', '1.5', '--color', 'red', '--gloss', '--coats', '--coats', '-d',
+        '--config', '{"a": 1}',
+    ]
+    fresh, _ = _parse_both(tmp_path, paint, argv)
+    assert list(tmp_path.glob('*.pickle'))
+
+    def no_inspection(*args, **kwargs):
+        raise AssertionError("should have used the cached spec")
+
+    monkeypatch.setattr(generate, '_inspect_fn', no_inspection)
+    cached = generate_argparser(paint, spec_cache=tmp_path).parse_args(argv)
+    assert vars(cached) == vars(fresh)
+    assert cached.color is Color.Red
+    assert cached.point == (3, 1.5)
+
+
+def test_uncacheable_factory(tmp_path):
+    def local(a: int = Arg(factory=lambda s: int(s, 16))):
+        pass
+
+    parser = generate_argparser(local, spec_cache=tmp_path)
+    assert parser.parse_args(['ff']).a == 255
+    assert not list(tmp_path.glob('*.pickle'))
+
+
+def test_corrupt_entry_is_rebuilt(tmp_path):
+    generate_argparser(paint, spec_cache=tmp_path)
+    entry, = tmp_path.glob('*.pickle')
+    entry.write_bytes(b'garbage')
+
+    args = generate_argparser(paint, spec_cache=tmp_path).parse_args(['x'])
+    assert args.color is Color.Green
+    assert entry.read_bytes().startswith(b'\x80')
+
+
+def test_fingerprint_changes_with_defaults():
+    def before(a, *, b: int = 1):
+        pass
+
+    def after(a, *, b: int = 2):
+        pass
+
+    after.__qualname__ = before.__qualname__
+    assert fingerprint(before) != fingerprint(after)
+    assert fingerprint(before) != fingerprint(before, add_help=False)
+
+
+def test_environment_variable(tmp_path, monkeypatch):
+    monkeypatch.setenv('AUTOARG_SPEC_CACHE', str(tmp_path))
+
+    @command
+    def cmd(a: int, *, color: Color = Color.Red):
+        return a, color
+
+    assert cmd.run('1') == (1, Color.Red)
+    assert list(tmp_path.glob('*.pickle'))
+    assert isinstance(SpecCache(tmp_path).load(cmd._spec_func), CommandSpec)
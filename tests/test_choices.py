@@ -0,0 +1,93 @@
+import pickle
+from enum import Enum, IntEnum
+
+from typing_extensions import Literal
+
+import pytest
+
+from autoarg import Arg, command, generate_argparser
+from autoarg.choices import COMPACT_FLAGS, Choices
+
+Region = Enum('Region', [(f'r{i}', f'region-{i:04d}') for i in range(2000)])
+Tier = Literal[tuple(f'tier{i}' for i in range(COMPACT_FLAGS + 1))]
+
+
+class Size(Enum):
+    small = 1
+    large = 2
+
+
+class Level(IntEnum):
+    low = 1
+    high = 2
+
+
+def pick(region: Region, *, tier: Tier = 'tier0', size: Size = Size.small):
+    return region, tier, size
+
+
+def test_choices():
+    choices = Choices(['us-east-1', 'us-west-2', 'eu-west-1'], allow_abbrev=True)
+    assert 'us-west-2' in choices and 'us' not in choices
+    assert list(choices) == ['us-east-1', 'us-west-2', 'eu-west-1']
+    assert choices('us-w') == 'us-west-2'
+    assert choices.completions('us-') == ['us-east-1', 'us-west-2']
+    with pytest.raises(Exception, match='ambiguous'):
+        choices('us')
+    with pytest.raises(Exception, match="invalid choice: 'mars'"):
+        choices('mars')
+
+    exact = pickle.loads(pickle.dumps(Choices(['a', 'ab'])))
+    assert exact('ab') == 'ab' and not exact.allow_abbrev
+    with pytest.raises(Exception, match="invalid choice: 'x'"):
+        exact('x')
+
+
+@pytest.mark.parametrize('engine', ['argparse', 'fast'])
+def test_large_enum_and_literal(engine):
+    parser = generate_argparser(pick, spec_cache=False, engine=engine)
+    args = parser.parse_args(['region-1999', '--tier32', '--size', '2'])
+    assert vars(args) == {'region': Region.r1999, 'tier': 'tier32', 'size': Size.large}
+    if engine == 'fast':
+        assert parser._argparser is None  # handled without falling back
+    assert parser.parse_args(['region-0123', '--tier5', '--tier5']).tier == 'tier5'
+    with pytest.raises(SystemExit):
+        parser.parse_args(['region-1'])  # ambiguous
+    with pytest.raises(SystemExit):
+        parser.parse_args(['region-0001', '--tier1', '--tier2'])
+
+
+def test_large_literal_is_one_action():
+    parser = generate_argparser(pick, spec_cache=False)._parser
+    tier_actions = [action for action in parser._actions if action.dest == 'tier']
+    assert len(tier_actions) == 1
+    assert '[-t|...|--tier32]' in parser.format_usage()
+    assert 'region' in parser.format_usage() and 'region-0000' not in parser.format_usage()
+
+
+def test_non_string_enum_values():
+    @command
+    def f(*, size: Size = Size.small, level: Level = Level.low):
+        return size, level
+
+    assert f.run() == (Size.small, Level.low)
+    assert f.run('-s', '2', '-l', '2') == (Size.large, Level.high)
+
+
+def test_abbreviations_are_opt_in():
+    Shade = Enum('Shade', [('light', 'light'), ('dark', 'dark')])
+
+    @command
+    def f(*, shade: Shade = Arg(Shade.light, allow_abbrev=True), exact: Shade = Shade.light):
+        return shade, exact
+
+    assert f.run('-s', 'd', '-e', 'dark') == (Shade.dark, Shade.dark)
+    with pytest.raises(TypeError):
+        f.run('-e', 'd')
+
+
+def test_cached_spec(tmp_path):
+    fresh = generate_argparser(pick, spec_cache=tmp_path)
+    cached = generate_argparser(pick, spec_cache=tmp_path)
+    argv = ['region-0007', '--tier3']
+    assert vars(cached.parse_args(argv)) == vars(fresh.parse_args(argv))
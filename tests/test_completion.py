@@ -0,0 +1,117 @@
+import enum
+import shutil
+import subprocess
+
+import pytest
+from typing_extensions import Literal
+
+from autoarg import CommandGroup, File, command
+from autoarg.completion import completion_script
+
+
+class Color(enum.Enum):
+    red = 'red'
+    green = 'green'
+
+
+@command
+def paint(
+    target: File['r'],
+    *more: str,
+    color: Color = Color.red,
+    mode: Literal['fast', 'slow'] = 'fast',
+    out: File['w'] = None,
+    verbose: bool = False,
+):
+    """Paint things"""
+
+
+def make_group():
+    group = CommandGroup('tool')
+    group.add('paint', paint)
+    misc = group.group('misc', "Miscellaneous things")
+
+    @misc.command
+    def hello(name: str):
+        """Say hello"""
+
+    return group
+
+
+def complete_bash(script, *words):
+    if shutil.which('bash') is None:
+        pytest.skip("bash is not installed")
+    words_array = ' '.join(f"'{word}'" for word in words)
+    program = f"""
+{script}
+COMP_WORDS=({words_array})
+COMP_CWORD={len(words) - 1}
+compopt() {{ :; }}
+{script.split('complete -F ')[1].split()[0]}
+printf '%s\\n' "${{COMPREPLY[@]}}"
+"""
+    result = subprocess.run(['bash', '-c', program], capture_output=True, text=True, check=True)
+    return result.stdout.split()
+
+
+def test_bash_syntax():
+    if shutil.which('bash') is None:
+        pytest.skip("bash is not installed")
+    for runnable in (paint, make_group()):
+        script = completion_script(runnable, 'bash')
+        subprocess.run(['bash', '-n'], input=script, text=True, check=True)
+
+
+def test_bash_command():
+    script = completion_script(paint, 'bash')
+    assert script.rstrip().endswith('complete -F _autoarg_paint paint')
+    assert complete_bash(script, 'paint', '--c') == ['--color']
+    assert set(complete_bash(script, 'paint', '-')) >= {'-h', '--help', '-f', '--slow', '-o'}
+    assert complete_bash(script, 'paint', '--color', '') == ['red', 'green']
+    assert complete_bash(script, 'paint', '-c', 'g') == ['green']
+
+
+def test_bash_files(tmp_path, monkeypatch):
+    (tmp_path / 'picture.png').touch()
+    monkeypatch.chdir(tmp_path)
+    script = completion_script(paint, 'bash')
+    assert complete_bash(script, 'paint', 'pic') == ['picture.png']
+    assert complete_bash(script, 'paint', '-v', '--out', 'p') == ['picture.png']
+    assert complete_bash(script, 'paint', 'picture.png', 'p') == []  # *more: str
+
+
+def test_bash_group():
+    script = completion_script(make_group(), 'bash')
+    assert complete_bash(script, 'tool', '') == ['paint', 'misc']
+    assert complete_bash(script, 'tool', 'misc', '') == ['hello']
+    assert complete_bash(script, 'tool', 'paint', '-c', '') == ['red', 'green']
+    assert complete_bash(script, 'tool', 'misc', 'hello', '--') == ['--help']
+
+
+def test_prog():
+    assert 'complete -F _autoarg_my_paint my-paint' in completion_script(paint, 'bash', 'my-paint')
+
+
+def test_zsh():
+    script = completion_script(make_group(), 'zsh')
+    assert script.startswith('#compdef tool\n')
+    assert "'(-c --color)'{-c,--color}':color:(red green)'" in script
+    assert "'(-o --out)'{-o,--out}':out:_files'" in script
+    assert "'1:target:_files'" in script
+    assert "'paint:Paint things'" in script
+    assert '_autoarg_tool_misc_hello() {' in script
+
+
+def test_fish():
+    script = completion_script(make_group(), 'fish')
+    lines = script.splitlines()
+    assert "complete -c tool -n 'not __fish_seen_subcommand_from paint misc' -a paint" \
+        + " -d 'Paint things'" in lines
+    assert "complete -c tool -n '__fish_seen_subcommand_from paint' -s c -l color" \
+        + " -x -a 'red green'" in lines
+    assert "complete -c tool -n '__fish_seen_subcommand_from paint' -F" in lines
+
+
+def test_unknown_shell():
+    with pytest.raises(ValueError):
+        completion_script(paint, 'powershell')
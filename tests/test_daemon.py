@@ -0,0 +1,103 @@
+import os
+import socket
+import subprocess
+import sys
+import textwrap
+import time
+from pathlib import Path
+
+import pytest
+
+from autoarg import daemon
+
+ROOT = Path(__file__).resolve().parent.parent
+
+pytestmark = pytest.mark.skipif(
+    not hasattr(os, 'fork') or not hasattr(socket, 'AF_UNIX'), reason="needs fork and Unix sockets"
+)
+
+
+@pytest.fixture
+def app(tmp_path):
+    (tmp_path / 'daemon_app.py').write_text(textwrap.dedent('''
+        import os
+        import sys
+
+        from autoarg import command
+
+        @command
+        def greet(name, *, code: int = 0):
+            print(f"hello {name} in {os.path.basename(os.getcwd())}", os.environ.get('GREETING'))
+            print(f"pid {os.getpid()}", sys.stdin.read(), file=sys.stderr)
+            return code
+    '''))
+    env = {**os.environ, 'PYTHONPATH': os.pathsep.join([str(ROOT), str(tmp_path)])}
+    return tmp_path, env
+
+
+@pytest.fixture
+def server(app):
+    tmp_path, env = app
+    # AF_UNIX paths are limited to ~100 bytes, so keep this one short
+    sock = Path(f'/tmp/autoarg-test-{os.getpid()}.sock')
+    proc = subprocess.Popen(
+        [sys.executable, '-m', 'autoarg.daemon', '--serve', '-j', '2', str(sock),
+         'daemon_app:greet'],
+        env=env, cwd=tmp_path,
+    )
+    deadline = time.monotonic() + 10
+    while not daemon._is_listening(str(sock)):
+        assert proc.poll() is None and time.monotonic() < deadline
+        time.sleep(0.02)
+    yield sock
+    proc.terminate()
+    assert proc.wait(10) == 0
+    assert not sock.exists()
+
+
+def _forward(sock, argv, tmp_path, stdin=b''):
+    paths = [tmp_path / name for name in ('in', 'out', 'err')]
+    paths[0].write_bytes(stdin)
+    files = [open(paths[0], 'rb'), open(paths[1], 'wb'), open(paths[2], 'wb')]
+    try:
+        status = daemon.forward(
+            sock, argv, prog='greet', env={'GREETING': 'hi'}, cwd=tmp_path,
+            stdio=[f.fileno() for f in files],
+        )
+    finally:
+        for f in files:
+            f.close()
+    return status, paths[1].read_text(), paths[2].read_text()
+
+
+def test_forward(server, app):
+    tmp_path, _ = app
+    status, out, err = _forward(server, ['bob', '--code', '3'], tmp_path, stdin=b'input')
+    assert status == 3
+    assert out == f"hello bob in {tmp_path.name} hi\n"
+    assert 'input' in err
+    first_pid = err.split()[1]
+
+    # every invocation gets a fresh worker
+    status, out, err = _forward(server, ['ann'], tmp_path)
+    assert status == 0
+    assert err.split()[1] != first_pid
+
+    status, out, err = _forward(server, [], tmp_path)
+    assert status == 2
+    assert 'usage: greet' in err
+
+
+def test_no_daemon(tmp_path):
+    assert daemon.forward(tmp_path / 'missing.sock', ['x']) is None
+
+
+def test_client_falls_back(app):
+    tmp_path, env = app
+    proc = subprocess.run(
+        [sys.executable, '-m', 'autoarg.daemon', str(tmp_path / 'missing.sock'),
+         'daemon_app:greet', 'bob', '--code', '4'],
+        env={**env, 'GREETING': 'yo'}, cwd=tmp_path, capture_output=True, text=True,
+    )
+    assert proc.returncode == 4
+    assert proc.stdout == f"hello bob in {tmp_path.name} yo\n"
@@ -0,0 +1,77 @@
+from enum import Enum
+from typing import List, Tuple
+
+import pytest
+
+from autoarg import Arg, Count, command
+
+
+def test_parser_is_lazy():
+    @command
+    def greet(name: str, *, times: int = Arg(1, short='n', help="how many times")):
+        return [name] * times
+
+    assert greet._parser is None
+    assert greet.run('bob', '-n', '2') == ['bob', 'bob']
+    assert greet._parser is not None
+    assert greet('alice') == ['alice']  # defaults are still sanitized
+
+
+def test_lazy_parser_defers_errors():
+    @command
+    def bad(a: Tuple[List[int], int]):
+        pass
+
+    with pytest.raises(TypeError):
+        bad.parser
+
+
+def test_eager_parser():
+    with pytest.raises(TypeError):
+        @command(eager=True)
+        def bad(a: Tuple[List[int], int]):
+            pass
+
+    @command(eager=True)
+    def good(*, verbose: Count = 0):
+        return verbose
+
+    assert good._parser is not None
+    assert good.run('-vvv') == 3
+
+
+def test_eager_from_environment(monkeypatch):
+    monkeypatch.setenv('AUTOARG_EAGER', '1')
+
+    @command
+    def good(a: int):
+        return a
+
+    assert good._parser is not None
+
+
+def test_parser_kw():
+    @command(description="does things")
+    def thing(a):
+        pass
+
+    assert thing.parser.description == "does things"
+
+
+def test_binding():
+    class Mode(Enum):
+        Fast = 'fast'
+        Slow = 'slow'
+
+    @command
+    def bind(a: int, *rest: float, mode: Mode = Mode.Slow, pair: Tuple[int, str] = (0, '')):
+        return a, rest, mode, pair
+
+    assert bind.run('1', '2', '3.5', '--mode', 'fast', '-p', '4', 'x') == (
+        1, (2.0, 3.5), Mode.Fast, (4, 'x')
+    )
+    assert bind.run('1') == (1, (), Mode.Slow, (0, ''))
+
+    # parse_args still postprocesses the namespace for direct parser users
+    args = bind.parser.parse_args(['1', '-m', 'fast'])
+    assert args.mode is Mode.Fast
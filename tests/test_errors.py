@@ -0,0 +1,114 @@
+import pickle
+import threading
+from enum import Enum
+
+import pytest
+
+from autoarg import Array, ParseError, command, generate_argparser
+
+
+class Color(Enum):
+    red = 'red'
+    green = 'green'
+
+
+def paint(count: int, *, color: Color = Color.red, sizes: Array[int] = None):
+    return count, color, sizes
+
+
+def _error(parser, argv) -> ParseError:
+    with pytest.raises(ParseError) as info:
+        parser.parse_call_args(argv, exit_on_error=False)
+    return info.value
+
+
+@pytest.mark.parametrize('engine', ['argparse', 'fast'])
+def test_structured_errors(engine, capsys):
+    parser = generate_argparser(paint, spec_cache=False, engine=engine)
+
+    err = _error(parser, ['x'])
+    assert (err.argument, err.token, err.reason) == ('count', 'x', "invalid int value: 'x'")
+    assert err.message == "argument count: invalid int value: 'x'"
+
+    err = _error(parser, ['1', '--color', 'blue'])
+    assert (err.argument, err.token) == ('-c/--color', 'blue')
+    assert err.reason.startswith("invalid choice: 'blue'")
+
+    err = _error(parser, ['1', '2', '3'])
+    assert (err.argument, err.token, err.reason) == (None, '2', 'unrecognized arguments')
+    assert err.message == 'unrecognized arguments: 2 3'
+
+    err = _error(parser, [])
+    assert err.argument is None and 'required: count' in err.reason
+
+    err = _error(parser, ['1', '--sizes', '4', 'five'])  # converted after parsing
+    assert (err.argument, err.token) == ('sizes', None)
+    assert err.reason == "invalid int value at index 1: 'five'"
+
+    assert capsys.readouterr() == ('', '')
+
+
+def test_pickle():
+    err = ParseError('argument x: bad', argument='x', token='y', reason='bad')
+    err = pickle.loads(pickle.dumps(err))
+    assert (err.message, err.argument, err.token, err.reason) == (
+        'argument x: bad', 'x', 'y', 'bad'
+    )
+    assert ParseError('plain').reason == 'plain'
+
+
+def test_quiet_run(capsys):
+    loud = command(paint, spec_cache=False)
+    quiet = command(paint, spec_cache=False, quiet=True)
+    assert quiet.run('2', '-c', 'green') == (2, Color.green, None)
+    with pytest.raises(ParseError, match="invalid int value: 'x'"):
+        quiet.run('x')
+    assert capsys.readouterr() == ('', '')
+    with pytest.raises(TypeError):
+        loud.run('x')
+    assert 'usage: paint' in capsys.readouterr().err
+
+
+@pytest.mark.parametrize('engine', ['argparse', 'fast'])
+def test_quiet_threads(engine, capsys):
+    cmd = command(paint, spec_cache=False, engine=engine, quiet=True)
+    barrier = threading.Barrier(8, timeout=10)
+    failures = []
+
+    def work(n):
+        barrier.wait()  # all threads race to build the parser
+        for i in range(50):
+            try:
+                if (n + i) % 3 == 0:
+                    cmd.run(f'bad{n}')
+                    failures.append('no error')
+                elif cmd.run(str(n), '-c', 'green') != (n, Color.green, None):
+                    failures.append('wrong result')
+            except ParseError as err:
+                if (err.argument, err.token) != ('count', f'bad{n}'):
+                    failures.append(err)
+
+    threads = [threading.Thread(target=work, args=(n,)) for n in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert failures == []
+    assert capsys.readouterr() == ('', '')
+
+
+@pytest.mark.parametrize('engine', ['argparse', 'fast'])
+def test_quiet_help_and_version(engine, capsys):
+    cmd = command(paint, spec_cache=False, engine=engine, quiet=True)
+    with pytest.raises(ParseError) as info:
+        cmd.run('1', '-h')
+    assert info.value.status == 0 and info.value.message.startswith('usage: paint')
+    assert '--color' in info.value.message
+
+    version = generate_argparser(paint, spec_cache=False, engine=engine)
+    version.add_argument('--version', action='version', version='paint 1.0')
+    with pytest.raises(ParseError) as info:
+        version.parse_call_args(['--version'], exit_on_error=False)
+    assert (info.value.status, info.value.message) == (0, 'paint 1.0\n')
+    assert _error(cmd.parser, ['x']).status == 2
+    assert capsys.readouterr() == ('', '')
@@ -0,0 +1,150 @@
+import contextlib
+import io
+import random
+from enum import Enum
+from typing import Tuple
+
+from typing_extensions import Literal
+
+import pytest
+
+from autoarg import Append, Count, ParseError, generate_argparser
+from autoarg.fastparse import _Fallback
+
+
+class Fruit(Enum):
+    Apple = 'apple'
+    Banana = 'banana'
+
+
+def shop(
+    store,
+    budget: int,
+    *items: float,
+    verbose: Count = 0,
+    name: str = 'x',
+    fruit: Fruit = Fruit.Apple,
+    speed: Literal['fast', 'slow'] = 'fast',
+    dry_run=False,
+    cache=True,
+    pair: Tuple[int, str] = (1, 'a'),
+):
+    pass
+
+
+def draw(
+    point: Tuple[int, int],
+    label,
+    *names,
+    count: int = 0,
+    shape: Literal['circle', 'square', 'star'],
+):
+    pass
+
+
+TOKENS = [
+    'a', 'b', 'apple', 'banana', 'cherry', '1', '2', '-3', '4.5', '-.5', 'x y', '',
+    '-', '--', '-v', '-vv', '-vvv', '-n', '-nfoo', '--name', '--name=bar', '--name=',
+    '--nam', '-f', '--fruit', '--fruit=banana', '--fast', '--slow', '-s', '-d', '-C',
+    '--dry-run', '--no-cache', '-p', '--pair', '-h', '--help',
+    '--bogus', '-q', '-dv', '-vd', '-vn', '-c', '--count', '--circle', '--square',
+    '--star', '--shape', '-c=5', '-v=x', '--dry-run=1',
+]
+
+
+def _argparse_result(parser, argv):
+    with contextlib.redirect_stderr(io.StringIO()), contextlib.redirect_stdout(io.StringIO()):
+        try:
+            return vars(parser._parser.parse_args(argv))
+        except (ParseError, SystemExit):
+            return SystemExit
+
+
+# likely-valid fragments, so that plenty of generated argv get past argparse
+PIECES = {
+    'shop': [['store'], ['5'], ['1.5'], ['-2'], ['-v'], ['--name', 'n'], ['-f', 'banana'],
+             ['--slow'], ['-d'], ['--no-cache'], ['--pair', '3', 'c']],
+    'draw': [['1', '2'], ['label'], ['x'], ['-c', '3'], ['--count=4'], ['--circle'],
+             ['--star'], ['-s']],
+}
+
+
+@pytest.mark.parametrize('func', [shop, draw])
+def test_differential(func):
+    rng = random.Random(func.__name__)
+    parser = generate_argparser(func, engine='fast')
+    fast = parser._fast_parser
+    assert fast is not None
+
+    handled = 0
+    for _ in range(3000):
+        argv = []
+        for _ in range(rng.randint(0, 6)):
+            if rng.random() < 0.2:
+                argv.append(rng.choice(TOKENS))
+            else:
+                argv.extend(rng.choice(PIECES[func.__name__]))
+        expected = _argparse_result(parser, argv)
+        try:
+            actual = vars(fast.parse_args(argv))
+        except _Fallback:
+            continue
+        handled += 1
+        assert actual == expected, argv
+
+    assert handled > 100  # the fast path must actually be taken for valid argv
+
+
+def test_common_argv_is_fast():
+    parser = generate_argparser(shop, engine='fast')
+    for argv in [
+        ['store', '5'],
+        ['store', '5', '1.5', '2', '-vvv', '--name=y', '--fruit=banana'],
+        ['-d', 'store', '5', '1', '2', '3', '--slow', '-p', '3', 'z'],
+        ['store', '-C', '5'],
+    ]:
+        assert vars(parser._fast_parser.parse_args(argv)) == _argparse_result(parser, argv)
+
+
+@pytest.mark.parametrize('argv', [
+    ['--help'],
+    ['store'],
+    ['store', 'five'],
+    ['store', '5', '--fast', '--slow'],
+    ['store', '5', '--fruit', 'cherry'],
+    ['store', '5', '--nam', 'abbreviated'],
+    ['store', '5', '--', '-1'],
+])
+def test_fallback(argv):
+    parser = generate_argparser(shop, engine='fast')
+    with pytest.raises(_Fallback):
+        parser._fast_parser.parse_args(argv)
+
+    expected = _argparse_result(generate_argparser(shop), argv)
+    actual = _argparse_result(parser, argv)
+    assert actual == expected
+
+
+def test_postprocessing():
+    parser = generate_argparser(shop, engine='fast')
+    args = parser.parse_args(['s', '1', '--fruit', 'banana', '--pair', '2', 'b'])
+    assert args.fruit is Fruit.Banana
+    assert args.pair == (2, 'b')
+    assert parser._argparser is None  # argparse was never needed
+
+
+def test_append_leaves_default_alone():
+    default = ['x']
+
+    def tag(*, tag: Append[str] = default):
+        pass
+
+    fast = generate_argparser(tag, engine='fast')._fast_parser
+    for _ in range(2):
+        assert fast.parse_args(['-t', 'a', '--tag', 'b']).tag == ['x', 'a', 'b']
+    assert default == ['x']
+
+
+def test_unknown_engine():
+    with pytest.raises(ValueError):
+        generate_argparser(shop, engine='turbo')
@@ -0,0 +1,77 @@
+import bz2
+import gzip
+import lzma
+import mmap
+
+import pytest
+
+from autoarg import File, LazyFile, command
+
+CONTENT = 'alpha\nbeta\n'
+
+
+@command
+def cat(*files: File['r']):
+    return files, [f.read() for f in files[:1]]
+
+
+@command
+def scan(data: File['mmap']):
+    with data as buffer:
+        return type(buffer), bytes(buffer[:5])
+
+
+def test_files_open_lazily_and_close(tmp_path):
+    paths = []
+    for i in range(200):
+        path = tmp_path / f'{i}.txt'
+        path.write_text(CONTENT)
+        paths.append(str(path))
+
+    files, contents = cat.run(*paths)
+    assert contents == [CONTENT]
+    assert all(isinstance(f, LazyFile) for f in files)
+    assert not any(f.is_open for f in files)  # only the first was opened, and it's closed
+
+
+def test_missing_file_is_a_parse_error(tmp_path):
+    with pytest.raises(TypeError):
+        cat.run(str(tmp_path / 'nope.txt'))
+    with pytest.raises(TypeError):
+        cat.run(str(tmp_path))
+
+
+@pytest.mark.parametrize('module', [gzip, bz2, lzma])
+def test_compressed_input(tmp_path, module):
+    path = tmp_path / 'data.txt.z'
+    with module.open(path, 'wt') as f:
+        f.write(CONTENT)
+
+    assert list(LazyFile(str(path))) == ['alpha\n', 'beta\n']
+    assert LazyFile(str(path), 'rb').read() == CONTENT.encode()
+    assert scan.run(str(path)) == (memoryview, b'alpha')
+
+
+def test_mmap(tmp_path):
+    path = tmp_path / 'data.bin'
+    path.write_bytes(b'alpha' * 1000)
+    assert scan.run(str(path)) == (mmap.mmap, b'alpha')
+
+    path.write_bytes(b'')
+    assert scan.run(str(path)) == (memoryview, b'')
+
+
+def test_unused_output_file_is_not_created(tmp_path):
+    @command
+    def export(out: File['w'], *, write=False):
+        if write:
+            out.write('done')
+
+    path = tmp_path / 'out.txt'
+    export.run(str(path))
+    assert not path.exists()
+    export.run(str(path), '--write')
+    assert path.read_text() == 'done'
+
+    with pytest.raises(TypeError):
+        export.run(str(tmp_path / 'missing' / 'out.txt'))
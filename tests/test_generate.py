@@ -6,14 +6,19 @@ from typing_extensions import Literal
 
 import pytest
 
-from autoarg import generate_argparser
+from autoarg import Append, generate_argparser
 
 
-def test_toy_example():
+@pytest.fixture(params=['argparse', 'fast'])
+def engine(request):
+    return request.param
+
+
+def test_toy_example(engine):
     def some_cmd(a, *b, c=False, d=True, e, long, something_with_a_default: int = 3, cat: str = ''):
         pass
 
-    parser = generate_argparser(some_cmd)
+    parser = generate_argparser(some_cmd, engine=engine)
 
     args = parser.parse_args(['abc', 'def', '123', '-c', '-e', 'xyz', '-l', 'abc'])
     assert args.a == 'abc'
@@ -25,7 +30,7 @@ def test_toy_example():
     assert args.cat == ''
 
 
-def test_enum():
+def test_enum(engine):
     class Fruit(Enum):
         Apple = 'apple'
         Banana = 'banana'
@@ -40,7 +45,7 @@ def test_enum():
     ):
         pass
 
-    parser = generate_argparser(eat)
+    parser = generate_argparser(eat, engine=engine)
 
     with pytest.raises(SystemExit):
         parser.parse_args(['tomato'])
@@ -54,7 +59,7 @@ def test_enum():
     assert args.adverb == 'quickly'
 
 
-def test_literal():
+def test_literal(engine):
     def something(
         target: str,
         amount: int,
@@ -63,7 +68,7 @@ def test_literal():
     ):
         pass
 
-    parser = generate_argparser(something)
+    parser = generate_argparser(something, engine=engine)
 
     args = parser.parse_args(['tires', '5'])
     assert args.target == 'tires'
@@ -94,19 +99,41 @@ def test_literal():
         parser.parse_args(['beach', '6', '--fast', '--slow'])
 
 
-def test_tuple():
+def test_tuple(engine):
     def good(a: Tuple[float, int, str]):
         pass
 
-    parser = generate_argparser(good)
+    parser = generate_argparser(good, engine=engine)
 
     args = parser.parse_args(['3.14', '42', 'best numbers'])
     assert args.a == (3.14, 42, 'best numbers')
 
 
-def test_tuple_errors():
+def test_tuple_errors(engine):
     def bad(a: Tuple[List[int], int, str]):
         pass
 
     with pytest.raises(TypeError):
-        generate_argparser(bad)
+        generate_argparser(bad, engine=engine)
+
+
+def test_append(engine):
+    class Color(Enum):
+        Red = 'red'
+        Blue = 'blue'
+
+    def paint(*, number: Append[int], color: Append[Color] = [], point: Append[Tuple[int, int]]):
+        pass
+
+    parser = generate_argparser(paint, engine=engine)
+
+    args = parser.parse_args(['-n', '1', '-n', '2', '-c', 'red', '-c', 'blue', '-p', '3', '4'])
+    assert args.number == [1, 2]
+    assert args.color == [Color.Red, Color.Blue]
+    assert args.point == [(3, 4)]
+
+    args = parser.parse_args([])
+    assert args.color == []
+
+    with pytest.raises(SystemExit):
+        parser.parse_args(['-n', 'x'])
@@ -0,0 +1,111 @@
+import sys
+import textwrap
+
+import pytest
+
+from autoarg import CommandGroup
+
+
+@pytest.fixture
+def tool(tmp_path, monkeypatch):
+    package = tmp_path / 'grouptool'
+    package.mkdir()
+    (package / '__init__.py').write_text('')
+    (package / 'build.py').write_text(textwrap.dedent('''
+        def build(target, *, jobs: int = 1):
+            """Build a target
+
+            More details here.
+            """
+            return (target, jobs)
+    '''))
+    (package / 'remote.py').write_text(textwrap.dedent('''
+        from autoarg import command
+
+        @command
+        def add(name, url):
+            """Add a remote"""
+            return {name: url}
+    '''))
+    monkeypatch.syspath_prepend(str(tmp_path))
+    yield package
+    for name in list(sys.modules):
+        if name.startswith('grouptool'):
+            del sys.modules[name]
+
+
+def _app(cache_dir=False):
+    app = CommandGroup('tool', "Does several things", summary_cache=cache_dir)
+    app.add('build', 'grouptool.build:build')
+    remote = app.group('remote', "Manage remotes\n\nLonger text.")
+    remote.add('add', 'grouptool.remote:add')
+    return app
+
+
+def test_dispatch_imports_only_the_selected_subcommand(tool):
+    app = _app()
+    assert app.run('build', 'all', '--jobs', '4') == ('all', 4)
+    assert 'grouptool.build' in sys.modules
+    assert 'grouptool.remote' not in sys.modules
+
+    assert app.run('remote', 'add', 'origin', 'u') == {'origin': 'u'}
+
+
+def test_main_exit_status_and_prog(tool, capsys):
+    app = _app()
+    with pytest.raises(SystemExit) as exc:
+        app.main(['remote', 'add', 'origin'])
+    assert exc.value.code == 2
+    assert 'usage: tool remote add' in capsys.readouterr().err
+
+    with pytest.raises(SystemExit) as exc:
+        app.main(['bogus'])
+    assert exc.value.code == 2
+    assert "unknown subcommand 'bogus'" in capsys.readouterr().err
+
+    with pytest.raises(TypeError):
+        app.run()
+
+
+def test_help_imports_nothing(tool, capsys, monkeypatch):
+    monkeypatch.delenv('AUTOARG_SPEC_CACHE', raising=False)
+    with pytest.raises(SystemExit) as exc:
+        _app(None).main(['--help'])
+    assert exc.value.code == 0
+    assert not [name for name in sys.modules if name.startswith('grouptool.')]
+    lines = capsys.readouterr().out.splitlines()
+    assert '  build' in lines and '  remote  Manage remotes' in lines
+
+
+def test_help_from_cached_summaries(tool, tmp_path, capsys):
+    cache_dir = tmp_path / 'cache'
+    with pytest.raises(SystemExit) as exc:
+        _app(cache_dir).main(['--help'])
+    assert exc.value.code == 0
+    out = capsys.readouterr().out
+    assert 'build   Build a target' in out
+    assert 'remote  Manage remotes' in out
+    assert 'More details' not in out
+
+    del sys.modules['grouptool.build']
+    assert _app(cache_dir).summaries() == {'build': 'Build a target', 'remote': 'Manage remotes'}
+    assert 'grouptool.build' not in sys.modules
+
+    (tool / 'build.py').write_text('def build():\n    """Changed"""\n')
+    assert _app(cache_dir).summaries()['build'] == 'Changed'
+
+
+def test_decorator_and_duplicates():
+    app = CommandGroup('tool')
+
+    @app.command
+    def say_hi(name):
+        """Greet"""
+        return f"hi {name}"
+
+    assert app.run('say-hi', 'bob') == 'hi bob'
+    assert app.summaries() == {'say-hi': 'Greet'}
+    with pytest.raises(TypeError):
+        app.add('say-hi', say_hi)
+    with pytest.raises(TypeError):
+        app.add('other', 'no_colon')
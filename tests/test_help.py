@@ -0,0 +1,46 @@
+import sys
+
+import pytest
+
+from autoarg import Arg, generate_argparser
+
+
+def copy(src: str, *rest: int, level: int = Arg(1, help='explicit'), dry_run=False):
+    """Copy things
+
+    Args:
+        src: where to copy from (100% required)
+        rest: more numbers
+        level: ignored, since it has help already
+        dry_run: only pretend
+    """
+
+
+@pytest.mark.parametrize('engine', ['argparse', 'fast'])
+def test_docstring_help(engine):
+    pytest.importorskip('docstring_parser')
+    parser = generate_argparser(copy, spec_cache=False, engine=engine)
+    text = parser.format_help()
+    assert text.startswith('usage: copy') and 'Copy things' in text
+    assert 'where to copy from (100% required)' in text
+    assert 'more numbers' in text and 'only pretend' in text
+    assert 'explicit' in text and 'ignored' not in text
+
+
+def test_parsing_skips_docstring(monkeypatch):
+    monkeypatch.setitem(sys.modules, 'docstring_parser', None)  # would fail to import
+    parser = generate_argparser(copy, spec_cache=False)
+    assert parser.parse_args(['a', '1', '--dry-run']).dry_run
+    assert parser._parser._docstring is not None
+
+
+def test_help_cached_per_width(monkeypatch):
+    parser = generate_argparser(copy, spec_cache=False)._parser
+    monkeypatch.setenv('COLUMNS', '200')
+    wide = parser.format_help()
+    assert parser.format_help() is wide
+    monkeypatch.setenv('COLUMNS', '40')
+    narrow = parser.format_help()
+    assert narrow != wide
+    assert max(map(len, narrow.splitlines())) < max(map(len, wide.splitlines()))
+    assert parser.format_usage() is parser.format_usage()
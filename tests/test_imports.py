@@ -0,0 +1,65 @@
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# modules that only building a parser (or a JSON argument) may pull in
+DEFERRED = ['argparse', 'inspect', 'json', 'typing_extensions', 'autoarg.generate']
+
+
+def _importtime(code):
+    proc = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', code],
+        cwd=ROOT, capture_output=True, text=True, check=True,
+    )
+    cumulative = {}
+    for line in proc.stderr.splitlines():
+        if line.startswith('import time:') and '|' in line:
+            _, us, name = line.split('|')
+            if us.strip().isdigit():
+                cumulative[name.strip()] = int(us)
+    return proc.stdout, cumulative
+
+
+def test_import_defers_heavy_modules():
+    code = (
+        "import sys, autoarg\n"
+        "@autoarg.command\n"
+        "def f(x: int, *, data: autoarg.JSON = None): pass\n"
+        f"print(*[m for m in {DEFERRED!r} if m in sys.modules])"
+    )
+    stdout, _ = _importtime(code)
+    assert stdout.split() == []
+
+
+def test_import_time_budget():
+    # relative to `typing`, which autoarg can't avoid, so that machine speed cancels out
+    best = min(_importtime('import autoarg')[1]['autoarg'] for _ in range(3))
+    typing = min(_importtime('import typing')[1]['typing'] for _ in range(3))
+    assert best < 2.5 * typing, (best, typing)
+
+
+def test_lazy_attributes():
+    stdout, _ = _importtime(
+        "import sys, autoarg\n"
+        "print(autoarg.generate_argparser.__module__, autoarg.CommandGroup.__name__,"
+        " 'generate_argparser' in dir(autoarg))"
+    )
+    assert stdout.split() == ['autoarg.generate', 'CommandGroup', 'True']
+
+
+def test_disabled_spec_cache_is_not_imported():
+    code = (
+        "import sys, autoarg\n"
+        "@autoarg.command\n"
+        "def f(x: int): pass\n"
+        "f.run('1')\n"
+        "print('autoarg.cache' in sys.modules)"
+    )
+    proc = subprocess.run(
+        [sys.executable, '-c', code], cwd=ROOT, capture_output=True, text=True, check=True,
+        env={**os.environ, 'AUTOARG_SPEC_CACHE': '0'},
+    )
+    assert proc.stdout.split() == ['False']
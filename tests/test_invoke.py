@@ -0,0 +1,130 @@
+import io
+import json
+from array import array
+from enum import Enum
+from typing import Tuple
+
+import pytest
+from typing_extensions import Literal
+
+from autoarg import Append, Array, Count, ParseError, command
+
+
+class Color(Enum):
+    red = 'red'
+    green = 'green'
+
+
+@command(spec_cache=False)
+def paint(src: str, *, size: Tuple[int, int] = (1, 1), color: Color = Color.red,
+          mode: Literal['fill', 'stroke'] = 'fill', tag: Append[str] = [], verbose: Count = 0,
+          weights: Array[float] = None, scale: float = 1.0, force=False,
+          points: Append[Tuple[int, int]] = []):
+    return src, size, color, mode, tag, verbose, weights, scale, force, points
+
+
+def test_typed_values():
+    assert paint.invoke({'src': 'a', 'verbose': 1}) == paint.run('a', '-v')
+    assert paint.invoke({
+        'src': 'a', 'size': [3, 4], 'color': Color.green, 'mode': 'stroke', 'tag': ['x', 'y'],
+        'verbose': 2, 'weights': [1, 2.5], 'scale': 2, 'force': True, 'points': [[1, 2]],
+    }) == (
+        'a', (3, 4), Color.green, 'stroke', ['x', 'y'], 2, array('d', [1.0, 2.5]), 2.0, True,
+        [(1, 2)],
+    )
+
+
+def test_strings_convert_like_argv():
+    argv = ['a', '--size', '3', '4', '-c', 'green', '--weights', '1', '2.5', '--scale', '2', '-vv']
+    assert paint.invoke({
+        'src': 'a', 'size': ['3', '4'], 'color': 'green', 'weights': ['1', '2.5'], 'scale': '2',
+        'verbose': 2,
+    }) == paint.run(*argv)
+    assert paint.invoke({'src': 'a', 'color': 'green'})[2] is Color.green
+
+
+@pytest.mark.parametrize('mapping, argument, token', [
+    ({'src': 1}, 'src', None),
+    ({'src': 'a', 'size': [1]}, 'size', None),
+    ({'src': 'a', 'size': [1, 2.5]}, 'size', None),
+    ({'src': 'a', 'color': 'blue'}, 'color', 'blue'),
+    ({'src': 'a', 'mode': 'erase'}, 'mode', 'erase'),
+    ({'src': 'a', 'verbose': True}, 'verbose', None),
+    ({'src': 'a', 'weights': [1, 'x']}, 'weights', None),
+    ({'src': 'a', 'scale': 'big'}, 'scale', 'big'),
+    ({'src': 'a', 'force': 1}, 'force', None),
+])
+def test_invalid(mapping, argument, token, capsys):
+    with pytest.raises(ParseError) as info:
+        paint.invoke(mapping)
+    assert (info.value.argument, info.value.token) == (argument, token)
+    assert info.value.message.startswith(f"argument {argument}: ")
+    assert capsys.readouterr() == ('', '')
+
+
+def test_unknown_and_missing():
+    with pytest.raises(ParseError, match='required: src'):
+        paint.invoke({'color': 'red'})
+    with pytest.raises(ParseError, match='unrecognized arguments: colour') as info:
+        paint.invoke({'src': 'a', 'colour': 'red'})
+    assert info.value.token == 'colour'
+
+
+def add(a: int, b: int = 2, *rest: int, times: int = 1):
+    return (a + b + sum(rest)) * times
+
+
+def test_positionals():
+    cmd = command(add, spec_cache=False)
+    assert cmd.invoke({'a': 1}) == 3
+    assert cmd.invoke({'a': 1, 'b': '5', 'times': 2}) == 12
+    assert cmd.invoke({'a': 1, 'rest': [3, '4']}) == 10
+
+
+def test_serve_jsonl():
+    requests = [
+        json.dumps({'src': 'a', 'color': 'green', 'weights': [0.5]}), '',
+        '[1]', 'not json', json.dumps({'src': 'a', 'scale': 'big'}), json.dumps({'src': 'z'}),
+    ]
+    stdout = io.BytesIO()
+    failures = paint.serve_jsonl(io.BytesIO('\n'.join(requests).encode()), stdout)
+    responses = [json.loads(line) for line in stdout.getvalue().splitlines()]
+    assert failures == 3 and len(responses) == 5
+    assert responses[0] == {
+        'result': ['a', [1, 1], 'green', 'fill', [], 0, [0.5], 1.0, False, []],
+    }
+    assert [response['error']['type'] for response in responses[1:4]] == ['ParseError'] * 3
+    assert responses[3]['error'] == {
+        'type': 'ParseError', 'message': "argument scale: invalid float value: 'big'",
+        'argument': 'scale', 'token': 'big', 'reason': "invalid float value: 'big'",
+    }
+    assert responses[4]['result'][0] == 'z'
+
+
+def test_serve_jsonl_text_streams_and_long_lines(monkeypatch):
+    from autoarg import invoke
+    monkeypatch.setattr(invoke, '_CHUNK_SIZE', 7)  # every request spans several chunks
+    stdout = io.StringIO()
+    requests = ''.join(json.dumps({'src': str(i) * 20}) + '\n' for i in range(5))
+    assert paint.serve_jsonl(io.StringIO(requests), stdout) == 0
+    results = [json.loads(line)['result'][0] for line in stdout.getvalue().splitlines()]
+    assert results == [str(i) * 20 for i in range(5)]
+
+
+def test_serve_jsonl_captures_output(capsys):
+    @command(spec_cache=False)
+    def noisy(n: int):
+        print('noise', n)
+        if n < 0:
+            raise ValueError(n)
+        return n
+
+    requests = b'{"n": 1}\n{"n": 2}\n{"n": -1}\n'
+    assert noisy.serve_jsonl(io.BytesIO(requests)) == 1
+    captured = capsys.readouterr()
+    assert [json.loads(line) for line in captured.out.splitlines()] == [
+        {'result': 1, 'output': 'noise 1\n'},
+        {'result': 2, 'output': 'noise 2\n'},
+        {'error': {'type': 'ValueError', 'message': '-1'}, 'output': 'noise -1\n'},
+    ]
+    assert captured.err == ''
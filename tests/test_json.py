@@ -0,0 +1,92 @@
+import gzip
+import io
+import json
+import sys
+
+import pytest
+
+from autoarg import JSON, Arg, JSONLines, JSONRecords, command
+
+
+@command
+def load(config: JSON, *, extra: JSON = None):
+    return config, extra
+
+
+@command
+def count(events: JSONLines):
+    return sum(1 for _ in events), events
+
+
+def test_json_inline_and_from_file(tmp_path):
+    path = tmp_path / 'config.json'
+    path.write_text('{"a": [1, 2]}')
+    assert load.run('[1]', '--extra', '{"b": null}') == ([1], {'b': None})
+    assert load.run(f'@{path}') == ({'a': [1, 2]}, None)
+
+
+def test_json_from_stdin(monkeypatch):
+    monkeypatch.setattr(sys, 'stdin', io.TextIOWrapper(io.BytesIO(b'{"x": 1}')))
+    assert load.run('-') == ({'x': 1}, None)
+
+
+def test_json_errors(tmp_path):
+    with pytest.raises(TypeError):
+        load.run('{not json')
+    with pytest.raises(TypeError):
+        load.run(f'@{tmp_path / "missing.json"}')
+
+
+def test_json_lines(tmp_path):
+    path = tmp_path / 'events.jsonl'
+    path.write_text(''.join(json.dumps({'i': i}) + '\n' for i in range(1000)) + '\n')
+    n, events = count.run(str(path))
+    assert n == 1000
+    assert isinstance(events, JSONRecords) and not events.is_open  # closed after the call
+
+
+def test_json_lines_across_chunks(tmp_path, monkeypatch):
+    monkeypatch.setattr(JSONRecords, '_CHUNK_SIZE', 7)
+    records = [{'text': 'x' * i} for i in range(30)]
+    path = tmp_path / 'events.jsonl.gz'
+    with gzip.open(path, 'wt') as f:
+        f.write('\n'.join(map(json.dumps, records)))  # no trailing newline
+    assert list(JSONRecords(str(path))) == records
+
+
+def test_json_lines_bad_record(tmp_path):
+    path = tmp_path / 'events.jsonl'
+    path.write_text('{"ok": 1}\n\n{oops}\n')
+    records = iter(JSONRecords(str(path)))
+    assert next(records) == {'ok': 1}
+    with pytest.raises(ValueError, match='line 3'):
+        next(records)
+
+
+def test_custom_decoder(tmp_path):
+    seen = []
+
+    def decoder(data):
+        seen.append(type(data))
+        return json.loads(data)
+
+    @command
+    def both(doc: JSON = Arg(decoder=decoder), *, events: JSONLines = Arg(None, decoder=decoder)):
+        return doc, list(events)
+
+    path = tmp_path / 'events.jsonl'
+    path.write_text('1\n2\n')
+    assert both.run('{}', '--events', str(path)) == ({}, [1, 2])
+    assert seen == [str, bytes, bytes]
+
+
+def test_drop_in_decoder(tmp_path):
+    orjson = pytest.importorskip('orjson')
+
+    @command
+    def fast(events: JSONLines = Arg(decoder=orjson.loads)):
+        return list(events)
+
+    path = tmp_path / 'events.jsonl'
+    path.write_text('{"a": 1}\n[2]\n')
+    assert fast.run(str(path)) == [{'a': 1}, [2]]
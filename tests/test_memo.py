@@ -0,0 +1,123 @@
+import os
+import pickle
+from enum import Enum
+
+import pytest
+
+from autoarg import File, command
+from autoarg.memo import ResultCache
+
+calls = []
+
+
+class Color(Enum):
+    red = 'red'
+    green = 'green'
+
+
+def total(src: File['r'], *, scale: int = 1, color: Color = Color.red):
+    """Sums the numbers in SRC"""
+    calls.append(src.path)
+    with src:
+        value = sum(map(int, src.read().split())) * scale
+    print('total:', value)
+    return value, color
+
+
+@pytest.fixture
+def numbers(tmp_path):
+    path = tmp_path / 'numbers.txt'
+    path.write_text('1 2 3')
+    calls.clear()
+    return path
+
+
+def test_hits_replay_value_and_output(numbers, tmp_path, capsys):
+    cmd = command(total, spec_cache=False, cache=tmp_path / 'cache')
+    assert cmd.run(str(numbers), '-c', 'green') == (6, Color.green)
+    assert cmd.run(str(numbers), '--color', 'green') == (6, Color.green)  # same parsed arguments
+    assert cmd.run(str(numbers), '-s', '2') == (12, Color.red)
+    assert len(calls) == 2
+    assert capsys.readouterr().out == 'total: 6\n' * 2 + 'total: 12\n'
+    info = cmd.cache.info()
+    assert (info['hits'], info['misses'], info['entries']) == (1, 2, 2)
+
+    # a new process would see the same store
+    again = command(total, spec_cache=False, cache=tmp_path / 'cache')
+    assert again.run(str(numbers), '-s', '2') == (12, Color.red) and len(calls) == 2
+
+
+def test_changed_input_and_no_cache(numbers, tmp_path):
+    cmd = command(total, spec_cache=False, cache=tmp_path / 'cache')
+    assert cmd.run(str(numbers))[0] == 6
+    numbers.write_text('1 2 3 4')
+    os.utime(numbers, ns=(0, 10**18))  # in case the clock is coarse
+    assert cmd.run(str(numbers))[0] == 10
+    assert cmd.run(str(numbers), '--no-cache')[0] == 10
+    assert cmd.run(str(numbers), '--no-c')[0] == 10
+    assert len(calls) == 4 and cmd.cache.bypassed == 2
+    assert '--no-cache' in cmd.parser.format_help()
+
+
+def test_content_hash(numbers, tmp_path):
+    cmd = command(total, spec_cache=False, cache=ResultCache(tmp_path / 'cache', files='hash'))
+    cmd.run(str(numbers))
+    os.utime(numbers, ns=(0, 10**18))
+    cmd.run(str(numbers))
+    assert len(calls) == 1
+
+
+def copy(src: File['r'], dst: File['w']):
+    with src, dst:
+        dst.write(src.read())
+
+
+def test_uncacheable_calls_run(numbers, tmp_path):
+    cmd = command(copy, spec_cache=False, cache=tmp_path / 'cache')
+    for _ in range(2):
+        (tmp_path / 'out.txt').unlink(missing_ok=True)
+        cmd.run(str(numbers), str(tmp_path / 'out.txt'))
+        assert (tmp_path / 'out.txt').read_text() == '1 2 3'
+    assert cmd.cache.bypassed == 2 and cmd.cache.info()['entries'] == 0
+
+
+def test_lru_eviction(numbers, tmp_path):
+    cache = ResultCache(tmp_path / 'cache', max_entries=2)
+    cmd = command(total, spec_cache=False, cache=cache)
+    for scale in ['1', '2', '1', '3']:  # 1 is used again just before 3 is stored
+        cmd.run(str(numbers), '-s', scale)
+    assert cache.evictions == 1 and cache.info()['entries'] == 2
+    cmd.run(str(numbers), '-s', '1')
+    cmd.run(str(numbers), '-s', '2')
+    assert (cache.hits, cache.misses) == (2, 4)
+
+
+def test_pickle_and_stats(numbers, tmp_path):
+    cmd = command(total, spec_cache=False, cache=tmp_path / 'cache')
+    stats = cmd.enable_stats()
+    cmd.run(str(numbers))
+    cmd.run(str(numbers))
+    names = [phase.name for phase in stats.phases]
+    assert names.count('cache_lookup') == 2 and names.count('call') == 1
+    copied = pickle.loads(pickle.dumps(cmd.cache))
+    assert copied.directory == cmd.cache.directory and copied.hits == 0
+
+
+def test_arun(numbers, tmp_path):
+    import asyncio
+
+    async def twice(*argv):
+        return [await cmd.arun(*argv), await cmd.arun(*argv)]
+
+    for func in (total, _atotal):
+        calls.clear()
+        cmd = command(func, spec_cache=False, cache=tmp_path / func.__name__)
+        stats = cmd.enable_stats()
+        assert asyncio.run(twice(str(numbers))) == [(6, Color.red)] * 2
+        asyncio.run(cmd.arun(str(numbers), '--no-cache'))
+        assert len(calls) == 2 and cmd.cache.hits == 1
+        assert [phase.name for phase in stats.phases].count('call') == 2
+
+
+async def _atotal(src: File['r'], *, scale: int = 1, color: Color = Color.red):
+    return total(src, scale=scale, color=color)
@@ -0,0 +1,122 @@
+import json
+import os
+import subprocess
+import sys
+import textwrap
+from enum import Enum
+from pathlib import Path
+from typing import Iterator
+
+import pytest
+
+from autoarg import File, command, output
+from autoarg.output import register_format, stream
+
+ROOT = Path(__file__).resolve().parent.parent
+
+
+class Color(Enum):
+    red = 'red'
+
+
+@command(spec_cache=False)
+def rows(n: int, *, status: int = 0):
+    for i in range(n):
+        yield {'i': i, 'name': f'row,{i}', 'color': Color.red}
+    return status
+
+
+@command(spec_cache=False, engine='fast')
+def squares(n: int) -> Iterator[int]:
+    return map(lambda i: i * i, range(n))
+
+
+def _main(cmd, argv, capsys):
+    with pytest.raises(SystemExit) as info:
+        cmd.main(argv)
+    return info.value.code, capsys.readouterr().out
+
+
+def test_formats(capsys):
+    assert _main(squares, ['4'], capsys) == (0, '0\n1\n4\n9\n')
+    assert _main(squares, ['3', '--output-format', 'nul'], capsys) == (0, '0\x001\x004\x00')
+    status, out = _main(rows, ['2', '--output-format', 'jsonl'], capsys)
+    assert [json.loads(line) for line in out.splitlines()] == [
+        {'i': 0, 'name': 'row,0', 'color': 'red'}, {'i': 1, 'name': 'row,1', 'color': 'red'},
+    ]
+    status, out = _main(rows, ['2', '--output-format', 'csv'], capsys)
+    assert out == 'i,name,color\n0,"row,0",Color.red\n1,"row,1",Color.red\n'
+
+
+def test_exit_status_from_generator_return(capsys):
+    assert _main(rows, ['1', '--status', '3'], capsys)[0] == 3
+    assert _main(rows, ['0'], capsys) == (0, '')
+
+
+def test_run_returns_the_iterator():
+    assert list(rows.run('2'))[1]['i'] == 1
+    assert '--output-format' in rows.parser.format_help()
+
+    @command(spec_cache=False)
+    def plain(n: int):
+        return n
+
+    assert '--output-format' not in plain.parser.format_help()
+
+
+def test_register_format_and_large_output(capsys, monkeypatch):
+    monkeypatch.setattr(output, 'FORMATS', dict(output.FORMATS))
+    register_format('tsv', lambda items: ('\t'.join(map(str, row)) + '\n' for row in items))
+    value = stream(iter([(1, 2), (3, 4)]), 'tsv')
+    assert value is None and capsys.readouterr().out == '1\t2\n3\t4\n'
+    stream(iter(range(100_000)))  # many buffer flushes
+    assert capsys.readouterr().out.split() == [str(i) for i in range(100_000)]
+
+
+def test_broken_pipe(tmp_path):
+    script = tmp_path / 'script.py'
+    script.write_text(textwrap.dedent('''
+        import sys
+        from autoarg import command
+
+        @command
+        def forever():
+            try:
+                i = 0
+                while True:
+                    yield i
+                    i += 1
+            finally:
+                print('closed', file=sys.stderr)
+
+        forever.main()
+    '''))
+    env = {**os.environ, 'PYTHONPATH': str(ROOT), 'AUTOARG_SPEC_CACHE': '0'}
+    proc = subprocess.Popen(
+        [sys.executable, str(script)], env=env, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+    )
+    assert proc.stdout.readline() == b'0\n'
+    proc.stdout.close()  # like `head -1`
+    stderr = proc.stderr.read().decode()
+    assert proc.wait(timeout=30) == 141
+    assert stderr == 'closed\n'
+
+
+def test_files_close_after_the_generator(tmp_path, capsys):
+    opened = []
+
+    @command(spec_cache=False)
+    def numbered(src: File['r']):
+        opened.append(src)
+        for i, line in enumerate(src):
+            yield f'{i}: {line.rstrip()}'
+
+    (tmp_path / 'in.txt').write_text('a\nb\n')
+    assert list(numbered.run(str(tmp_path / 'in.txt'))) == ['0: a', '1: b']
+    assert not opened[-1].is_open
+    items = numbered.run(str(tmp_path / 'in.txt'))
+    next(items)
+    items.close()
+    assert not opened[-1].is_open
+    assert _main(numbered, [str(tmp_path / 'in.txt')], capsys) == (0, '0: a\n1: b\n')
+    assert not opened[-1].is_open
@@ -0,0 +1,98 @@
+import threading
+import time
+
+import pytest
+
+from autoarg import File, command
+
+
+@command(map_over='numbers', workers=4, executor='process')
+def square(offset: int, *numbers: int, verbose=False):
+    for n in numbers:
+        print(f"{n}:{n * n + offset}")
+    return [n * n + offset for n in numbers]
+
+
+@command(map_over='names', workers=3, chunksize=2)
+def greet(*names, shout=False):
+    greeting = ' '.join(f"hi {name}" for name in names)
+    return greeting.upper() if shout else greeting
+
+
+@command(map_over='lines', executor='process')
+def write_lines(out: File['w'], *lines):
+    out.writelines(lines)
+
+
+def test_process_pool_in_input_order(capfd):
+    assert square.run('1', '1', '2', '3', '4') == [[2], [5], [10], [17]]
+    assert capfd.readouterr().out == '1:2\n2:5\n3:10\n4:17\n'
+
+
+def test_chunks_and_options():
+    assert greet.run('a', 'b', 'c', '--shout') == ['HI A HI B', 'HI C']
+    assert greet.run() == []
+
+
+def test_completion_order_and_output(capsys):
+    @command(map_over='delays', workers=3, ordered=False)
+    def nap(*delays: float):
+        time.sleep(delays[0])
+        print(f"slept {delays[0]}", flush=True)
+        print("done")
+        return delays[0]
+
+    assert nap.run('0.3', '0.0', '0.15') == [0.0, 0.15, 0.3]
+    # each call's output stays together
+    assert capsys.readouterr().out.splitlines() == [
+        'slept 0.0', 'done', 'slept 0.15', 'done', 'slept 0.3', 'done',
+    ]
+
+
+def test_runs_concurrently():
+    barrier = threading.Barrier(3, timeout=5)
+
+    @command(map_over='items', workers=3)
+    def wait(*items):
+        barrier.wait()  # would time out if the calls ran one at a time
+        return items
+
+    assert wait.run('a', 'b', 'c') == [('a',), ('b',), ('c',)]
+
+
+def test_main_merges_exit_status(capsys):
+    @command(map_over='values', workers=2)
+    def check(*values: int):
+        if values[0] < 0:
+            raise ValueError("negative")
+        return values[0]  # exit status is the value
+
+    with pytest.raises(SystemExit) as exc:
+        check.main(['0', '-1', '3', '2'])
+    assert exc.value.code == 3
+    assert "ValueError('negative')" in capsys.readouterr().err
+
+    with pytest.raises(ValueError):
+        check.run('1', '-1')
+
+
+def test_map_over_must_name_var_positional():
+    with pytest.raises(TypeError):
+        command(map_over='x')(lambda x: x)
+
+    with pytest.raises(TypeError):
+        @command(map_over='wrong')
+        def f(*items):
+            pass
+
+
+def test_shared_output_file(tmp_path):
+    @command(map_over='lines', workers=3)
+    def write(out: File['w'], *lines):
+        for line in lines:
+            out.write(line + '\n')
+
+    write.run(str(tmp_path / 'out.txt'), 'a', 'b', 'c')
+    assert sorted((tmp_path / 'out.txt').read_text().splitlines()) == ['a', 'b', 'c']
+    with pytest.raises(TypeError, match="can't be shared"):
+        write_lines.run(str(tmp_path / 'other.txt'), 'a')
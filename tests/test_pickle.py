@@ -0,0 +1,86 @@
+import multiprocessing
+import pickle
+from concurrent.futures import ProcessPoolExecutor
+from enum import Enum
+from typing import Tuple
+
+import pytest
+from typing_extensions import Literal
+
+from autoarg import Append, Arg, File, command, generate_argparser
+
+
+class Color(Enum):
+    red = 'red'
+    green = 'green'
+
+
+@command(engine='fast')
+def paint(src: File['r'], size: Tuple[int, int], *, color: Color = Color.red,
+          mode: Literal['fill', 'stroke'] = 'fill', tag: Append[str] = [],
+          scale: float = Arg(1.0, help="how much bigger")):
+    with src:
+        return src.read(), size, color, mode, tag, scale
+
+
+def blend(a: int, *, b: int = Arg(2, help="second")):
+    return a + b
+
+
+blend_command = command(blend)  # not importable under its own name
+
+
+def _run_pickled(cmd, argv):
+    had_parser = cmd._parser is not None
+    return cmd.run(*argv), had_parser
+
+
+@pytest.mark.parametrize('engine', ['argparse', 'fast'])
+def test_parser_round_trip(engine, tmp_path):
+    (tmp_path / 'in.txt').write_text('data')
+    parser = generate_argparser(paint._spec_func, spec_cache=False, engine=engine)
+    parser.format_usage()  # builds the argparse parser
+    copied = pickle.loads(pickle.dumps(parser))
+    assert copied.spec == parser.spec
+    assert copied._argparser is None  # rebuilt on first use
+    argv = [str(tmp_path / 'in.txt'), '1', '2', '--color', 'green', '--tag', 'x']
+    args, kwargs = copied.parse_call_args(argv)
+    args[0].close()
+    assert args[1:] == [(1, 2)] and kwargs['color'] is Color.green and kwargs['tag'] == ['x']
+    assert copied.format_usage() == parser.format_usage()
+
+
+def test_command_by_name():
+    paint.parser
+    assert pickle.loads(pickle.dumps(paint)) is paint
+    assert len(pickle.dumps(paint)) < 4096
+
+
+def test_command_by_function():
+    copied = pickle.loads(pickle.dumps(blend_command))
+    assert copied is not blend_command and copied.run('1') == 3
+    assert copied.parser.format_help() == blend_command.parser.format_help()
+    copied.enable_stats()  # generates the parser again, from the function
+    assert 'second' in copied.parser.format_help()
+    assert copied.parser.format_help() == blend_command.parser.format_help()
+
+
+def test_local_command_fails():
+    @command
+    def local(x: int):
+        pass
+
+    with pytest.raises((pickle.PicklingError, AttributeError, TypeError)):
+        pickle.dumps(local)
+
+
+def test_spawn_pool(tmp_path):
+    (tmp_path / 'in.txt').write_text('data')
+    paint.parser
+    blend_command.parser
+    context = multiprocessing.get_context('spawn')
+    with ProcessPoolExecutor(2, mp_context=context) as pool:
+        painted = pool.submit(_run_pickled, paint, [str(tmp_path / 'in.txt'), '3', '4', '-s'])
+        blended = pool.submit(_run_pickled, blend_command, ['1', '-b', '5'])
+        assert painted.result() == (('data', (3, 4), Color.red, 'stroke', [], 1.0), True)
+        assert blended.result() == (6, True)
@@ -0,0 +1,97 @@
+import gc
+import pickle
+from enum import Enum
+from inspect import Parameter
+from typing import Tuple
+
+import pytest
+from typing_extensions import Literal
+
+from autoarg import Append, command, generate_argparser
+from autoarg.spec import KEYWORD, POSITIONAL, VAR_POSITIONAL, ArgSpec, CommandSpec
+
+
+class Color(Enum):
+    red = 'red'
+    green = 'green'
+
+
+def copy(src: str, *rest: int, force=False, mode: Literal['a', 'b'] = 'a',
+         color: Color = Color.red, size: Tuple[int, int] = (0, 0), tag: Append[str] = []):
+    return src, rest, force, mode, color, size, tag
+
+
+def test_spec_contents():
+    spec = command(copy, spec_cache=False).spec
+    assert isinstance(spec, CommandSpec)
+    assert spec.bindings == (
+        ('src', POSITIONAL), ('rest', VAR_POSITIONAL), ('force', KEYWORD), ('mode', KEYWORD),
+        ('color', KEYWORD), ('size', KEYWORD), ('tag', KEYWORD),
+    )
+    src = spec.arguments[0]
+    assert src.method == 'add_argument' and src.names == ('src',) and src.dest == 'src'
+    assert not src.is_option
+    assert 'help' not in src.options  # None means the same as not given
+    assert {arg.dest for arg in spec.arguments if arg.is_option} >= {'mode', 'color', 'size'}
+
+
+def test_equal_hashable_and_picklable():
+    first = generate_argparser(copy, spec_cache=False).spec
+    second = generate_argparser(copy, spec_cache=False, engine='fast').spec
+    assert first == second and hash(first) == hash(second)
+    assert first.arguments[0] is second.arguments[0]  # interned
+    copied = pickle.loads(pickle.dumps(first))
+    assert copied == first and hash(copied) == hash(first)
+    assert copied.arguments[0] is first.arguments[0]
+
+
+def test_immutable():
+    spec = generate_argparser(copy, spec_cache=False).spec
+    with pytest.raises(AttributeError):
+        spec.bindings = ()
+    with pytest.raises(AttributeError):
+        spec.arguments[0].names = ('dst',)
+    with pytest.raises(AttributeError):
+        del spec.arguments[0].method
+    assert ArgSpec('add_argument', ['-x'], {'type': int}).options == {'type': int}
+
+
+def test_unhashable_values():
+    first = ArgSpec('add_argument', ['--tag'], {'default': []})
+    second = ArgSpec('add_argument', ['--tag'], {'default': []})
+    assert first == second and hash(first) == hash(second)
+    assert first != ArgSpec('add_argument', ['--tag'], {'default': [1]})
+
+
+def _reachable(root):
+    seen = {id(root)}
+    pending = [root]
+    while pending:
+        obj = pending.pop()
+        yield obj
+        if isinstance(obj, type) or callable(obj) and hasattr(obj, '__code__'):
+            continue  # classes and functions lead to whole modules
+        for ref in gc.get_referents(obj):
+            if id(ref) not in seen:
+                seen.add(id(ref))
+                pending.append(ref)
+
+
+@pytest.mark.parametrize('engine', ['argparse', 'fast'])
+def test_no_introspection_retained(engine):
+    cmd = command(copy, spec_cache=False, engine=engine)
+    assert cmd.run('a', '1', '--tag', 'x') == ('a', (1,), False, 'a', Color.red, (0, 0), ['x'])
+    assert not any(isinstance(obj, Parameter) for obj in _reachable(cmd.parser))
+
+
+def test_equal_values_of_different_types_are_not_shared():
+    @command(spec_cache=False)
+    def a(*, n: float = 1):
+        return n
+
+    @command(spec_cache=False)
+    def b(*, n: float = 1.0):
+        return n
+
+    assert type(a.run()) is int and type(b.run()) is float
+    assert b.spec.arguments[-1] is not a.spec.arguments[-1]
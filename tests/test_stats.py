@@ -0,0 +1,126 @@
+import json
+import os
+import subprocess
+import sys
+import textwrap
+import threading
+from pathlib import Path
+
+import pytest
+
+from autoarg import command, generate_argparser
+from autoarg.stats import Stats
+
+ROOT = Path(__file__).resolve().parent.parent
+
+
+def add(a: int, b: float, *, scale: int = 1):
+    return (a + b) * scale
+
+
+def test_disabled_by_default():
+    cmd = command(add)
+    assert cmd.stats is None
+    assert not hasattr(cmd.parser, 'stats')
+    assert cmd.run('1', '2') == 3
+
+
+@pytest.mark.parametrize('engine', ['argparse', 'fast'])
+def test_phases_and_conversions(engine):
+    cmd = command(add, spec_cache=False, engine=engine)
+    stats = cmd.enable_stats()
+    assert cmd.stats is stats
+    assert cmd.run('1', '2', '--scale', '3') == 9
+    assert cmd.run('4', '5') == 9
+
+    names = [phase.name for phase in stats.phases]
+    assert 'inspect' in names and names.count('parse') == 2 and names.count('call') == 2
+    assert all(phase.wall >= 0 and phase.peak_memory is None for phase in stats.phases)
+    assert stats.conversions['a'][0] == 2 and stats.conversions['scale'][0] == 1
+    assert set(stats.to_dict()['totals']) == set(names)
+
+
+def test_conversion_errors_unchanged(capsys):
+    cmd = command(add, spec_cache=False)
+    cmd.enable_stats()
+    with pytest.raises(TypeError):
+        cmd.run('x', '2')
+    assert "argument a: invalid int value: 'x'" in capsys.readouterr().err
+
+
+def test_memory_and_chrome_trace(tmp_path):
+    stats = Stats('add', memory=True)
+    parser = generate_argparser(add, spec_cache=False, stats=stats)
+    assert parser.parse_call_args(['1', '2']) == ([1, 2.0], {'scale': 1})
+    assert all(phase.peak_memory is not None for phase in stats.phases)
+
+    path = tmp_path / 'trace.json'
+    stats.write(path, 'chrome')
+    trace = json.loads(path.read_text())
+    events = [event for event in trace['traceEvents'] if event['ph'] == 'X']
+    assert [event['name'] for event in events] == [phase.name for phase in stats.phases]
+    assert all(event['dur'] >= 0 for event in events)
+    assert trace['otherData']['conversions']['b']['count'] == 1
+
+
+
+def test_nested_phases_keep_the_peak():
+    stats = Stats('nested', memory=True)
+    with stats.phase('outer'):
+        data = bytearray(1 << 20)
+        del data
+        with stats.phase('inner'):
+            pass
+    inner, outer = stats.phases
+    assert outer.peak_memory >= 1 << 20 > inner.peak_memory
+
+
+def test_conversions_from_many_threads():
+    cmd = command(add, spec_cache=False)
+    stats = cmd.enable_stats()
+    threads = [
+        threading.Thread(target=lambda: [cmd.run('1', '2') for _ in range(200)])
+        for _ in range(4)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert stats.conversions['a'][0] == stats.conversions['b'][0] == 800
+
+
+@pytest.mark.parametrize('target', ['1', 'stats.json', 'chrome:trace.json'])
+def test_trace_environment_variable(tmp_path, target):
+    script = tmp_path / 'script.py'
+    script.write_text(textwrap.dedent('''
+        from autoarg import command
+
+        @command
+        def unused(x: int):
+            pass
+
+        @command
+        def add(a: int, b: int):
+            print(a + b)
+
+        add.main()
+    '''))
+    env = {
+        **os.environ, 'PYTHONPATH': str(ROOT), 'AUTOARG_TRACE': target, 'AUTOARG_SPEC_CACHE': '0',
+    }
+    result = subprocess.run(
+        [sys.executable, str(script), '1', '2'],
+        cwd=tmp_path, env=env, capture_output=True, text=True, check=True,
+    )
+    assert result.stdout == '3\n'
+    if target == '1':
+        data = json.loads(result.stderr)
+    else:
+        data = json.loads((tmp_path / target.split(':')[-1]).read_text())
+    if target.startswith('chrome:'):
+        assert {event['name'] for event in data['traceEvents']} >= {'parse', 'call'}
+    else:
+        assert data['command'] == 'add'  # nothing for the command that didn't run
+        assert {'parse', 'call'} <= set(data['totals'])
+        assert data['conversions']['a']['count'] == 1
+        assert all(phase['peak_memory'] is None for phase in data['phases'])  # opt-in
@@ -0,0 +1,92 @@
+import enum
+import io
+import sys
+
+import pytest
+
+from autoarg import Stream, command, generate_argparser
+
+
+class Level(enum.Enum):
+    low = 'low'
+    high = 'high'
+
+
+@command
+def total(numbers: Stream[int], *, scale: int = 1):
+    return numbers, scale
+
+
+@command
+def levels(values: Stream[Level]):
+    return list(values)
+
+
+def test_argv_values_are_converted_lazily():
+    numbers, scale = total.run('1', '2', '-s', '3')
+    assert iter(numbers) is numbers
+    assert (list(numbers), scale) == ([1, 2], 3)
+    numbers, _ = total.run('1', 'x')
+    assert next(numbers) == 1
+    with pytest.raises(ValueError, match="invalid int value: 'x'"):
+        next(numbers)
+
+
+def test_from_files(tmp_path, monkeypatch):
+    lines = tmp_path / 'lines.txt'
+    lines.write_text('1\n2\r\n\n3')
+    nul = tmp_path / 'nul.bin'
+    nul.write_bytes(b'4\x005\x00')
+    empty = tmp_path / 'empty'
+    empty.touch()
+    monkeypatch.setattr(sys, 'stdin', io.TextIOWrapper(io.BytesIO(b'6\n7\n')))
+
+    numbers, _ = total.run('0', f'@{lines}', f'@{empty}', '--numbers-from', str(nul),
+                           '--numbers-from', '-')
+    assert list(numbers) == [0, 1, 2, 3, 4, 5, 6, 7]
+
+
+def test_long_input_streams(tmp_path, monkeypatch):
+    from autoarg import streams
+    monkeypatch.setattr(streams, '_CHUNK_SIZE', 5)
+    path = tmp_path / 'many.txt'
+    path.write_text(''.join(f'{i}\n' for i in range(10000)))
+    monkeypatch.setattr(sys, 'stdin', io.TextIOWrapper(io.BytesIO(path.read_bytes())))
+    assert sum(total.run(f'@{path}')[0]) == sum(range(10000))
+    assert sum(total.run('@-')[0]) == sum(range(10000))
+
+
+def test_missing_file_is_a_parse_error(tmp_path):
+    with pytest.raises(TypeError):
+        total.run(f'@{tmp_path / "missing"}')
+
+
+def test_enum_items():
+    assert levels.run('high', 'low') == [Level.high, Level.low]
+    with pytest.raises(ValueError, match='invalid choice'):
+        levels.run('medium')
+
+
+def test_var_positional_is_rejected():
+    def bad(*values: Stream[int]):
+        pass
+
+    with pytest.raises(TypeError):
+        generate_argparser(bad, spec_cache=False)
+
+
+def test_two_streams_and_clashes(tmp_path):
+    @command(spec_cache=False)
+    def pair(left: Stream[int], right: Stream[int]):
+        return list(left), list(right)
+
+    (tmp_path / 'a').write_text('1\n2')
+    (tmp_path / 'b').write_text('3')
+    argv = ['--left-from', str(tmp_path / 'a'), '--right-from', str(tmp_path / 'b')]
+    assert pair.run(*argv) == ([1, 2], [3])
+
+    def clash(numbers: Stream[int], *, numbers_from: str = ''):
+        pass
+
+    with pytest.raises(TypeError, match='--numbers-from'):
+        generate_argparser(clash, spec_cache=False)